@@ -0,0 +1,278 @@
+# alert_book.py
+# Buku alert harga di memori berbasis array NumPy (satu baris per alert, kolom bertipe tetap).
+# Alert 'above'/'below' dievaluasi lewat indeks target terurut per token (threshold_index), alert
+# persen/window dengan perbandingan tervektorisasi terhadap satu snapshot harga.
+
+import calendar
+import time
+
+import numpy as np
+
+from threshold_index import ThresholdIndex
+
+ABOVE, BELOW, PERCENT, WINDOW = 0, 1, 2, 3
+TYPE_CODES = {'above': ABOVE, 'below': BELOW, 'percent': PERCENT, 'window': WINDOW}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+
+INITIAL_CAPACITY = 1024
+
+
+def parse_created_at(created_at):
+    """Kolom created_at SQLite ('YYYY-MM-DD HH:MM:SS', UTC) -> epoch detik (NaN jika tidak ada/tidak valid)."""
+    try:
+        return float(calendar.timegm(time.strptime(created_at, '%Y-%m-%d %H:%M:%S')))
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class AlertBook:
+    """
+    Kolom per alert: token_idx, type_code, target_price, target_pct, baseline (harga saat alert dibuat)
+    dan user_id, ditambah alert_id, created_ts dan flag active. Slot alert yang dihapus dipakai ulang,
+    sehingga memori sebanding dengan jumlah alert aktif terbanyak, bukan jumlah alert yang pernah ada.
+    Token (chain + alamat) disimpan sekali di `tokens` dan dirujuk lewat indeks; begitu juga jendela
+    (token_key, detik) alert 'window' di `windows`, dirujuk lewat window_idx (-1 untuk jenis lain).
+    Target alert above/below juga dicatat di `thresholds`, diperbarui di add()/remove() per alert;
+    slot alert persen/window dicatat di `dense_slots`, satu-satunya slot yang dihitung tervektorisasi.
+    """
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.tokens = []  # token_idx -> (token_key, chain, token_address, token_symbol)
+        self.token_index = {}  # token_key -> token_idx
+        self.windows = []  # window_idx -> (token_key, detik)
+        self.window_index = {}  # (token_key, detik) -> window_idx
+        self.slots = {}  # alert_id -> slot
+        self.free = []
+        self.size = 0  # slot tertinggi yang pernah dipakai + 1
+        self.thresholds = ThresholdIndex()
+        self.dense_slots = set()
+        self._dense_array = None  # cache array terurut dari dense_slots, dibuang saat isinya berubah
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        old = getattr(self, 'alert_id', None)
+        columns = {
+            'alert_id': np.int64, 'user_id': np.int64, 'token_idx': np.int32, 'type_code': np.int8,
+            'target_price': np.float64, 'target_pct': np.float64, 'baseline': np.float64, 'created_ts': np.float64,
+            'window_idx': np.int32, 'active': np.bool_,
+        }
+        for name, dtype in columns.items():
+            column = np.zeros(capacity, dtype=dtype)
+            if old is not None:
+                column[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, column)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, alert_id):
+        return alert_id in self.slots
+
+    def _token(self, alert):
+        token_key = f"{alert['chain']}_{alert['token_address']}"
+        idx = self.token_index.get(token_key)
+        if idx is None:
+            idx = len(self.tokens)
+            self.tokens.append((token_key, alert['chain'], alert['token_address'], alert['token_symbol']))
+            self.token_index[token_key] = idx
+        return idx
+
+    def _window(self, alert):
+        key = (f"{alert['chain']}_{alert['token_address']}", int(alert['window_minutes']) * 60)
+        idx = self.window_index.get(key)
+        if idx is None:
+            idx = len(self.windows)
+            self.windows.append(key)
+            self.window_index[key] = idx
+        return idx
+
+    def add(self, alert):
+        if self._add_columns(alert) and alert['alert_type'] in ('above', 'below'):
+            token_key = self.tokens[self.token_idx[self.slots[alert['id']]]][0]
+            self.thresholds.add(token_key, alert['alert_type'], [alert['id']], [alert['target_price']])
+
+    def _add_columns(self, alert):
+        """Tulis alert ke kolom array. False jika alert sudah ada di buku."""
+        if alert['id'] in self.slots:
+            return False
+        if self.free:
+            slot = self.free.pop()
+        else:
+            if self.size == len(self.alert_id):
+                self._allocate(len(self.alert_id) * 2)
+            slot = self.size
+            self.size += 1
+        self.slots[alert['id']] = slot
+        self.alert_id[slot] = alert['id']
+        self.user_id[slot] = alert['user_id']
+        self.token_idx[slot] = self._token(alert)
+        self.type_code[slot] = TYPE_CODES[alert['alert_type']]
+        self.target_price[slot] = alert.get('target_price') if alert.get('target_price') is not None else np.nan
+        self.target_pct[slot] = alert.get('target_percentage') if alert.get('target_percentage') is not None else np.nan
+        self.baseline[slot] = alert.get('created_price') or np.nan
+        self.created_ts[slot] = parse_created_at(alert.get('created_at'))
+        self.window_idx[slot] = self._window(alert) if alert['alert_type'] == 'window' else -1
+        self.active[slot] = True
+        if alert['alert_type'] in ('percent', 'window'):
+            self.dense_slots.add(slot)
+            self._dense_array = None
+        return True
+
+    def remove(self, alert_id):
+        removed = self._remove_columns(alert_id)
+        if removed and removed[1] in ('above', 'below'):
+            self.thresholds.remove(removed[0], removed[1], [alert_id])
+        return removed is not None
+
+    def remove_fired(self, snapshot, alert_ids):
+        """
+        Keluarkan alert yang terpicu pada `snapshot` (hasil evaluate() dengan snapshot yang sama). Alert
+        above/below dipotong dari indeks target sekali per token, bukan dicari satu per satu.
+        """
+        removed = set(alert_ids)
+        tokens = {self.tokens[self.token_idx[self.slots[alert_id]]][0] for alert_id in removed if alert_id in self.slots}
+        for token_key in tokens:
+            removed.update(self.thresholds.discard_crossed(token_key, snapshot.get(token_key)).tolist())
+        for alert_id in removed:
+            self._remove_columns(alert_id)
+
+    def _remove_columns(self, alert_id):
+        """Kosongkan slot alert. Mengembalikan (token_key, jenis alert), atau None jika alert tidak ada."""
+        slot = self.slots.pop(alert_id, None)
+        if slot is None:
+            return None
+        self.active[slot] = False
+        self.free.append(slot)
+        if slot in self.dense_slots:
+            self.dense_slots.discard(slot)
+            self._dense_array = None
+        return self.tokens[self.token_idx[slot]][0], TYPE_NAMES[int(self.type_code[slot])]
+
+    def sync(self, active_alerts):
+        """
+        Samakan isi buku dengan daftar alert aktif (hanya saat muat ulang penuh): alert baru ditambahkan,
+        yang hilang dihapus. Indeks target diperbarui sekali per (token, jenis), bukan per alert.
+        """
+        active_ids = set()
+        added = {}  # (token_key, jenis) -> ([alert_id], [target])
+        for alert in active_alerts:
+            active_ids.add(alert['id'])
+            if self._add_columns(alert) and alert['alert_type'] in ('above', 'below'):
+                token_key = self.tokens[self.token_idx[self.slots[alert['id']]]][0]
+                ids, targets = added.setdefault((token_key, alert['alert_type']), ([], []))
+                ids.append(alert['id'])
+                targets.append(alert['target_price'])
+        for (token_key, side), (ids, targets) in added.items():
+            self.thresholds.add(token_key, side, ids, targets)
+
+        removed = {}  # (token_key, jenis) -> [alert_id]
+        for alert_id in [alert_id for alert_id in self.slots if alert_id not in active_ids]:
+            token_key, side = self._remove_columns(alert_id)
+            removed.setdefault((token_key, side), []).append(alert_id)
+        for (token_key, side), ids in removed.items():
+            if side in ('above', 'below'):
+                self.thresholds.remove(token_key, side, ids)
+
+    def set_baseline(self, alert_id, price):
+        slot = self.slots.get(alert_id)
+        if slot is not None:
+            self.baseline[slot] = price
+
+    def missing_baselines(self):
+        """Alert persen aktif tanpa baseline: list (alert_id, token_key, created_ts)."""
+        n = self.size
+        mask = self.active[:n] & (self.type_code[:n] == PERCENT) & np.isnan(self.baseline[:n])
+        return [
+            (int(self.alert_id[slot]), self.tokens[self.token_idx[slot]][0], float(self.created_ts[slot]))
+            for slot in np.flatnonzero(mask)
+        ]
+
+    def active_windows(self):
+        """(token_key, detik) yang masih dipakai alert 'window' aktif."""
+        n = self.size
+        used = np.unique(self.window_idx[:n][self.active[:n] & (self.window_idx[:n] >= 0)])
+        return [self.windows[idx] for idx in used]
+
+    def active_tokens(self):
+        """token_key yang masih punya alert aktif."""
+        n = self.size
+        counts = np.bincount(self.token_idx[:n][self.active[:n]], minlength=len(self.tokens))
+        return [self.tokens[idx][0] for idx in np.flatnonzero(counts)]
+
+    def evaluate(self, snapshot, window_extremes=None):
+        """
+        `snapshot` berisi token_key -> harga (None jika tidak diketahui). Mengembalikan array alert_id
+        yang kondisinya terpenuhi. Alert tanpa harga, atau alert persen tanpa baseline, tidak terpicu.
+        Alert above/below dicari di indeks target (O(log n + k) per token); hanya slot alert persen/window
+        yang dihitung tervektorisasi, jadi biaya per putaran tidak bergantung pada jumlah alert above/below.
+        `window_extremes` berisi (token_key, detik) -> (min, max) harga dalam jendela untuk alert 'window':
+        target positif terpicu jika harga naik X% dari minimum jendela, negatif jika turun X% dari maksimum.
+        """
+        crossed = [self.thresholds.crossed(token_key, price) for token_key, price in snapshot.items()]
+
+        if self._dense_array is None:
+            self._dense_array = np.fromiter(sorted(self.dense_slots), dtype=np.int64, count=len(self.dense_slots))
+        slots = self._dense_array
+        token_prices = np.full(len(self.tokens), np.nan)
+        for token_key, price in snapshot.items():
+            idx = self.token_index.get(token_key)
+            if idx is not None and price is not None:
+                token_prices[idx] = price
+
+        price = token_prices[self.token_idx[slots]]
+        type_code = self.type_code[slots]
+        target_pct = self.target_pct[slots]
+        baseline = self.baseline[slots]
+
+        # Elemen terakhir (NaN) menjadi tujuan window_idx -1, sehingga alert non-window tidak terpengaruh
+        window_min = np.full(len(self.windows) + 1, np.nan)
+        window_max = np.full(len(self.windows) + 1, np.nan)
+        for key, (low, high) in (window_extremes or {}).items():
+            idx = self.window_index.get(key)
+            if idx is not None:
+                window_min[idx], window_max[idx] = low, high
+        low = window_min[self.window_idx[slots]]
+        high = window_max[self.window_idx[slots]]
+
+        # NaN selalu menghasilkan False pada perbandingan, jadi harga/baseline yang tidak ada tidak pernah terpicu
+        with np.errstate(invalid='ignore', divide='ignore'):
+            change_pct = (price - baseline) / baseline * 100
+            rise_pct = (price - low) / low * 100
+            drop_pct = (price - high) / high * 100
+            fired = (
+                ((type_code == PERCENT) & (baseline > 0) & (
+                    ((target_pct > 0) & (change_pct >= target_pct))
+                    | ((target_pct <= 0) & (change_pct <= target_pct))
+                ))
+                | ((type_code == WINDOW) & (
+                    ((target_pct > 0) & (low > 0) & (rise_pct >= target_pct))
+                    | ((target_pct < 0) & (high > 0) & (drop_pct <= target_pct))
+                ))
+            )
+        return np.concatenate(crossed + [self.alert_id[slots][fired]])
+
+    def get(self, alert_id):
+        """Alert sebagai dict (bentuk yang sama dengan get_all_active_alerts) untuk pesan notifikasi."""
+        slot = self.slots.get(alert_id)
+        if slot is None:
+            return None
+        _, chain, token_address, token_symbol = self.tokens[self.token_idx[slot]]
+        target_price = float(self.target_price[slot])
+        target_pct = float(self.target_pct[slot])
+        baseline = float(self.baseline[slot])
+        return {
+            'id': int(alert_id), 'user_id': int(self.user_id[slot]),
+            'token_address': token_address, 'token_symbol': token_symbol, 'chain': chain,
+            'alert_type': TYPE_NAMES[int(self.type_code[slot])],
+            'target_price': None if np.isnan(target_price) else target_price,
+            'target_percentage': None if np.isnan(target_pct) else target_pct,
+            'created_price': None if np.isnan(baseline) else baseline,
+            'window_minutes': self.windows[self.window_idx[slot]][1] // 60 if self.window_idx[slot] >= 0 else None,
+        }
+
+    def nbytes(self):
+        """Memori array kolom (tidak termasuk dict alert_id -> slot)."""
+        return sum(getattr(self, name).nbytes for name in (
+            'alert_id', 'user_id', 'token_idx', 'type_code', 'target_price', 'target_pct', 'baseline', 'created_ts',
+            'window_idx', 'active'
+        ))
@@ -0,0 +1,123 @@
+# backfill.py
+# Backfill riwayat transfer untuk wallet yang baru ditambahkan: mengalirkan `alchemy_getAssetTransfers`
+# untuk N blok/hari terakhir halaman demi halaman ke tabel transfer_history.
+#
+# Berjalan dengan prioritas rendah: satu job per proses dalam satu waktu dan jeda antar halaman,
+# agar kuota RPC tetap tersedia untuk monitor.
+#
+#   python backfill.py --chain base --address 0xabc... --days 7
+
+import argparse
+import asyncio
+import logging
+
+import aiohttp
+
+import config
+import database
+from bot.utils import make_rpc_request_async
+from constants import CHAIN_CONFIG
+from transfers import TRANSFER_CATEGORIES, PAGE_SIZE
+
+DEFAULT_DAYS = 7
+# Jeda antar halaman (detik) dan batas jumlah transfer per arah agar job tidak berjalan tanpa akhir
+PAGE_DELAY = 1.0
+MAX_TRANSFERS = 5000
+HTTP_TIMEOUT = 30
+
+_job_lock = None
+_running = set()
+
+
+def get_rpc_url(chain_data):
+    return config.RPC_HTTP_URL_TEMPLATE.format(subdomain=chain_data['rpc_subdomain'], api_key=config.ALCHEMY_API_KEY)
+
+def blocks_for_days(chain, days):
+    """Perkiraan jumlah blok dalam `days` hari berdasarkan block_time di CHAIN_CONFIG."""
+    block_time = CHAIN_CONFIG[chain].get('block_time') or 12
+    return int(days * 86400 / block_time)
+
+def is_running(chain, address):
+    return (chain, address.lower()) in _running
+
+async def _stream_direction(session, rpc_url, chain, address, direction, from_block, to_block):
+    """Ambil transfer satu arah (fromAddress/toAddress), terbaru dulu, dan simpan per halaman."""
+    params = {
+        "fromBlock": hex(from_block), "toBlock": hex(to_block), direction: address,
+        "category": TRANSFER_CATEGORIES, "withMetadata": True, "excludeZeroValue": False,
+        "maxCount": hex(PAGE_SIZE), "order": "desc",
+    }
+    saved = 0
+    while saved < MAX_TRANSFERS:
+        response = await make_rpc_request_async(session, rpc_url, "alchemy_getAssetTransfers", [params])
+        if not response or 'result' not in response:
+            error = response.get('error') if response else 'tidak ada respons'
+            raise RuntimeError(f"getAssetTransfers gagal ({direction}): {error}")
+
+        transfers = response['result'].get('transfers') or []
+        if transfers and not database.save_transfer_history(chain, address, transfers):
+            raise RuntimeError("gagal menyimpan riwayat transfer")
+        saved += len(transfers)
+
+        page_key = response['result'].get('pageKey')
+        if not page_key:
+            break
+        params = {**params, "pageKey": page_key}
+        await asyncio.sleep(PAGE_DELAY)
+    return saved
+
+async def backfill_wallet(session, chain, address, days=None, blocks=None):
+    """
+    Backfill satu wallet untuk `blocks` blok terakhir (atau `days` hari). Mengembalikan jumlah transfer
+    yang diproses. Job untuk wallet yang sama tidak dijalankan dua kali bersamaan.
+    """
+    global _job_lock
+    if _job_lock is None:
+        _job_lock = asyncio.Lock()
+
+    key = (chain, address.lower())
+    if key in _running:
+        raise RuntimeError("backfill untuk wallet ini sedang berjalan")
+    _running.add(key)
+    try:
+        async with _job_lock:
+            rpc_url = get_rpc_url(CHAIN_CONFIG[chain])
+            response = await make_rpc_request_async(session, rpc_url, "eth_blockNumber", [])
+            if not response or not response.get('result'):
+                raise RuntimeError("gagal mengambil blok terbaru")
+            head = int(response['result'], 16)
+            span = blocks if blocks is not None else blocks_for_days(chain, days or DEFAULT_DAYS)
+            from_block = max(0, head - span)
+
+            logging.info(f"[backfill:{chain}] {address}: blok {hex(from_block)} hingga {hex(head)}")
+            total = 0
+            for direction in ("fromAddress", "toAddress"):
+                total += await _stream_direction(session, rpc_url, chain, address.lower(), direction, from_block, head)
+            logging.info(f"[backfill:{chain}] {address}: selesai, {total} transfer.")
+            return total
+    finally:
+        _running.discard(key)
+
+async def run_backfill(chain, address, days=None, blocks=None):
+    """Versi mandiri (membuat session sendiri), dipakai dari bot dan CLI."""
+    timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        return await backfill_wallet(session, chain, address, days=days, blocks=blocks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill riwayat transfer sebuah wallet ke transfer_history.")
+    parser.add_argument('--chain', required=True, choices=sorted(CHAIN_CONFIG))
+    parser.add_argument('--address', required=True)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--days', type=float, help=f"jumlah hari terakhir (default {DEFAULT_DAYS})")
+    group.add_argument('--blocks', type=int, help="jumlah blok terakhir")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    database.setup_database()
+    total = asyncio.run(run_backfill(args.chain, args.address, days=args.days, blocks=args.blocks))
+    print(f"{total} transfer disimpan/diperbarui untuk {args.address} di {args.chain}.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# bench_alert_book.py
+# Benchmark AlertBook: memori per alert dan kecepatan evaluasi satu snapshot harga,
+# dibandingkan dengan evaluasi lama (dict per alert, dicek satu per satu).
+#
+#   python bench_alert_book.py --alerts 1000000 --tokens 500
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+
+from alert_book import AlertBook
+
+
+def make_alerts(count, tokens):
+    rng = random.Random(42)
+    for alert_id in range(1, count + 1):
+        token = rng.randrange(tokens)
+        alert_type = rng.choice(('above', 'below', 'percent'))
+        yield {
+            'id': alert_id, 'user_id': rng.randrange(1, 100000),
+            'token_address': f"0x{token:040x}", 'token_symbol': f"TKN{token}", 'chain': 'ethereum',
+            'alert_type': alert_type,
+            'target_price': rng.uniform(50, 150) if alert_type != 'percent' else None,
+            'target_percentage': rng.uniform(-30, 30) if alert_type == 'percent' else None,
+            'created_price': 100.0,
+        }
+
+
+def legacy_should_trigger(alert, current_price):
+    """Salinan logika lama PriceMonitor.should_trigger_alert() sebagai pembanding."""
+    if alert['alert_type'] == 'above':
+        return current_price >= alert['target_price']
+    if alert['alert_type'] == 'below':
+        return current_price <= alert['target_price']
+    created_price = alert.get('created_price', 0)
+    if created_price <= 0:
+        return False
+    change = (current_price - created_price) / created_price * 100
+    target = alert['target_percentage']
+    return change >= target if target > 0 else change <= target
+
+
+def timed(func, rounds):
+    func()  # pemanasan, tidak dihitung
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = func()
+    return (time.perf_counter() - start) / rounds, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark memori dan evaluasi AlertBook.")
+    parser.add_argument('--alerts', type=int, default=1000000)
+    parser.add_argument('--tokens', type=int, default=500)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    snapshot = {f"ethereum_0x{token:040x}": rng.uniform(60, 140) for token in range(args.tokens)}
+
+    tracemalloc.start()
+    book = AlertBook()
+    for alert in make_alerts(args.alerts, args.tokens):
+        book.add(alert)
+    book_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    alerts = list(make_alerts(args.alerts, args.tokens))
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    book_time, fired = timed(lambda: book.evaluate(snapshot), args.rounds)
+    legacy_time, legacy_fired = timed(
+        lambda: [a['id'] for a in alerts if legacy_should_trigger(a, snapshot[f"{a['chain']}_{a['token_address']}"])],
+        max(1, args.rounds // 5),
+    )
+    if sorted(fired.tolist()) != legacy_fired:
+        sys.exit("Hasil evaluasi AlertBook berbeda dengan evaluasi lama!")
+
+    print(f"{args.alerts} alert, {args.tokens} token, {len(fired)} terpicu per snapshot")
+    print(f"{'dict per alert':<16} {dict_bytes / args.alerts:7.1f} B/alert   {legacy_time * 1000:8.1f} ms/snapshot   {args.alerts / legacy_time / 1e6:7.2f} juta evaluasi/detik")
+    print(f"{'AlertBook':<16} {book_bytes / args.alerts:7.1f} B/alert   {book_time * 1000:8.1f} ms/snapshot   {args.alerts / book_time / 1e6:7.2f} juta evaluasi/detik")
+    print(f"{'':<16} (kolom array saja: {book.nbytes() / args.alerts:.1f} B/alert)")
+
+if __name__ == '__main__':
+    main()
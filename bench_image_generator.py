@@ -0,0 +1,77 @@
+# bench_image_generator.py
+# Micro-benchmark render kuitansi: implementasi lama (muat font + gambar ulang semua) vs versi cache.
+#
+#   python bench_image_generator.py --count 200
+
+import argparse
+import io
+import time
+
+import qrcode
+from PIL import Image, ImageDraw, ImageFont
+
+import image_generator
+
+SAMPLE_TX = {
+    'chain': 'base', 'direction': "✅ MASUK", 'color': '#A6E3A1',
+    'from_addr': "0x1234ab...cdef12", 'to_addr': "0xabcdef...123456",
+    'tx_hash': '0x' + 'ab' * 32, 'explorer_url': 'https://basescan.org',
+    'amount_text': "1.234567 ETH (~$4,321.00 USD)",
+}
+
+
+def legacy_create_transaction_image(tx_data):
+    """Salinan perilaku lama create_transaction_image() sebagai pembanding."""
+    font_title = ImageFont.truetype(image_generator.FONT_FILE, size=32)
+    font_main = ImageFont.truetype(image_generator.FONT_FILE, size=24)
+    font_small = ImageFont.truetype(image_generator.FONT_FILE, size=18)
+    width, height = image_generator.IMG_WIDTH, image_generator.IMG_HEIGHT
+
+    image = Image.new('RGB', (width, height), color='#1E1E2E')
+    draw = ImageDraw.Draw(image)
+    draw.text((40, 30), "Transaction Receipt", fill='#F5C2E7', font=font_title)
+    draw.line([(40, 75), (width - 40, 75)], fill='#45475A', width=2)
+    rows = [
+        ("Chain:", 100, tx_data['chain'].title(), '#F9E2AF', font_main),
+        ("Status:", 140, tx_data['direction'], tx_data['color'], font_main),
+        ("Amount:", 180, tx_data['amount_text'], '#FFFFFF', font_main),
+        ("From:", 220, tx_data['from_addr'], '#89B4FA', font_small),
+        ("To:", 250, tx_data['to_addr'], '#89B4FA', font_small),
+    ]
+    for label, y_pos, value, color, font in rows:
+        draw.text((40, y_pos), label, fill='#A6ADC8', font=font_main)
+        draw.text((180, y_pos), value, fill=color, font=font)
+
+    qr = qrcode.QRCode(version=1, box_size=5, border=2)
+    qr.add_data(f"{tx_data['explorer_url']}/tx/{tx_data['tx_hash']}")
+    qr.make(fit=True)
+    image.paste(qr.make_image(fill_color="black", back_color="white").convert('RGB'), (width - 190, 100))
+    draw.text((width - 188, 255), "Scan for Details", fill='#A6ADC8', font=font_small)
+
+    image_buffer = io.BytesIO()
+    image.save(image_buffer, format='PNG')
+    image_buffer.seek(0)
+    return image_buffer
+
+
+def run(name, render, count):
+    render()  # pemanasan, tidak dihitung
+    start = time.perf_counter()
+    size = 0
+    for _ in range(count):
+        size = len(render().getvalue())
+    elapsed = time.perf_counter() - start
+    print(f"{name:<22} {count / elapsed:8.1f} kuitansi/detik   {elapsed / count * 1000:7.2f} ms/kuitansi   {size / 1024:6.1f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark render kuitansi transaksi.")
+    parser.add_argument('--count', type=int, default=200)
+    args = parser.parse_args()
+
+    run("lama", lambda: legacy_create_transaction_image(SAMPLE_TX), args.count)
+    run("cache", lambda: image_generator.create_transaction_image(SAMPLE_TX), args.count)
+    run("cache + palet", lambda: image_generator.create_transaction_image(SAMPLE_TX, palette=True), args.count)
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 # bot/handlers/portfolio.py - VERSI LENGKAP DAN FINAL
 
+import asyncio
 import logging
 import requests
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
@@ -81,7 +82,8 @@ async def get_portfolio_erc20(update: Update, context):
     total_usd_value = 0
     
     if native_balance > 0.000001:
-        native_price = get_price(chain_data.get('coingecko_id'))
+        # Cache harga bersama bisa menunggu lease proses lain (time.sleep), jadi jalankan di thread
+        native_price = await asyncio.to_thread(get_price, chain_data.get('coingecko_id'))
         usd_value = native_balance * native_price if native_price else 0
         total_usd_value += usd_value
         usd_text = f" (~${usd_value:,.2f})" if usd_value > 0 else ""
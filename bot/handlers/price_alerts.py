@@ -1,16 +1,19 @@
 # bot/handlers/price_alerts.py - VERSI LENGKAP DAN DIPERBAIKI
 
+import asyncio
 import logging
-import random
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ConversationHandler, MessageHandler, filters
 import database
 import config  #<-- Pastikan config diimpor
 from constants import CHAIN_CONFIG
-from bot.utils import get_price, make_rpc_request, get_network_keyboard
+from bot.utils import get_token_price, make_rpc_request, get_network_keyboard
 
 # State untuk alur percakapan alert harga
-PILIH_CHAIN_ALERT, PILIH_TOKEN_ALERT, SET_HARGA_TARGET, PILIH_JENIS_ALERT = range(10, 14)
+PILIH_CHAIN_ALERT, PILIH_TOKEN_ALERT, SET_HARGA_TARGET, PILIH_JENIS_ALERT, PILIH_JENDELA_ALERT = range(10, 15)
+
+# Pilihan panjang jendela (menit) untuk alert pergerakan cepat
+WINDOW_OPTIONS = [5, 15, 60, 240]
 
 async def alert_menu(update: Update, context):
     """Menu utama untuk sistem alert harga"""
@@ -83,6 +86,7 @@ async def select_alert_token(update: Update, context):
         
         chain = context.user_data['alert_chain']
         token_info = await get_token_info(chain, token_address)
+        # Token tanpa harga CoinGecko (misalnya hanya ada di DEX) tetap bisa di-alert; monitor menghargainya dari pool
         current_price = await get_current_token_price(chain, token_address)
         
         context.user_data['token_info'] = token_info
@@ -90,7 +94,7 @@ async def select_alert_token(update: Update, context):
         
         text = (
             f"📊 **{token_info['symbol']} - {token_info['name']}**\n"
-            f"🏷️ Harga saat ini: **${current_price:,.6f}**\n"
+            f"🏷️ Harga saat ini: **{format_price(current_price)}**\n"
             f"🌐 Chain: **{chain.title()}**\n\n"
             "🎯 Pilih jenis alert yang diinginkan:"
         )
@@ -99,6 +103,7 @@ async def select_alert_token(update: Update, context):
             [InlineKeyboardButton("📈 Alert Naik (Above)", callback_data='alert_type_above')],
             [InlineKeyboardButton("📉 Alert Turun (Below)", callback_data='alert_type_below')],
             [InlineKeyboardButton("📊 Alert Perubahan %", callback_data='alert_type_percent')],
+            [InlineKeyboardButton("⚡ Alert Pergerakan Cepat", callback_data='alert_type_window')],
             [InlineKeyboardButton("⬅️ Kembali", callback_data='create_new_alert')]
         ]
         
@@ -120,30 +125,57 @@ async def select_alert_type(update: Update, context):
     
     alert_type = query.data.split('_')[2]
     context.user_data['alert_type'] = alert_type
+    context.user_data.pop('window_minutes', None)
     
     token_info = context.user_data['token_info']
     current_price = context.user_data['current_price']
     
+    if alert_type == 'window':
+        text = (f"⚡ **Alert Pergerakan Cepat untuk {token_info['symbol']}**\n\nHarga saat ini: **{format_price(current_price)}**\n\n⏱️ Pilih jendela waktu:")
+        keyboard = [[InlineKeyboardButton(format_window(minutes), callback_data=f"alert_window_{minutes}") for minutes in WINDOW_OPTIONS]]
+        await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+        return PILIH_JENDELA_ALERT
+    
     if alert_type == 'above':
-        text = (f"📈 **Alert Naik untuk {token_info['symbol']}**\n\nHarga saat ini: **${current_price:,.6f}**\n\n💰 Masukkan harga target (dalam USD):\nContoh: {current_price * 1.1:.6f} (naik 10%)")
+        example = f"\nContoh: {current_price * 1.1:.6f} (naik 10%)" if current_price is not None else ""
+        text = (f"📈 **Alert Naik untuk {token_info['symbol']}**\n\nHarga saat ini: **{format_price(current_price)}**\n\n💰 Masukkan harga target (dalam USD):{example}")
     elif alert_type == 'below':
-        text = (f"📉 **Alert Turun untuk {token_info['symbol']}**\n\nHarga saat ini: **${current_price:,.6f}**\n\n💰 Masukkan harga target (dalam USD):\nContoh: {current_price * 0.9:.6f} (turun 10%)")
+        example = f"\nContoh: {current_price * 0.9:.6f} (turun 10%)" if current_price is not None else ""
+        text = (f"📉 **Alert Turun untuk {token_info['symbol']}**\n\nHarga saat ini: **{format_price(current_price)}**\n\n💰 Masukkan harga target (dalam USD):{example}")
     else:  # percent
-        text = (f"📊 **Alert Perubahan % untuk {token_info['symbol']}**\n\nHarga saat ini: **${current_price:,.6f}**\n\n📈 Masukkan persentase perubahan:\nContoh: +10 (naik 10%) atau -15 (turun 15%)")
+        baseline_note = "" if current_price is not None else "\n(Harga awal dicatat oleh monitor saat harga pertama tersedia)"
+        text = (f"📊 **Alert Perubahan % untuk {token_info['symbol']}**\n\nHarga saat ini: **{format_price(current_price)}**{baseline_note}\n\n📈 Masukkan persentase perubahan:\nContoh: +10 (naik 10%) atau -15 (turun 15%)")
     
     await query.edit_message_text(text, parse_mode='Markdown')
     return SET_HARGA_TARGET
 
+async def select_alert_window(update: Update, context):
+    """User memilih panjang jendela untuk alert pergerakan cepat"""
+    query = update.callback_query
+    await query.answer()
+    
+    minutes = int(query.data.split('_')[2])
+    context.user_data['window_minutes'] = minutes
+    token_info = context.user_data['token_info']
+    
+    text = (f"⚡ **Alert Pergerakan Cepat untuk {token_info['symbol']}**\n\n⏱️ Jendela: **{format_window(minutes)}**\n\n📈 Masukkan persentase pergerakan:\nContoh: +5 (naik 5% dari harga terendah) atau -5 (turun 5% dari harga tertinggi) dalam jendela tersebut")
+    await query.edit_message_text(text, parse_mode='Markdown')
+    return SET_HARGA_TARGET
+
 async def set_target_price(update: Update, context):
     """User memasukkan harga target atau persentase"""
     try:
         user_input = update.message.text.strip()
         alert_type = context.user_data['alert_type']
         
-        if alert_type == 'percent':
+        if alert_type in ('percent', 'window'):
             percentage = float(user_input.replace('%', '').replace('+', ''))
+            if alert_type == 'window' and percentage == 0:
+                raise ValueError("persentase pergerakan tidak boleh 0")
             context.user_data['target_percentage'] = percentage
             target_display = f"{percentage:+.1f}%"
+            if alert_type == 'window':
+                target_display += f" dalam {format_window(context.user_data['window_minutes'])}"
         else:
             target_price = float(user_input)
             context.user_data['target_price'] = target_price
@@ -153,13 +185,13 @@ async def set_target_price(update: Update, context):
         chain = context.user_data['alert_chain']
         current_price = context.user_data['current_price']
         
-        alert_type_text = {'above': 'Naik di atas', 'below': 'Turun di bawah', 'percent': 'Berubah'}[alert_type]
+        alert_type_text = {'above': 'Naik di atas', 'below': 'Turun di bawah', 'percent': 'Berubah', 'window': 'Bergerak'}[alert_type]
         
         text = (
             "✅ **Konfirmasi Alert Harga**\n\n"
             f"🪙 Token: **{token_info['symbol']} ({token_info['name']})**\n"
             f"🌐 Chain: **{chain.title()}**\n"
-            f"💰 Harga Saat Ini: **${current_price:,.6f}**\n"
+            f"💰 Harga Saat Ini: **{format_price(current_price)}**\n"
             f"🎯 Alert: **{alert_type_text} {target_display}**\n\n"
             "Konfirmasi pembuatan alert?"
         )
@@ -179,14 +211,20 @@ async def confirm_create_alert(update: Update, context):
     await query.answer()
     
     user_id = update.effective_user.id
+    # Harga awal dicatat saat alert benar-benar dibuat (baseline alert persen). Jika belum ada harga,
+    # created_price dibiarkan NULL dan monitor mengisinya dari feed harganya sendiri (fill_missing_baselines)
+    chain = context.user_data['alert_chain']
+    created_price = await get_current_token_price(chain, context.user_data['alert_token_address'])
     alert_data = {
         'user_id': user_id,
         'token_address': context.user_data['alert_token_address'],
-        'chain': context.user_data['alert_chain'],
+        'chain': chain,
         'alert_type': context.user_data['alert_type'],
         'target_price': context.user_data.get('target_price'),
         'target_percentage': context.user_data.get('target_percentage'),
-        'token_symbol': context.user_data['token_info']['symbol']
+        'window_minutes': context.user_data.get('window_minutes'),
+        'token_symbol': context.user_data['token_info']['symbol'],
+        'created_price': created_price if created_price is not None else context.user_data['current_price']
     }
     
     alert_id = database.create_price_alert(alert_data)
@@ -266,10 +304,13 @@ async def get_token_info(chain, token_address):
     response = make_rpc_request(rpc_url, "alchemy_getTokenMetadata", [token_address])
     return response['result'] if response and 'result' in response else {'symbol': 'UNKNOWN', 'name': 'Unknown Token', 'decimals': 18}
 
+def format_price(price):
+    """Harga USD untuk ditampilkan, atau keterangan jika belum tersedia"""
+    return f"${price:,.6f}" if price is not None else "belum tersedia"
+
 async def get_current_token_price(chain, token_address):
-    """Ambil harga token saat ini (implementasi sederhana)"""
-    # Di implementasi nyata, integrate dengan price API seperti CoinGecko
-    return random.uniform(0.001, 5000)
+    """Ambil harga token saat ini dari cache harga bersama (None jika tidak diketahui)"""
+    return await asyncio.to_thread(get_token_price, chain, token_address)
 
 def format_alert_description(alert):
     """Format deskripsi alert untuk ditampilkan"""
@@ -280,5 +321,11 @@ def format_alert_description(alert):
         return f"{symbol} naik di atas ${alert['target_price']:,.6f}"
     elif alert_type == 'below':
         return f"{symbol} turun di bawah ${alert['target_price']:,.6f}"
+    elif alert_type == 'window':
+        return f"{symbol} bergerak {alert['target_percentage']:+.1f}% dalam {format_window(alert['window_minutes'])}"
     else: # percent
         return f"{symbol} berubah {alert['target_percentage']:+.1f}%"
+
+def format_window(minutes):
+    """Tampilan panjang jendela: '15 menit' atau '4 jam'"""
+    return f"{minutes // 60} jam" if minutes >= 60 and minutes % 60 == 0 else f"{minutes} menit"
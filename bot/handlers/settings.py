@@ -6,6 +6,8 @@ import database
 from bot.handlers.start import start
 
 SET_MIN_VALUE = range(4, 5)
+# Pilihan batas ringkasan: lebih dari N notifikasi dalam satu jendela dikirim sebagai satu pesan teks (0 = tidak pernah)
+DIGEST_THRESHOLD_OPTIONS = [5, 10, 20, 50, 0]
 
 async def settings_menu(update: Update, context):
     query = update.callback_query; await query.answer()
@@ -14,17 +16,23 @@ async def settings_menu(update: Update, context):
     
     min_val_text = f"${settings['min_value_usd']}" if settings['min_value_usd'] > 0 else "Tidak ada"
     airdrop_text = "✅ Aktif" if settings['notify_on_airdrop'] else "❌ Nonaktif"
+    grouping_text = "✅ Aktif" if settings['group_notifications'] else "❌ Nonaktif"
+    digest_text = f"lebih dari {settings['digest_threshold']} transaksi" if settings['digest_threshold'] else "Tidak pernah"
     
     text = (
         "**⚙️ Pengaturan Notifikasi**\n\n"
         "Atur preferensi Anda untuk notifikasi transaksi.\n\n"
         f"- **Nilai Minimum:** {min_val_text}\n"
-        f"- **Notifikasi Airdrop:** {airdrop_text}"
+        f"- **Notifikasi Airdrop:** {airdrop_text}\n"
+        f"- **Gabungkan Jadi Album:** {grouping_text}\n"
+        f"- **Ringkasan Teks:** {digest_text}"
     )
     
     keyboard = [
         [InlineKeyboardButton("💲 Ubah Nilai Minimum", callback_data='set_min_value_start')],
         [InlineKeyboardButton(f"Toggle Airdrop ({'Matikan' if settings['notify_on_airdrop'] else 'Aktifkan'})", callback_data='toggle_airdrop')],
+        [InlineKeyboardButton(f"Toggle Album ({'Matikan' if settings['group_notifications'] else 'Aktifkan'})", callback_data='toggle_grouping')],
+        [InlineKeyboardButton("🔁 Ubah Batas Ringkasan", callback_data='cycle_digest_threshold')],
         [InlineKeyboardButton("⬅️ Kembali ke Menu Utama", callback_data='main_menu')]
     ]
     await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
@@ -51,4 +59,21 @@ async def toggle_airdrop(update: Update, context):
     settings = database.get_user_settings(user_id)
     new_value = not settings['notify_on_airdrop']
     database.update_user_setting(user_id, 'notify_on_airdrop', new_value)
-    await settings_menu(update, context) # Refresh menu
\ No newline at end of file
+    await settings_menu(update, context) # Refresh menu
+
+async def toggle_grouping(update: Update, context):
+    query = update.callback_query; await query.answer()
+    user_id = update.effective_user.id
+    settings = database.get_user_settings(user_id)
+    database.update_user_setting(user_id, 'group_notifications', not settings['group_notifications'])
+    await settings_menu(update, context)
+
+async def cycle_digest_threshold(update: Update, context):
+    query = update.callback_query; await query.answer()
+    user_id = update.effective_user.id
+    settings = database.get_user_settings(user_id)
+    current = settings['digest_threshold']
+    index = DIGEST_THRESHOLD_OPTIONS.index(current) if current in DIGEST_THRESHOLD_OPTIONS else -1
+    new_value = DIGEST_THRESHOLD_OPTIONS[(index + 1) % len(DIGEST_THRESHOLD_OPTIONS)]
+    database.update_user_setting(user_id, 'digest_threshold', new_value)
+    await settings_menu(update, context)
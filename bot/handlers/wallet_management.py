@@ -1,7 +1,11 @@
 # bot/handlers/wallet_management.py - VERSI SUDAH DIPERBAIKI
 
+import html
+import logging
+
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ConversationHandler, MessageHandler, filters, CommandHandler
+import backfill
 import database
 from bot.utils import get_network_keyboard
 from bot.handlers.start import start
@@ -32,7 +36,15 @@ async def get_alias(update: Update, context):
     chain = context.user_data['chain']
     success = database.add_wallet(user_id, address, chain, alias)
     text = f"✅ Berhasil! Wallet '{alias}' sekarang dipantau di jaringan {chain.title()}." if success else f"ℹ️ Wallet ini sudah ada di daftar pantauan Anda."
-    await update.message.reply_text(text)
+    reply_markup = None
+    if success:
+        # Tawarkan backfill riwayat agar pengguna langsung melihat transaksi terbaru
+        wallet = next((w for w in database.get_wallets_by_user(user_id) if w['address'] == address.lower() and w['chain'] == chain), None)
+        if wallet:
+            reply_markup = InlineKeyboardMarkup([[InlineKeyboardButton(
+                f"📜 Ambil Riwayat {backfill.DEFAULT_DAYS} Hari Terakhir", callback_data=f"backfill_{wallet['id']}"
+            )]])
+    await update.message.reply_text(text, reply_markup=reply_markup)
     await start(update, context)
     return ConversationHandler.END
 
@@ -108,3 +120,37 @@ async def remove_wallet_confirm(update: Update, context):
     # Setelah menghapus, tampilkan lagi daftar wallet yang tersisa
     await query.edit_message_text(text)
     await my_wallets(update, context) # Panggil my_wallets untuk refresh menu
+
+async def backfill_history(update: Update, context):
+    query = update.callback_query; await query.answer()
+    user_id = update.effective_user.id
+    wallet = database.get_wallet_by_id(int(query.data.split('_')[1]), user_id)
+    if not wallet:
+        await query.edit_message_text("❌ Wallet tidak ditemukan.")
+        return
+    if backfill.is_running(wallet['chain'], wallet['address']):
+        await query.edit_message_text("⏳ Riwayat wallet ini sedang diambil, mohon tunggu.")
+        return
+
+    await query.edit_message_text(
+        f"⏳ Mengambil riwayat {backfill.DEFAULT_DAYS} hari terakhir untuk '{wallet['alias']}'. "
+        "Anda akan menerima pesan setelah selesai."
+    )
+    # Dijalankan di background agar handler langsung selesai
+    context.application.create_task(_run_backfill(context.bot, user_id, wallet), update=update)
+
+async def _run_backfill(bot, user_id, wallet):
+    try:
+        total = await backfill.run_backfill(wallet['chain'], wallet['address'], days=backfill.DEFAULT_DAYS)
+    except Exception as e:
+        logging.error(f"Backfill gagal untuk {wallet['address']} ({wallet['chain']}): {e}")
+        await bot.send_message(chat_id=user_id, text="❌ Gagal mengambil riwayat transaksi. Silakan coba lagi nanti.")
+        return
+
+    history = database.get_transfer_history(wallet['chain'], wallet['address'], limit=10)
+    text = f"📜 <b>Riwayat {html.escape(wallet['alias'])}</b> ({wallet['chain'].title()}): {total} transfer ditemukan.\n\n"
+    for tx in history:
+        direction = "➡️" if tx['from_addr'] == wallet['address'] else "✅"
+        amount = f"{tx['value']:.6f} {html.escape(tx['asset'] or '')}" if tx['value'] is not None else "NFT"
+        text += f"{direction} {amount} — <code>{tx['tx_hash'][:10]}...</code>\n"
+    await bot.send_message(chat_id=user_id, text=text, parse_mode='HTML')
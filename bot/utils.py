@@ -4,7 +4,9 @@
 import requests
 import logging
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from constants import CHAIN_CONFIG
+from constants import CHAIN_CONFIG, COINGECKO_ASSET_PLATFORMS
+from price_cache import get_shared_cache
+from pricing import COINGECKO_API_URL, PRICE_TTL, NEGATIVE_TTL, is_native_token, native_key, token_key, shared_key
 
 def make_rpc_request(rpc_url, method, params):
     """Indonesia: Fungsi pembantu untuk membuat permintaan JSON-RPC."""
@@ -17,20 +19,83 @@ def make_rpc_request(rpc_url, method, params):
         logging.error(f"Error saat melakukan request ke RPC: {e}")
     return None
 
-def get_price(coingecko_id):
-    """Indonesia: Mengambil harga dari CoinGecko API."""
-    if not coingecko_id: 
-        return None
+async def make_rpc_request_async(session, rpc_url, method, params):
+    """Indonesia: Versi async dari make_rpc_request, memakai aiohttp session bersama."""
+    payload = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
     try:
-        url = f"https://api.coingecko.com/api/v3/simple/price?ids={coingecko_id}&vs_currencies=usd"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        return data.get(coingecko_id, {}).get('usd')
+        async with session.post(rpc_url, json=payload) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
     except Exception as e:
-        logging.error(f"Gagal mengambil harga untuk {coingecko_id}: {e}")
+        logging.error(f"Error saat melakukan request async ke RPC ({method}): {e}")
     return None
 
+async def make_rpc_batch_request_async(session, rpc_url, calls):
+    """Indonesia: Kirim beberapa panggilan JSON-RPC dalam satu HTTP request (batch).
+
+    `calls` adalah list tuple (method, params). Hasil dikembalikan dengan urutan yang sama,
+    atau None jika seluruh batch gagal.
+    """
+    payload = [
+        {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+        for i, (method, params) in enumerate(calls)
+    ]
+    try:
+        async with session.post(rpc_url, json=payload) as response:
+            response.raise_for_status()
+            data = await response.json(content_type=None)
+    except Exception as e:
+        logging.error(f"Error saat melakukan batch request ke RPC: {e}")
+        return None
+
+    if not isinstance(data, list):
+        logging.error(f"Respons batch RPC tidak valid: {data}")
+        return None
+    # Server boleh mengembalikan hasil batch dalam urutan acak, jadi urutkan lagi berdasarkan id
+    by_id = {item.get('id'): item for item in data if isinstance(item, dict)}
+    return [by_id.get(i) for i in range(len(calls))]
+
+def get_price(coingecko_id):
+    """Indonesia: Mengambil harga dari CoinGecko API, lewat cache harga bersama antar proses."""
+    if not coingecko_id: 
+        return None
+
+    def fetch():
+        try:
+            url = f"{COINGECKO_API_URL}/simple/price?ids={coingecko_id}&vs_currencies=usd"
+            response = requests.get(url, timeout=10)
+            response.raise_for_status()
+            data = response.json()
+            return True, data.get(coingecko_id, {}).get('usd')
+        except Exception as e:
+            logging.error(f"Gagal mengambil harga untuk {coingecko_id}: {e}")
+        return False, None
+
+    return get_shared_cache().get_or_fetch(shared_key(native_key(coingecko_id)), fetch, PRICE_TTL, NEGATIVE_TTL)
+
+def get_token_price(chain, token_address):
+    """Indonesia: Harga USD token di sebuah jaringan (koin native sesuai is_native_token), lewat cache harga bersama."""
+    chain_data = CHAIN_CONFIG.get(chain, {})
+    if is_native_token(chain, token_address):
+        return get_price(chain_data.get('coingecko_id'))
+    platform = COINGECKO_ASSET_PLATFORMS.get(chain)
+    if not platform:
+        return None
+    contract = token_address.lower()
+
+    def fetch():
+        try:
+            url = f"{COINGECKO_API_URL}/simple/token_price/{platform}?contract_addresses={contract}&vs_currencies=usd"
+            response = requests.get(url, timeout=10)
+            response.raise_for_status()
+            data = {address.lower(): value for address, value in response.json().items()}
+            return True, data.get(contract, {}).get('usd')
+        except Exception as e:
+            logging.error(f"Gagal mengambil harga token {contract} di {chain}: {e}")
+        return False, None
+
+    return get_shared_cache().get_or_fetch(shared_key(token_key(platform, contract)), fetch, PRICE_TTL, NEGATIVE_TTL)
+
 def get_main_menu_keyboard():
     """Indonesia: Membuat keyboard untuk menu utama dengan Price Alert."""
     keyboard = [
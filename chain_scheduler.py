@@ -0,0 +1,78 @@
+# chain_scheduler.py
+# Penjadwal polling per jaringan yang menyesuaikan diri dengan ritme blok masing-masing chain
+
+import time
+
+# Batas interval polling (detik)
+MIN_POLL_INTERVAL = 2
+MAX_POLL_INTERVAL = 30
+# Batas interval saat tidak ada blok baru atau tidak ada wallet (backoff)
+MAX_IDLE_INTERVAL = 60
+BACKOFF_FACTOR = 1.5
+MAX_BACKOFF_STEPS = 10
+# Bobot sampel baru pada rata-rata bergerak eksponensial waktu blok
+BLOCK_TIME_SMOOTHING = 0.2
+# Satu jendela getAssetTransfers mencakup sekitar sekian detik waktu chain
+WINDOW_SECONDS = 600
+MIN_WINDOW_BLOCKS = 50
+MAX_WINDOW_BLOCKS = 2000
+DEFAULT_BLOCK_TIME = 12
+# Anggaran default panggilan getAssetTransfers per detik per jaringan (~150 CU per panggilan di Alchemy)
+DEFAULT_CALL_BUDGET = 5
+
+
+class ChainScheduler:
+    """
+    Mempelajari waktu blok dari selisih `eth_blockNumber` antar polling, lalu menentukan
+    interval polling dan ukuran jendela blok. Interval memanjang bertahap ketika tidak ada blok baru.
+    Interval juga tidak pernah lebih cepat dari anggaran `call_budget` (panggilan getAssetTransfers
+    per detik): jaringan cepat dengan banyak wallet dipoll lebih jarang daripada waktu bloknya.
+    """
+
+    def __init__(self, block_time_hint=None, call_budget=DEFAULT_CALL_BUDGET):
+        self.block_time = float(block_time_hint or DEFAULT_BLOCK_TIME)
+        self.call_budget = call_budget
+        self.last_head = None
+        self.last_head_time = None
+        self.idle_polls = 0
+
+    def observe_head(self, head, now=None):
+        """Catat nomor blok terbaru. Mengembalikan jumlah blok baru sejak observasi sebelumnya."""
+        now = time.monotonic() if now is None else now
+        if self.last_head is None:
+            self.last_head, self.last_head_time = head, now
+            self.idle_polls = 0
+            return 0
+
+        new_blocks = head - self.last_head
+        if new_blocks <= 0:
+            self.idle_polls += 1
+            return 0
+
+        sample = (now - self.last_head_time) / new_blocks
+        self.block_time += BLOCK_TIME_SMOOTHING * (sample - self.block_time)
+        self.last_head, self.last_head_time = head, now
+        self.idle_polls = 0
+        return new_blocks
+
+    def mark_idle(self):
+        """Tandai satu putaran tanpa pekerjaan (misalnya belum ada wallet di jaringan ini)."""
+        self.idle_polls += 1
+
+    def next_interval(self, fetch_calls=0):
+        """
+        Interval sampai polling berikutnya, kira-kira satu waktu blok, dengan backoff saat idle.
+        `fetch_calls` adalah jumlah panggilan RPC satu putaran fetch; interval minimal
+        fetch_calls / call_budget agar biaya RPC per jaringan tetap dalam anggaran.
+        """
+        interval = min(max(self.block_time, MIN_POLL_INTERVAL), MAX_POLL_INTERVAL)
+        if fetch_calls and self.call_budget:
+            interval = max(interval, fetch_calls / self.call_budget)
+        if self.idle_polls:
+            interval = min(interval * BACKOFF_FACTOR ** min(self.idle_polls, MAX_BACKOFF_STEPS), MAX_IDLE_INTERVAL)
+        return interval
+
+    def window_blocks(self):
+        """Jumlah blok per jendela fetch, agar setiap jendela mencakup rentang waktu yang serupa."""
+        blocks = int(WINDOW_SECONDS / max(self.block_time, 0.01))
+        return min(max(blocks, MIN_WINDOW_BLOCKS), MAX_WINDOW_BLOCKS)
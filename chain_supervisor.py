@@ -0,0 +1,47 @@
+# chain_supervisor.py
+# Menyelaraskan worker per jaringan dengan daftar jaringan yang punya wallet dipantau:
+# worker dibuat saat wallet pertama di jaringan itu muncul dan dihentikan saat wallet terakhir dihapus.
+
+import asyncio
+import logging
+
+
+class ChainSupervisor:
+    """
+    `start_worker(chain)` membuat task-task untuk satu jaringan dan mengembalikannya dalam list;
+    `on_stopped(chain)` dipanggil setelah worker dihentikan karena jaringan tidak lagi dipantau
+    (bukan saat restart worker atau shutdown proses).
+    Worker yang berhenti sendiri (crash) dibuat ulang pada rekonsiliasi berikutnya.
+    """
+
+    def __init__(self, start_worker, on_stopped=None):
+        self.start_worker = start_worker
+        self.on_stopped = on_stopped
+        self.workers = {}  # chain -> list task
+
+    async def reconcile(self, wanted_chains):
+        """Mulai worker untuk jaringan baru dan hentikan worker untuk jaringan yang tidak lagi dipantau."""
+        for chain, tasks in list(self.workers.items()):
+            if chain in wanted_chains and any(task.done() for task in tasks):
+                logging.warning(f"[{chain}] Worker berhenti tanpa diminta, memulai ulang.")
+                await self._stop(chain, notify=False)
+
+        for chain in sorted(set(self.workers) - set(wanted_chains)):
+            logging.info(f"[{chain}] Tidak ada wallet yang dipantau lagi, menghentikan worker.")
+            await self._stop(chain, notify=True)
+
+        for chain in sorted(set(wanted_chains) - set(self.workers)):
+            self.workers[chain] = self.start_worker(chain)
+            logging.info(f"[{chain}] Worker dimulai.")
+
+    async def _stop(self, chain, notify):
+        tasks = self.workers.pop(chain)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if notify and self.on_stopped:
+            self.on_stopped(chain)
+
+    async def stop_all(self):
+        for chain in list(self.workers):
+            await self._stop(chain, notify=False)
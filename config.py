@@ -9,3 +9,19 @@ if not TELEGRAM_TOKEN:
 
 if not ALCHEMY_API_KEY:
     raise ValueError("Kunci API Alchemy tidak ditemukan! Mohon set environment variable ALCHEMY_API_KEY.")
+
+# Template URL RPC; bisa diarahkan ke node lokal (lihat devnode.py) untuk pengujian offline
+RPC_HTTP_URL_TEMPLATE = os.getenv('RPC_HTTP_URL_TEMPLATE', 'https://{subdomain}.g.alchemy.com/v2/{api_key}')
+RPC_WS_URL_TEMPLATE = os.getenv('RPC_WS_URL_TEMPLATE', 'wss://{subdomain}.g.alchemy.com/v2/{api_key}')
+# Mode deteksi monitor: 'poll' (HTTP polling saja) atau 'ws' (langganan newHeads/logs + fallback polling)
+MONITOR_MODE = os.getenv('MONITOR_MODE', 'poll').lower()
+# Jumlah proses render kuitansi di monitor (0 = sesuai jumlah core)
+RENDER_WORKERS = int(os.getenv('RENDER_WORKERS', '0'))
+# Anggaran panggilan getAssetTransfers per detik per jaringan; membatasi seberapa cepat jaringan dengan banyak wallet dipoll
+TRANSFER_CALLS_PER_SECOND = float(os.getenv('TRANSFER_CALLS_PER_SECOND', '5'))
+# Sharding price_monitor: setiap replika hanya memantau token dengan crc32(token) % REPLICAS == INDEX
+PRICE_MONITOR_REPLICAS = int(os.getenv('PRICE_MONITOR_REPLICAS', '1'))
+PRICE_MONITOR_REPLICA_INDEX = int(os.getenv('PRICE_MONITOR_REPLICA_INDEX', '0'))
+
+if PRICE_MONITOR_REPLICAS < 1 or not 0 <= PRICE_MONITOR_REPLICA_INDEX < PRICE_MONITOR_REPLICAS:
+    raise ValueError("PRICE_MONITOR_REPLICA_INDEX harus di antara 0 dan PRICE_MONITOR_REPLICAS - 1.")
@@ -1,26 +1,95 @@
 # constants.py
 # File ini berisi semua variabel konstan yang digunakan di seluruh proyek.
 
+# 'block_time' (detik) hanya nilai awal; monitor mempelajari ritme blok sebenarnya saat berjalan.
+# 'confirmations' = jumlah blok di belakang head sebelum transfer dianggap final (aman dari reorg).
 CHAIN_CONFIG = {
-    'ethereum': {'explorer_url': 'https://etherscan.io', 'rpc_subdomain': 'eth-mainnet', 'coingecko_id': 'ethereum', 'symbol': 'ETH'},
-    'arbitrum': {'explorer_url': 'https://arbiscan.io', 'rpc_subdomain': 'arb-mainnet', 'coingecko_id': 'ethereum', 'symbol': 'ETH'},
-    'optimism': {'explorer_url': 'https://optimistic.etherscan.io', 'rpc_subdomain': 'opt-mainnet', 'coingecko_id': 'ethereum', 'symbol': 'ETH'},
-    'base': {'explorer_url': 'https://basescan.org', 'rpc_subdomain': 'base-mainnet', 'coingecko_id': 'ethereum', 'symbol': 'ETH'},
-    'zksync': {'explorer_url': 'https://explorer.zksync.io', 'rpc_subdomain': 'zksync-mainnet', 'coingecko_id': 'ethereum', 'symbol': 'ETH'},
-    'linea': {'explorer_url': 'https://lineascan.build', 'rpc_subdomain': 'linea-mainnet', 'coingecko_id': 'ethereum', 'symbol': 'ETH'},
-    'scroll': {'explorer_url': 'https://scrollscan.com', 'rpc_subdomain': 'scroll-mainnet', 'coingecko_id': 'ethereum', 'symbol': 'ETH'},
-    'blast': {'explorer_url': 'https://blastscan.io', 'rpc_subdomain': 'blast-mainnet', 'coingecko_id': 'ethereum', 'symbol': 'ETH'},
-    'zora': {'explorer_url': 'https://explorer.zora.energy', 'rpc_subdomain': 'zora-mainnet', 'coingecko_id': 'ethereum', 'symbol': 'ETH'},
-    'polygon': {'explorer_url': 'https://polygonscan.com', 'rpc_subdomain': 'polygon-mainnet', 'coingecko_id': 'matic-network', 'symbol': 'MATIC'},
-    'bsc': {'explorer_url': 'https://bscscan.com', 'rpc_subdomain': 'bsc-mainnet', 'coingecko_id': 'binancecoin', 'symbol': 'BNB'},
-    'avalanche': {'explorer_url': 'https://snowtrace.io', 'rpc_subdomain': 'avax-mainnet', 'coingecko_id': 'avalanche-2', 'symbol': 'AVAX'},
-    'fantom': {'explorer_url': 'https://ftmscan.com', 'rpc_subdomain': 'fantom-mainnet', 'coingecko_id': 'fantom', 'symbol': 'FTM'},
-    'mantle': {'explorer_url': 'https://mantlescan.xyz', 'rpc_subdomain': 'mantle-mainnet', 'coingecko_id': 'mantle', 'symbol': 'MNT'},
-    'cronos': {'explorer_url': 'https://cronoscan.com', 'rpc_subdomain': 'cronos-mainnet', 'coingecko_id': 'crypto-com-chain', 'symbol': 'CRO'},
-    'gnosis': {'explorer_url': 'https://gnosisscan.io', 'rpc_subdomain': 'gnosis-mainnet', 'coingecko_id': 'xdai', 'symbol': 'xDAI'},
-    'celo': {'explorer_url': 'https://celoscan.io', 'rpc_subdomain': 'celo-mainnet', 'coingecko_id': 'celo', 'symbol': 'CELO'},
-    'astar': {'explorer_url': 'https://astar.subscan.io', 'rpc_subdomain': 'astar-mainnet', 'coingecko_id': 'astar', 'symbol': 'ASTR'},
-    'metis': {'explorer_url': 'https://andromeda-explorer.metis.io', 'rpc_subdomain': 'metis-mainnet', 'coingecko_id': 'metis-token', 'symbol': 'METIS'},
-    'degen': {'explorer_url': 'https://explorer.degen.tips', 'rpc_subdomain': 'degen-mainnet', 'coingecko_id': 'degen-base', 'symbol': 'DEGEN'},
-    'opbnb': {'explorer_url': 'https://opbnb.bscscan.com', 'rpc_subdomain': 'opbnb-mainnet', 'coingecko_id': 'binancecoin', 'symbol': 'BNB'},
-}
\ No newline at end of file
+    'ethereum': {'explorer_url': 'https://etherscan.io', 'rpc_subdomain': 'eth-mainnet', 'coingecko_id': 'ethereum', 'symbol': 'ETH', 'block_time': 12, 'confirmations': 3},
+    'arbitrum': {'explorer_url': 'https://arbiscan.io', 'rpc_subdomain': 'arb-mainnet', 'coingecko_id': 'ethereum', 'symbol': 'ETH', 'block_time': 0.25, 'confirmations': 20},
+    'optimism': {'explorer_url': 'https://optimistic.etherscan.io', 'rpc_subdomain': 'opt-mainnet', 'coingecko_id': 'ethereum', 'symbol': 'ETH', 'block_time': 2, 'confirmations': 5},
+    'base': {'explorer_url': 'https://basescan.org', 'rpc_subdomain': 'base-mainnet', 'coingecko_id': 'ethereum', 'symbol': 'ETH', 'block_time': 2, 'confirmations': 5},
+    'zksync': {'explorer_url': 'https://explorer.zksync.io', 'rpc_subdomain': 'zksync-mainnet', 'coingecko_id': 'ethereum', 'symbol': 'ETH', 'block_time': 1, 'confirmations': 5},
+    'linea': {'explorer_url': 'https://lineascan.build', 'rpc_subdomain': 'linea-mainnet', 'coingecko_id': 'ethereum', 'symbol': 'ETH', 'block_time': 2, 'confirmations': 5},
+    'scroll': {'explorer_url': 'https://scrollscan.com', 'rpc_subdomain': 'scroll-mainnet', 'coingecko_id': 'ethereum', 'symbol': 'ETH', 'block_time': 3, 'confirmations': 5},
+    'blast': {'explorer_url': 'https://blastscan.io', 'rpc_subdomain': 'blast-mainnet', 'coingecko_id': 'ethereum', 'symbol': 'ETH', 'block_time': 2, 'confirmations': 5},
+    'zora': {'explorer_url': 'https://explorer.zora.energy', 'rpc_subdomain': 'zora-mainnet', 'coingecko_id': 'ethereum', 'symbol': 'ETH', 'block_time': 2, 'confirmations': 5},
+    'polygon': {'explorer_url': 'https://polygonscan.com', 'rpc_subdomain': 'polygon-mainnet', 'coingecko_id': 'matic-network', 'symbol': 'MATIC', 'block_time': 2, 'confirmations': 32},
+    'bsc': {'explorer_url': 'https://bscscan.com', 'rpc_subdomain': 'bsc-mainnet', 'coingecko_id': 'binancecoin', 'symbol': 'BNB', 'block_time': 3, 'confirmations': 15},
+    'avalanche': {'explorer_url': 'https://snowtrace.io', 'rpc_subdomain': 'avax-mainnet', 'coingecko_id': 'avalanche-2', 'symbol': 'AVAX', 'block_time': 2, 'confirmations': 1},
+    'fantom': {'explorer_url': 'https://ftmscan.com', 'rpc_subdomain': 'fantom-mainnet', 'coingecko_id': 'fantom', 'symbol': 'FTM', 'block_time': 1, 'confirmations': 1},
+    'mantle': {'explorer_url': 'https://mantlescan.xyz', 'rpc_subdomain': 'mantle-mainnet', 'coingecko_id': 'mantle', 'symbol': 'MNT', 'block_time': 2, 'confirmations': 5},
+    'cronos': {'explorer_url': 'https://cronoscan.com', 'rpc_subdomain': 'cronos-mainnet', 'coingecko_id': 'crypto-com-chain', 'symbol': 'CRO', 'block_time': 6, 'confirmations': 3},
+    'gnosis': {'explorer_url': 'https://gnosisscan.io', 'rpc_subdomain': 'gnosis-mainnet', 'coingecko_id': 'xdai', 'symbol': 'xDAI', 'block_time': 5, 'confirmations': 8},
+    'celo': {'explorer_url': 'https://celoscan.io', 'rpc_subdomain': 'celo-mainnet', 'coingecko_id': 'celo', 'symbol': 'CELO', 'block_time': 5, 'confirmations': 3},
+    'astar': {'explorer_url': 'https://astar.subscan.io', 'rpc_subdomain': 'astar-mainnet', 'coingecko_id': 'astar', 'symbol': 'ASTR', 'block_time': 12, 'confirmations': 3},
+    'metis': {'explorer_url': 'https://andromeda-explorer.metis.io', 'rpc_subdomain': 'metis-mainnet', 'coingecko_id': 'metis-token', 'symbol': 'METIS', 'block_time': 4, 'confirmations': 5},
+    'degen': {'explorer_url': 'https://explorer.degen.tips', 'rpc_subdomain': 'degen-mainnet', 'coingecko_id': 'degen-base', 'symbol': 'DEGEN', 'block_time': 2, 'confirmations': 5},
+    'opbnb': {'explorer_url': 'https://opbnb.bscscan.com', 'rpc_subdomain': 'opbnb-mainnet', 'coingecko_id': 'binancecoin', 'symbol': 'BNB', 'block_time': 1, 'confirmations': 15},
+}
+
+# Alamat yang dihargai sebagai koin native jaringan, selain alamat nol (berlaku di semua jaringan)
+NATIVE_TOKEN_ALIASES = {
+    'ethereum': ['0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2'],  # WETH
+    'polygon': ['0x0000000000000000000000000000000000001010'],  # MATIC
+}
+
+# Id asset platform CoinGecko per jaringan, untuk harga token via /simple/token_price/{platform}
+COINGECKO_ASSET_PLATFORMS = {
+    'ethereum': 'ethereum',
+    'arbitrum': 'arbitrum-one',
+    'optimism': 'optimistic-ethereum',
+    'base': 'base',
+    'zksync': 'zksync',
+    'linea': 'linea',
+    'scroll': 'scroll',
+    'blast': 'blast',
+    'zora': 'zora-network',
+    'polygon': 'polygon-pos',
+    'bsc': 'binance-smart-chain',
+    'avalanche': 'avalanche',
+    'fantom': 'fantom',
+    'mantle': 'mantle',
+    'cronos': 'cronos',
+    'gnosis': 'xdai',
+    'celo': 'celo',
+    'astar': 'astar',
+    'metis': 'metis-andromeda',
+    'degen': 'degen',
+    'opbnb': 'opbnb',
+}
+
+# Pool DEX untuk harga on-chain token yang tidak terdaftar di CoinGecko (lihat dex_pricer.py).
+# 'quotes': aset pembanding (alamat, desimal, 'usd' untuk stablecoin atau 'native' untuk wrapped native).
+# 'v2_factories': factory gaya Uniswap V2 (getPair); 'v3_factories': (factory, fee tier) gaya Uniswap V3 (getPool).
+DEX_CONFIG = {
+    'ethereum': {
+        'quotes': [('0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2', 18, 'native'), ('0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48', 6, 'usd')],
+        'v2_factories': ['0x5c69bee701ef814a2b6a3edd4b1652cb9cc5aa6f', '0xc0aee478e3658e2610c5f7a4a2e1777ce9e4f2ac'],
+        'v3_factories': [('0x1f98431c8ad98523631ae4a59f267346ea31f984', (500, 3000, 10000))],
+    },
+    'arbitrum': {
+        'quotes': [('0x82af49447d8a07e3bd95bd0d56f35241523fbab1', 18, 'native'), ('0xaf88d065e77c8cc2239327c5edb3a432268e5831', 6, 'usd')],
+        'v2_factories': ['0xc35dadb65012ec5796536bd9864ed8773abc74c4'],
+        'v3_factories': [('0x1f98431c8ad98523631ae4a59f267346ea31f984', (500, 3000, 10000))],
+    },
+    'optimism': {
+        'quotes': [('0x4200000000000000000000000000000000000006', 18, 'native'), ('0x0b2c639c533813f4aa9d7837caf62653d097ff85', 6, 'usd')],
+        'v2_factories': [],
+        'v3_factories': [('0x1f98431c8ad98523631ae4a59f267346ea31f984', (500, 3000, 10000))],
+    },
+    'base': {
+        'quotes': [('0x4200000000000000000000000000000000000006', 18, 'native'), ('0x833589fcd6edb6e08f4c7c32d4f71b54bda02913', 6, 'usd')],
+        'v2_factories': ['0x8909dc15e40173ff4699343b6eb8132c65e18ec6'],
+        'v3_factories': [('0x33128a8fc17869897dce68ed026d694621f6fdfd', (500, 3000, 10000))],
+    },
+    'polygon': {
+        'quotes': [('0x0d500b1d8e8ef31e21c99d1db9a6444d3adf1270', 18, 'native'), ('0x3c499c542cef5e3811e1192ce70d8cc03d5c3359', 6, 'usd')],
+        'v2_factories': ['0x5757371414417b8c6caad45baef941abc7d3ab32'],
+        'v3_factories': [('0x1f98431c8ad98523631ae4a59f267346ea31f984', (500, 3000, 10000))],
+    },
+    'bsc': {
+        'quotes': [('0xbb4cdb9cbd36b01bd1cbaebf2de08d9173bc095c', 18, 'native'), ('0x55d398326f99059ff775485246999027b3197955', 18, 'usd')],
+        'v2_factories': ['0xca143ce32fe78f1f7019d7d551a6402fc5350c73'],
+        'v3_factories': [('0x0bfbcf9fa4f9c56b0f40a671ad40e0805a091865', (100, 500, 2500, 10000))],
+    },
+}
@@ -2,6 +2,7 @@
 
 import sqlite3
 import os
+import time
 from datetime import datetime
 
 # --- PERBAIKAN PATH ABSOLUT ---
@@ -16,6 +17,31 @@ def get_db_connection():
     conn.row_factory = sqlite3.Row
     return conn
 
+def _add_column_if_missing(cursor, table, column, definition):
+    """Migrasi sederhana: tambahkan kolom baru ke tabel lama yang sudah ada."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [row['name'] for row in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def _migrate_wallets_unique(cursor):
+    """Tabel wallets lama memakai UNIQUE pada address saja; SQLite tidak bisa melepas constraint, jadi tabel dibangun ulang."""
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'wallets'")
+    if 'address TEXT NOT NULL UNIQUE' not in cursor.fetchone()['sql']:
+        return
+    cursor.execute('''
+        CREATE TABLE wallets_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            chain TEXT NOT NULL,
+            address TEXT NOT NULL,
+            alias TEXT,
+            UNIQUE (user_id, chain, address)
+        )
+    ''')
+    cursor.execute('INSERT INTO wallets_new (id, user_id, chain, address, alias) SELECT id, user_id, chain, address, alias FROM wallets')
+    cursor.execute('DROP TABLE wallets')
+    cursor.execute('ALTER TABLE wallets_new RENAME TO wallets')
+
 def setup_database():
     """
     Membuat semua tabel yang diperlukan untuk bot.
@@ -24,16 +50,18 @@ def setup_database():
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    # Tabel untuk manajemen wallet
+    # Tabel untuk manajemen wallet; alamat yang sama boleh dipantau banyak pengguna (dan di banyak jaringan)
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS wallets (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_id INTEGER NOT NULL,
             chain TEXT NOT NULL,
-            address TEXT NOT NULL UNIQUE,
-            alias TEXT
+            address TEXT NOT NULL,
+            alias TEXT,
+            UNIQUE (user_id, chain, address)
         );
     ''')
+    _migrate_wallets_unique(cursor)
     
     # Tabel untuk menyimpan alert harga user
     cursor.execute('''
@@ -43,7 +71,7 @@ def setup_database():
             token_address TEXT NOT NULL,
             token_symbol TEXT NOT NULL,
             chain TEXT NOT NULL,
-            alert_type TEXT NOT NULL, -- 'above', 'below', 'percent'
+            alert_type TEXT NOT NULL, -- 'above', 'below', 'percent', 'window'
             target_price REAL,
             target_percentage REAL,
             is_active BOOLEAN NOT NULL DEFAULT 1,
@@ -52,6 +80,13 @@ def setup_database():
             triggered_at TIMESTAMP
         )
     ''')
+    # Versi perubahan alert (naik setiap create/delete/trigger), dibaca price_monitor sebagai change feed
+    _add_column_if_missing(cursor, 'price_alerts', 'version', 'INTEGER NOT NULL DEFAULT 0')
+    # Harga token saat alert dibuat, baseline untuk alert persen
+    _add_column_if_missing(cursor, 'price_alerts', 'created_price', 'REAL')
+    # Panjang jendela (menit) untuk alert 'window': bergerak target_percentage % dalam sekian menit
+    _add_column_if_missing(cursor, 'price_alerts', 'window_minutes', 'INTEGER')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_price_alerts_version ON price_alerts (version)')
     
     # Tabel untuk log notifikasi yang sudah dikirim
     cursor.execute('''
@@ -84,6 +119,82 @@ def setup_database():
             notify_on_airdrop BOOLEAN DEFAULT 1
         )
     ''')
+    # Pengelompokan notifikasi: album foto, atau satu ringkasan teks jika jumlahnya melewati batas
+    _add_column_if_missing(cursor, 'user_settings', 'group_notifications', 'BOOLEAN DEFAULT 1')
+    _add_column_if_missing(cursor, 'user_settings', 'digest_threshold', 'INTEGER DEFAULT 10')
+
+    # Tabel untuk posisi blok terakhir yang sudah diproses monitor per jaringan
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS chain_cursors (
+            chain TEXT PRIMARY KEY,
+            last_block INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Log perubahan wallet & pengaturan, dibaca monitor untuk memperbarui indeks di memori
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS watch_changes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL, -- 'wallet_added', 'wallet_removed', 'settings_updated'
+            user_id INTEGER NOT NULL,
+            chain TEXT,
+            address TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # Posisi terakhir yang sudah diterapkan setiap pembaca watch_changes, dasar pembersihan log
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS watch_change_consumers (
+            consumer TEXT PRIMARY KEY,
+            last_change_id INTEGER NOT NULL,
+            updated_at INTEGER NOT NULL
+        )
+    ''')
+
+    # Antrean pengiriman Telegram yang belum terkirim, agar tidak hilang saat restart
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pending_deliveries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            queue_name TEXT NOT NULL,
+            chat_id INTEGER NOT NULL,
+            kind TEXT NOT NULL, -- 'photo', 'message'
+            payload TEXT NOT NULL,
+            photo BLOB,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_pending_deliveries_queue ON pending_deliveries (queue_name, id)')
+
+    # Indeks dedup notifikasi monitor: hash 64-bit dari (chain, tx hash, log index, user)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sent_notifications (
+            key INTEGER PRIMARY KEY,
+            created_at INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sent_notifications_created ON sent_notifications (created_at)')
+
+    # Riwayat transfer hasil backfill untuk wallet yang baru ditambahkan
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS transfer_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chain TEXT NOT NULL,
+            address TEXT NOT NULL,
+            unique_id TEXT NOT NULL,
+            tx_hash TEXT NOT NULL,
+            block_num INTEGER NOT NULL,
+            from_addr TEXT,
+            to_addr TEXT,
+            asset TEXT,
+            value REAL,
+            category TEXT,
+            block_timestamp TEXT,
+            UNIQUE (chain, address, unique_id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_transfer_history_wallet ON transfer_history (chain, address, block_num)')
     
     conn.commit()
     conn.close()
@@ -100,10 +211,11 @@ def add_wallet(user_id, address, chain, alias):
     try:
         cursor = conn.cursor()
         cursor.execute(sql, params)
+        _log_watch_change(cursor, 'wallet_added', user_id, chain, address.lower())
         conn.commit()
         return True
     except sqlite3.IntegrityError:
-        print(f"Gagal menambahkan dompet: Alamat {address} sudah ada.")
+        print(f"Gagal menambahkan dompet: Alamat {address} di {chain} sudah dipantau pengguna ini.")
         return False
     except sqlite3.Error as e:
         print(f"Error saat menambahkan dompet: {e}")
@@ -144,8 +256,12 @@ def remove_wallet_by_id(wallet_id, user_id):
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
+        cursor.execute('SELECT address, chain FROM wallets WHERE id = ? AND user_id = ?', (wallet_id, user_id))
+        wallet = cursor.fetchone()
         cursor.execute('DELETE FROM wallets WHERE id = ? AND user_id = ?', (wallet_id, user_id))
         success = cursor.rowcount > 0
+        if success and wallet:
+            _log_watch_change(cursor, 'wallet_removed', user_id, wallet['chain'], wallet['address'])
         conn.commit()
         return success
     except sqlite3.Error as e:
@@ -154,9 +270,232 @@ def remove_wallet_by_id(wallet_id, user_id):
     finally:
         conn.close()
 
+def get_all_wallet_subscriptions():
+    """Mengambil semua pasangan (chain, address, user_id) untuk membangun indeks monitor."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT chain, address, user_id FROM wallets')
+        return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        print(f"Error mengambil semua langganan dompet: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+# --- FUNGSI-FUNGSI UNTUK LOG PERUBAHAN (CHANGE FEED) MONITOR ---
+
+def _log_watch_change(cursor, kind, user_id, chain=None, address=None):
+    """Mencatat perubahan di transaksi yang sama dengan perubahan datanya."""
+    cursor.execute(
+        'INSERT INTO watch_changes (kind, user_id, chain, address) VALUES (?, ?, ?, ?)',
+        (kind, user_id, chain, address)
+    )
+
+def get_latest_watch_change_id():
+    """Mengambil id perubahan terakhir (0 jika belum ada)."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT COALESCE(MAX(id), 0) AS last_id FROM watch_changes')
+        return cursor.fetchone()['last_id']
+    except sqlite3.Error as e:
+        print(f"Error mengambil id perubahan terakhir: {e}")
+        return 0
+    finally:
+        conn.close()
+
+def get_watch_changes_since(last_id):
+    """Mengambil semua perubahan wallet/pengaturan setelah id tertentu, berurutan."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, kind, user_id, chain, address FROM watch_changes WHERE id > ? ORDER BY id', (last_id,))
+        return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        print(f"Error mengambil perubahan: {e}")
+        return None
+    finally:
+        conn.close()
+
+def get_oldest_watch_change_id():
+    """Mengambil id perubahan tertua yang masih tersimpan (None jika log kosong)."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT MIN(id) AS first_id FROM watch_changes')
+        return cursor.fetchone()['first_id']
+    except sqlite3.Error as e:
+        print(f"Error mengambil id perubahan tertua: {e}")
+        return None
+    finally:
+        conn.close()
+
+def ack_watch_changes(consumer, last_id, stale_after):
+    """
+    Mencatat posisi `consumer` di log perubahan, lalu menghapus perubahan yang sudah diterapkan semua
+    pembaca. Pembaca yang tidak melapor selama `stale_after` detik diabaikan (pembaca itu akan memuat
+    ulang indeksnya saat kembali). Baris `last_id` sendiri disimpan agar MAX(id) tidak mundur.
+    Mengembalikan jumlah baris terhapus.
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        now = int(time.time())
+        cursor.execute('''
+            INSERT INTO watch_change_consumers (consumer, last_change_id, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT (consumer) DO UPDATE SET last_change_id = excluded.last_change_id, updated_at = excluded.updated_at
+        ''', (consumer, last_id, now))
+        cursor.execute('DELETE FROM watch_change_consumers WHERE updated_at < ?', (now - stale_after,))
+        cursor.execute('''
+            DELETE FROM watch_changes
+            WHERE id < (SELECT MIN(last_change_id) FROM watch_change_consumers)
+        ''')
+        removed = cursor.rowcount
+        conn.commit()
+        return removed
+    except sqlite3.Error as e:
+        print(f"Error mencatat posisi log perubahan: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+# --- FUNGSI-FUNGSI UNTUK CURSOR BLOK MONITOR ---
+
+def get_chain_cursor(chain):
+    """Mengambil nomor blok terakhir yang sudah diproses untuk satu jaringan (None jika belum ada)."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT last_block FROM chain_cursors WHERE chain = ?', (chain,))
+        row = cursor.fetchone()
+        return row['last_block'] if row else None
+    except sqlite3.Error as e:
+        print(f"Error mengambil cursor jaringan {chain}: {e}")
+        return None
+    finally:
+        conn.close()
+
+def set_chain_cursor(chain, last_block):
+    """Menyimpan nomor blok terakhir yang sudah diproses untuk satu jaringan."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO chain_cursors (chain, last_block, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(chain) DO UPDATE SET last_block = excluded.last_block, updated_at = excluded.updated_at
+        ''', (chain, last_block))
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"Error menyimpan cursor jaringan {chain}: {e}")
+        return False
+    finally:
+        conn.close()
+
+def delete_chain_cursor(chain):
+    """Menghapus cursor jaringan, sehingga worker berikutnya mulai dari head (bukan catch-up)."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM chain_cursors WHERE chain = ?', (chain,))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error menghapus cursor jaringan {chain}: {e}")
+    finally:
+        conn.close()
+
+
+# --- FUNGSI-FUNGSI UNTUK DEDUP NOTIFIKASI MONITOR ---
+
+def get_sent_notification_keys(keys):
+    """
+    Mengembalikan bagian dari `keys` yang sudah tercatat (notifikasinya sudah masuk antrean pengiriman).
+    Hanya membaca; kunci dicatat oleh add_pending_delivery() bersama item antreannya.
+    Jika database gagal, dikembalikan set kosong (lebih baik kirim ganda daripada tidak terkirim).
+    """
+    keys = list(keys)
+    if not keys:
+        return set()
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        placeholders = ','.join('?' * len(keys))
+        cursor.execute(f'SELECT key FROM sent_notifications WHERE key IN ({placeholders})', keys)
+        return {row['key'] for row in cursor.fetchall()}
+    except sqlite3.Error as e:
+        print(f"Error membaca dedup notifikasi: {e}")
+        return set()
+    finally:
+        conn.close()
+
+def prune_notification_keys(max_age_seconds):
+    """Menghapus kunci dedup yang lebih tua dari batas retensi. Mengembalikan jumlah baris terhapus."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM sent_notifications WHERE created_at < ?', (int(time.time()) - max_age_seconds,))
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        print(f"Error membersihkan dedup notifikasi: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+# --- FUNGSI-FUNGSI UNTUK RIWAYAT TRANSFER (BACKFILL) ---
+
+def save_transfer_history(chain, address, transfers):
+    """Menyimpan satu halaman transfer getAssetTransfers; transfer yang sudah ada dilewati."""
+    rows = [
+        (
+            chain, address.lower(), tx.get('uniqueId') or tx['hash'], tx['hash'], int(tx.get('blockNum', '0x0'), 16),
+            tx.get('from'), tx.get('to'), tx.get('asset'), tx.get('value'), tx.get('category'),
+            (tx.get('metadata') or {}).get('blockTimestamp'),
+        )
+        for tx in transfers
+    ]
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT OR IGNORE INTO transfer_history
+                (chain, address, unique_id, tx_hash, block_num, from_addr, to_addr, asset, value, category, block_timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"Error menyimpan riwayat transfer {address}: {e}")
+        return False
+    finally:
+        conn.close()
+
+def get_transfer_history(chain, address, limit=20):
+    """Mengambil transfer terbaru dari riwayat sebuah wallet."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT * FROM transfer_history WHERE chain = ? AND address = ? ORDER BY block_num DESC, id DESC LIMIT ?',
+            (chain, address.lower(), limit)
+        )
+        return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        print(f"Error mengambil riwayat transfer {address}: {e}")
+        return []
+    finally:
+        conn.close()
+
 
 # --- FUNGSI-FUNGSI UNTUK PRICE ALERT ---
 
+# Versi berikutnya dihitung di dalam statement tulis itu sendiri, sehingga urutan versi sama dengan urutan commit
+_NEXT_ALERT_VERSION = '(SELECT COALESCE(MAX(version), 0) + 1 FROM price_alerts)'
+
 def get_popular_alert_tokens(limit=10): #<-- Diubah menjadi 10
     """
     Mengambil daftar token yang paling banyak memiliki alert aktif dari semua pengguna.
@@ -185,8 +524,10 @@ def get_popular_alert_tokens(limit=10): #<-- Diubah menjadi 10
 def create_price_alert(alert_data):
     """Buat alert harga baru"""
     sql = '''
-        INSERT INTO price_alerts (user_id, token_address, token_symbol, chain, alert_type, target_price, target_percentage)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
+        INSERT INTO price_alerts (
+            user_id, token_address, token_symbol, chain, alert_type, target_price, target_percentage, created_price, window_minutes, version
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ''' + _NEXT_ALERT_VERSION + ''')
     '''
     params = (
         alert_data['user_id'],
@@ -195,7 +536,9 @@ def create_price_alert(alert_data):
         alert_data['chain'].lower(),
         alert_data['alert_type'],
         alert_data.get('target_price'),
-        alert_data.get('target_percentage')
+        alert_data.get('target_percentage'),
+        alert_data.get('created_price'),
+        alert_data.get('window_minutes')
     )
     conn = get_db_connection()
     try:
@@ -216,7 +559,7 @@ def get_user_active_alerts(user_id):
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute('''
-        SELECT id, token_symbol, chain, alert_type, target_price, target_percentage
+        SELECT id, token_symbol, chain, alert_type, target_price, target_percentage, window_minutes
         FROM price_alerts 
         WHERE user_id = ? AND is_active = 1 AND is_triggered = 0
         ORDER BY created_at DESC
@@ -230,7 +573,10 @@ def delete_price_alert(alert_id, user_id):
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
-        cursor.execute('UPDATE price_alerts SET is_active = 0 WHERE id = ? AND user_id = ?', (alert_id, user_id))
+        cursor.execute(
+            f'UPDATE price_alerts SET is_active = 0, version = {_NEXT_ALERT_VERSION} WHERE id = ? AND user_id = ?',
+            (alert_id, user_id)
+        )
         success = cursor.rowcount > 0
         conn.commit()
         return success
@@ -240,6 +586,140 @@ def delete_price_alert(alert_id, user_id):
     finally:
         conn.close()
 
+def get_all_active_alerts():
+    """Ambil semua alert yang masih aktif dan belum ter-trigger (dipakai price_monitor)."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, user_id, token_address, token_symbol, chain, alert_type, target_price, target_percentage, created_price,
+                   window_minutes, created_at
+            FROM price_alerts
+            WHERE is_active = 1 AND is_triggered = 0
+        ''')
+        return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        print(f"Error mengambil alert aktif: {e}")
+        return []
+    finally:
+        conn.close()
+
+def get_latest_alert_version():
+    """Versi perubahan alert terakhir (0 jika belum ada), atau None jika gagal dibaca."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT COALESCE(MAX(version), 0) AS version FROM price_alerts')
+        return cursor.fetchone()['version']
+    except sqlite3.Error as e:
+        print(f"Error mengambil versi alert terakhir: {e}")
+        return None
+    finally:
+        conn.close()
+
+def get_alert_changes_since(version, limit):
+    """
+    Alert yang berubah setelah `version`, berurutan menurut versi (maksimal `limit` baris).
+    Mengembalikan None jika gagal dibaca, agar pemanggil tidak mengira tidak ada perubahan.
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, user_id, token_address, token_symbol, chain, alert_type, target_price, target_percentage,
+                   created_price, window_minutes, created_at, is_active, is_triggered, version
+            FROM price_alerts
+            WHERE version > ?
+            ORDER BY version
+            LIMIT ?
+        ''', (version, limit))
+        return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        print(f"Error mengambil perubahan alert: {e}")
+        return None
+    finally:
+        conn.close()
+
+def set_alert_created_price(alert_id, price):
+    """Isi baseline alert lama yang dibuat sebelum harga awal dicatat (tidak menimpa nilai yang ada)."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('UPDATE price_alerts SET created_price = ? WHERE id = ? AND created_price IS NULL', (price, alert_id))
+        conn.commit()
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        print(f"Error mengisi harga awal alert {alert_id}: {e}")
+        return False
+    finally:
+        conn.close()
+
+def claim_price_alerts(claims):
+    """
+    Klaim sekumpulan alert yang kondisinya terpenuhi dalam satu transaksi: setiap alert hanya berhasil
+    diklaim satu kali (UPDATE bersyarat is_triggered = 0), sehingga beberapa replika price_monitor tidak
+    pernah mengirim notifikasi ganda. `claims` berisi (alert_id, harga saat trigger).
+    Mengembalikan set alert_id yang berhasil diklaim proses ini, atau None jika gagal (tidak ada yang diklaim).
+    """
+    if not claims:
+        return set()
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        # Kunci tulis diambil di awal agar transaksi tidak gagal di tengah karena replika lain ikut menulis
+        cursor.execute('BEGIN IMMEDIATE')
+        claimed = set()
+        for alert_id, _ in claims:
+            # Satu UPDATE per alert agar setiap alert mendapat versi sendiri di feed perubahan
+            cursor.execute(
+                f'UPDATE price_alerts SET is_triggered = 1, triggered_at = CURRENT_TIMESTAMP, version = {_NEXT_ALERT_VERSION} '
+                'WHERE id = ? AND is_active = 1 AND is_triggered = 0 RETURNING id',
+                (alert_id,)
+            )
+            row = cursor.fetchone()
+            if row:
+                claimed.add(row['id'])
+        if claimed:
+            today = datetime.now().date()
+            cursor.execute(
+                'UPDATE alert_statistics SET total_alerts_triggered = total_alerts_triggered + ? WHERE date = ?',
+                (len(claimed), today)
+            )
+            if cursor.rowcount == 0:
+                cursor.execute(
+                    'INSERT INTO alert_statistics (date, total_alerts_created, total_alerts_triggered) VALUES (?, 0, ?)',
+                    (today, len(claimed))
+                )
+        conn.commit()
+        return claimed
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error klaim {len(claims)} alert: {e}")
+        return None
+    finally:
+        conn.close()
+
+def trigger_price_alert(alert_id, triggered_price):
+    """Tandai alert sebagai ter-trigger. Mengembalikan False jika alert sudah tidak aktif atau sudah diklaim."""
+    return alert_id in (claim_price_alerts([(alert_id, triggered_price)]) or ())
+
+def log_alert_notification(alert_id, user_id, notification_type, message_text):
+    """Catat notifikasi alert yang sudah terkirim."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            'INSERT INTO alert_notifications (alert_id, user_id, message_text) VALUES (?, ?, ?)',
+            (alert_id, user_id, f"[{notification_type}] {message_text}")
+        )
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"Error mencatat notifikasi alert: {e}")
+        return False
+    finally:
+        conn.close()
+
 def get_active_chains():
     """Mengambil daftar unik semua 'chain' yang memiliki alert aktif untuk efisiensi monitoring."""
     conn = get_db_connection()
@@ -271,6 +751,28 @@ def get_user_settings(user_id):
     conn.close()
     return dict(settings)
 
+def get_settings_for_users(user_ids):
+    """Mengambil pengaturan banyak pengguna sekaligus (pengguna tanpa baris tidak disertakan)."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        settings = {}
+        # Dipecah agar tidak melewati batas jumlah parameter SQLite
+        for i in range(0, len(user_ids), 500):
+            chunk = user_ids[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f"SELECT * FROM user_settings WHERE user_id IN ({placeholders})", chunk)
+            settings.update({row['user_id']: dict(row) for row in cursor.fetchall()})
+        return settings
+    except sqlite3.Error as e:
+        print(f"Error mengambil pengaturan pengguna: {e}")
+        return {}
+    finally:
+        conn.close()
+
 def update_user_setting(user_id, key, value):
     """Memperbarui satu pengaturan spesifik untuk pengguna."""
     conn = get_db_connection()
@@ -278,6 +780,7 @@ def update_user_setting(user_id, key, value):
         cursor = conn.cursor()
         sql = f"UPDATE user_settings SET {key} = ? WHERE user_id = ?"
         cursor.execute(sql, (value, user_id))
+        _log_watch_change(cursor, 'settings_updated', user_id)
         conn.commit()
         return True
     except sqlite3.Error as e:
@@ -287,6 +790,84 @@ def update_user_setting(user_id, key, value):
         conn.close()
 
 
+# --- FUNGSI-FUNGSI UNTUK ANTREAN PENGIRIMAN TELEGRAM ---
+
+def add_pending_delivery(queue_name, chat_id, kind, payload, photo=None, dedup_keys=(), replaces=()):
+    """
+    Simpan satu item pengiriman. Kunci dedup notifikasi (`dedup_keys`) dicatat di transaksi yang sama,
+    jadi notifikasi dianggap terkirim tepat saat itemnya tersimpan di antrean: crash sebelum titik ini
+    membuat transfer diproses ulang, crash sesudahnya dipulihkan dari antrean.
+    `replaces` berisi id item tertahan yang digantikan item ini (misalnya beberapa foto yang digabung
+    menjadi album); item-item itu dihapus di transaksi yang sama.
+    Mengembalikan id baris; 0 jika semua `dedup_keys` sudah pernah tercatat (tidak ada yang disimpan);
+    None jika gagal.
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        if dedup_keys:
+            now = int(time.time())
+            new_keys = 0
+            for key in dedup_keys:
+                cursor.execute('INSERT OR IGNORE INTO sent_notifications (key, created_at) VALUES (?, ?)', (key, now))
+                new_keys += cursor.rowcount
+            if not new_keys:
+                conn.rollback()
+                return 0
+        cursor.execute(
+            'INSERT INTO pending_deliveries (queue_name, chat_id, kind, payload, photo) VALUES (?, ?, ?, ?, ?)',
+            (queue_name, chat_id, kind, payload, photo)
+        )
+        delivery_id = cursor.lastrowid
+        if replaces:
+            cursor.executemany('DELETE FROM pending_deliveries WHERE id = ?', [(old_id,) for old_id in replaces])
+        conn.commit()
+        return delivery_id
+    except sqlite3.Error as e:
+        print(f"Error menyimpan antrean pengiriman: {e}")
+        return None
+    finally:
+        conn.close()
+
+def update_pending_delivery_attempts(delivery_id, attempts):
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('UPDATE pending_deliveries SET attempts = ? WHERE id = ?', (attempts, delivery_id))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error memperbarui antrean pengiriman: {e}")
+    finally:
+        conn.close()
+
+def delete_pending_delivery(delivery_id):
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM pending_deliveries WHERE id = ?', (delivery_id,))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error menghapus antrean pengiriman: {e}")
+    finally:
+        conn.close()
+
+def get_pending_deliveries(queue_name):
+    """Ambil semua item yang belum terkirim untuk satu antrean, urut dari yang terlama."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT id, chat_id, kind, payload, photo, attempts FROM pending_deliveries WHERE queue_name = ? ORDER BY id',
+            (queue_name,)
+        )
+        return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        print(f"Error mengambil antrean pengiriman: {e}")
+        return []
+    finally:
+        conn.close()
+
+
 # --- FUNGSI-FUNGSI UNTUK STATISTIK ---
 
 def update_daily_alert_stats(action_type):
@@ -309,3 +890,6 @@ def update_daily_alert_stats(action_type):
     finally:
         conn.close()
 
+def setup_enhanced_database():
+    """Alias untuk price_monitor; semua tabel dibuat oleh setup_database()."""
+    setup_database()
@@ -0,0 +1,393 @@
+# delivery.py
+# Antrean pengiriman Telegram terpusat: rate limit global & per chat, retry, dan persistensi.
+# Loop deteksi cukup meng-await enqueue_*(), yang hanya menunggu item tersimpan (di thread terpisah),
+# tidak pernah menunggu pengiriman selesai.
+
+import asyncio
+import base64
+import json
+import logging
+import random
+import time
+from collections import OrderedDict
+
+from telegram import InputMediaPhoto
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+import database
+
+# Batas Telegram: sekitar 30 pesan/detik untuk seluruh bot dan 1 pesan/detik per chat
+GLOBAL_RATE = 30
+GLOBAL_BURST = 30
+PER_CHAT_RATE = 1
+PER_CHAT_BURST = 3
+MAX_ATTEMPTS = 6
+MAX_BACKOFF = 300
+DEFAULT_WORKERS = 8
+DEPTH_LOG_INTERVAL = 60
+# Jumlah file_id foto terakhir yang diingat untuk dipakai ulang
+FILE_ID_CACHE_SIZE = 5000
+# Batas Telegram untuk satu album (send_media_group)
+MAX_MEDIA_GROUP_SIZE = 10
+
+
+class TokenBucket:
+    """Token bucket sederhana; `wait_time()` mengembalikan berapa detik harus menunggu."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        """Detik sampai satu token tersedia (0 jika tersedia sekarang), tanpa mengambilnya."""
+        self._refill(time.monotonic())
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill(time.monotonic())
+        self.tokens -= 1
+
+    def idle(self):
+        """True jika bucket sudah penuh kembali (boleh dibuang dari memori)."""
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+
+class DeliveryQueue:
+    def __init__(self, bot, queue_name, workers=DEFAULT_WORKERS, on_sent=None):
+        self.bot = bot
+        self.queue_name = queue_name
+        self.workers = workers
+        self.on_sent = on_sent
+        self.queue = asyncio.Queue()
+        self.global_bucket = TokenBucket(GLOBAL_RATE, GLOBAL_BURST)
+        self.chat_buckets = {}
+        self.paused_until = 0
+        self.scheduled = 0
+        self.started = False
+        self.restored_up_to = 0  # id tertinggi yang dimuat start(); item sampai id ini sudah ada di antrean
+        self._tasks = []
+        # cache_key -> file_id Telegram dari foto yang sudah pernah diunggah (LRU)
+        self.file_ids = OrderedDict()
+        # cache_key -> (item yang sedang mengunggah, item lain yang menunggu file_id-nya)
+        self.uploads = {}
+
+    # --- API untuk produsen (detektor) ---
+
+    async def enqueue_photo(self, chat_id, photo, caption=None, parse_mode='HTML', context=None, cache_key=None, dedup_keys=()):
+        """
+        `cache_key` menandai foto yang isinya sama (misalnya kuitansi transfer yang sama untuk banyak
+        pengguna): foto hanya diunggah sekali, penerima lain dikirimi file_id hasil unggahan itu.
+        `dedup_keys` dicatat atomik bersama item (lihat database.add_pending_delivery); jika semuanya
+        sudah tercatat, item tidak disimpan dan 0 dikembalikan.
+        """
+        payload = {'caption': caption, 'parse_mode': parse_mode, 'context': context, 'cache_key': cache_key}
+        return await self._enqueue(chat_id, 'photo', payload, photo, dedup_keys)
+
+    async def enqueue_media_group(self, chat_id, photos, captions, cache_keys, parse_mode='HTML', dedup_keys=(), replaces=()):
+        """
+        Album 2-10 foto dalam satu panggilan API. Foto disimpan base64 di payload agar ikut dipulihkan.
+        `replaces` berisi item tertahan (hold_*) yang digantikan album ini.
+        """
+        payload = {
+            'photos': [base64.b64encode(photo).decode() for photo in photos],
+            'captions': captions, 'cache_keys': cache_keys, 'parse_mode': parse_mode,
+        }
+        return await self._enqueue(chat_id, 'media_group', payload, dedup_keys=dedup_keys, replaces=replaces)
+
+    async def enqueue_message(self, chat_id, text, parse_mode=None, context=None, dedup_keys=(), replaces=()):
+        payload = {'text': text, 'parse_mode': parse_mode, 'context': context}
+        return await self._enqueue(chat_id, 'message', payload, dedup_keys=dedup_keys, replaces=replaces)
+
+    async def hold_photo(self, chat_id, photo, caption=None, parse_mode='HTML', cache_key=None, dedup_keys=()):
+        """
+        Seperti enqueue_photo(), tetapi item hanya disimpan dan belum dikirim: pemanggil kemudian memanggil
+        release(item), atau menggantinya lewat `replaces` di enqueue_media_group()/enqueue_message().
+        Jika proses berhenti sebelum itu, item dipulihkan start() dan dikirim apa adanya.
+        Mengembalikan item, atau None jika semua `dedup_keys` sudah pernah tercatat.
+        """
+        payload = {'caption': caption, 'parse_mode': parse_mode, 'context': None, 'cache_key': cache_key}
+        return await self._store(chat_id, 'photo', payload, photo, dedup_keys)
+
+    async def hold_message(self, chat_id, text, parse_mode=None, dedup_keys=()):
+        """Versi teks dari hold_photo()."""
+        payload = {'text': text, 'parse_mode': parse_mode, 'context': None}
+        return await self._store(chat_id, 'message', payload, dedup_keys=dedup_keys)
+
+    def release(self, item):
+        """Masukkan item tersimpan ke antrean kirim."""
+        # Sebelum start(), item cukup disimpan; start() akan memuat semuanya dari database.
+        # Item yang tersimpan sebelum start() memuat antrean sudah ikut dimuat, jadi tidak dimasukkan dua kali.
+        if item['id'] is None or (self.started and item['id'] > self.restored_up_to):
+            self.queue.put_nowait(item)
+
+    async def _enqueue(self, chat_id, kind, payload, photo=None, dedup_keys=(), replaces=()):
+        item = await self._store(chat_id, kind, payload, photo, dedup_keys, replaces)
+        if item is None:
+            return 0
+        self.release(item)
+        return item['id']
+
+    async def _store(self, chat_id, kind, payload, photo=None, dedup_keys=(), replaces=()):
+        # INSERT (termasuk BLOB foto) berjalan di thread agar tidak menahan event loop deteksi
+        delivery_id = await asyncio.to_thread(
+            database.add_pending_delivery, self.queue_name, chat_id, kind, json.dumps(payload), photo,
+            list(dedup_keys), [old['id'] for old in replaces if old['id'] is not None]
+        )
+        if delivery_id == 0:
+            return None
+        return {'id': delivery_id, 'chat_id': chat_id, 'kind': kind, 'payload': payload, 'photo': photo, 'attempts': 0}
+
+    def get_file_id(self, cache_key):
+        file_id = self.file_ids.get(cache_key)
+        if file_id is not None:
+            self.file_ids.move_to_end(cache_key)
+        return file_id
+
+    def _remember_file_id(self, cache_key, file_id):
+        self.file_ids[cache_key] = file_id
+        self.file_ids.move_to_end(cache_key)
+        while len(self.file_ids) > FILE_ID_CACHE_SIZE:
+            self.file_ids.popitem(last=False)
+
+    def depth(self):
+        """Jumlah item yang menunggu dikirim (di antrean maupun yang dijadwalkan ulang)."""
+        return self.queue.qsize() + self.scheduled
+
+    # --- Siklus hidup ---
+
+    async def start(self):
+        """Pulihkan item tersimpan dari run sebelumnya lalu jalankan worker pengirim."""
+        for row in await asyncio.to_thread(database.get_pending_deliveries, self.queue_name):
+            self.queue.put_nowait({
+                'id': row['id'], 'chat_id': row['chat_id'], 'kind': row['kind'],
+                'payload': json.loads(row['payload']), 'photo': row['photo'], 'attempts': row['attempts'],
+            })
+            self.restored_up_to = max(self.restored_up_to, row['id'])
+        if self.queue.qsize():
+            logging.info(f"[delivery:{self.queue_name}] {self.queue.qsize()} pengiriman tertunda dipulihkan.")
+        self.started = True
+
+        self._tasks = [asyncio.create_task(self._worker(), name=f"delivery-{self.queue_name}-{i}") for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._log_depth(), name=f"delivery-{self.queue_name}-depth"))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    # --- Internal ---
+
+    def _schedule(self, item, delay):
+        self.scheduled += 1
+
+        def put_back():
+            self.scheduled -= 1
+            self.queue.put_nowait(item)
+
+        asyncio.get_running_loop().call_later(delay, put_back)
+
+    def _chat_bucket(self, chat_id):
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) > 10_000:
+                self.chat_buckets = {k: b for k, b in self.chat_buckets.items() if not b.idle()}
+            bucket = self.chat_buckets[chat_id] = TokenBucket(PER_CHAT_RATE, PER_CHAT_BURST)
+        return bucket
+
+    def _claim_upload(self, item):
+        """
+        True jika item boleh diproses sekarang. Item foto dengan cache_key yang sedang diunggah item
+        lain diparkir sampai unggahan itu selesai, lalu dikirim ulang memakai file_id-nya.
+        """
+        cache_key = item['payload'].get('cache_key')
+        if item['kind'] != 'photo' or not cache_key or cache_key in self.file_ids:
+            return True
+        upload = self.uploads.get(cache_key)
+        if upload is None:
+            self.uploads[cache_key] = (item, [])
+            return True
+        if upload[0] is item:
+            return True
+        upload[1].append(item)
+        self.scheduled += 1
+        return False
+
+    def _release_upload(self, item):
+        """
+        Lepas item yang menunggu unggahan `item`. Hanya dipanggil saat unggahan selesai (terkirim atau gagal
+        permanen); selama unggahan dijadwalkan ulang (RetryAfter, retry jaringan) penunggu tetap diparkir.
+        """
+        cache_key = item['payload'].get('cache_key')
+        upload = self.uploads.get(cache_key) if cache_key else None
+        if upload is None or upload[0] is not item:
+            return
+        del self.uploads[cache_key]
+        for waiting in upload[1]:
+            self.scheduled -= 1
+            self.queue.put_nowait(waiting)
+
+    async def _worker(self):
+        while True:
+            item = await self.queue.get()
+            release = False
+            try:
+                if not self._claim_upload(item):
+                    continue
+
+                # Chat yang sedang penuh dijadwalkan ulang agar tidak menahan chat lain
+                chat_bucket = self._chat_bucket(item['chat_id'])
+                chat_wait = chat_bucket.wait_time()
+                if chat_wait > 0:
+                    self._schedule(item, chat_wait)
+                    continue
+                # Token chat diambil saat itu juga (tanpa await di antaranya), sebelum menunggu bucket global,
+                # agar worker lain yang memegang item untuk chat yang sama langsung melihat bucket berkurang
+                chat_bucket.take()
+
+                release = True
+                while True:
+                    pause = self.paused_until - time.monotonic()
+                    wait = max(pause, self.global_bucket.wait_time())
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(wait)
+                self.global_bucket.take()
+
+                await self._send(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"[delivery:{self.queue_name}] Error tak terduga: {e}")
+                if release:
+                    self._release_upload(item)
+            finally:
+                self.queue.task_done()
+
+    async def _send(self, item):
+        payload = item['payload']
+        cache_key = payload.get('cache_key')
+        file_id = self.get_file_id(cache_key) if cache_key else None
+        if item['kind'] == 'media_group':
+            await self._send_media_group(item)
+            return
+        try:
+            if item['kind'] == 'photo':
+                message = await self.bot.send_photo(
+                    chat_id=item['chat_id'], photo=file_id or item['photo'],
+                    caption=payload.get('caption'), parse_mode=payload.get('parse_mode')
+                )
+            else:
+                message = await self.bot.send_message(
+                    chat_id=item['chat_id'], text=payload['text'], parse_mode=payload.get('parse_mode')
+                )
+        except RetryAfter as e:
+            # Flood control: hentikan semua pengiriman sampai waktu yang diminta Telegram
+            self.paused_until = max(self.paused_until, time.monotonic() + e.retry_after)
+            logging.warning(f"[delivery:{self.queue_name}] Flood control, jeda {e.retry_after} detik.")
+            self._schedule(item, e.retry_after)
+            return
+        except BadRequest as e:
+            if file_id and item['photo']:
+                # file_id ditolak: lupakan dan unggah ulang dari bytes yang tersimpan
+                logging.warning(f"[delivery:{self.queue_name}] file_id untuk {cache_key} ditolak ({e}), mengunggah ulang.")
+                self.file_ids.pop(cache_key, None)
+                self._schedule(item, 0)
+                return
+            logging.error(f"[delivery:{self.queue_name}] Gagal permanen ke chat {item['chat_id']}: {e}")
+            await self._finish(item)
+            return
+        except Forbidden as e:
+            # Kesalahan permanen (chat diblokir): tidak ada gunanya diulang
+            logging.error(f"[delivery:{self.queue_name}] Gagal permanen ke chat {item['chat_id']}: {e}")
+            await self._finish(item)
+            return
+        except (NetworkError, OSError, asyncio.TimeoutError) as e:
+            await self._retry(item, e)
+            return
+
+        if cache_key and not file_id and getattr(message, 'photo', None):
+            self._remember_file_id(cache_key, message.photo[-1].file_id)
+        await self._finish(item)
+        reused = " (file_id)" if file_id else ""
+        logging.info(f"[delivery:{self.queue_name}] Terkirim ke chat {item['chat_id']} ({item['kind']}{reused}).")
+        if self.on_sent:
+            try:
+                self.on_sent(item, message)
+            except Exception as e:
+                logging.error(f"[delivery:{self.queue_name}] Error pada callback on_sent: {e}")
+
+    async def _send_media_group(self, item):
+        payload = item['payload']
+        cache_keys = payload['cache_keys']
+        file_ids = [self.get_file_id(key) if key else None for key in cache_keys]
+        media = [
+            InputMediaPhoto(
+                media=file_id or base64.b64decode(photo),
+                caption=caption, parse_mode=payload.get('parse_mode') if caption else None
+            )
+            for photo, caption, file_id in zip(payload['photos'], payload['captions'], file_ids)
+        ]
+        try:
+            messages = await self.bot.send_media_group(chat_id=item['chat_id'], media=media)
+        except RetryAfter as e:
+            self.paused_until = max(self.paused_until, time.monotonic() + e.retry_after)
+            logging.warning(f"[delivery:{self.queue_name}] Flood control, jeda {e.retry_after} detik.")
+            self._schedule(item, e.retry_after)
+            return
+        except BadRequest as e:
+            if any(file_ids):
+                logging.warning(f"[delivery:{self.queue_name}] file_id album ditolak ({e}), mengunggah ulang.")
+                for key, file_id in zip(cache_keys, file_ids):
+                    if file_id:
+                        self.file_ids.pop(key, None)
+                self._schedule(item, 0)
+                return
+            logging.error(f"[delivery:{self.queue_name}] Gagal permanen ke chat {item['chat_id']}: {e}")
+            await self._finish(item)
+            return
+        except Forbidden as e:
+            logging.error(f"[delivery:{self.queue_name}] Gagal permanen ke chat {item['chat_id']}: {e}")
+            await self._finish(item)
+            return
+        except (NetworkError, OSError, asyncio.TimeoutError) as e:
+            await self._retry(item, e)
+            return
+
+        await self._finish(item)
+        for key, file_id, message in zip(cache_keys, file_ids, messages or []):
+            if key and not file_id and getattr(message, 'photo', None):
+                self._remember_file_id(key, message.photo[-1].file_id)
+        logging.info(f"[delivery:{self.queue_name}] Terkirim ke chat {item['chat_id']} (album {len(media)} foto).")
+
+    async def _retry(self, item, error):
+        item['attempts'] += 1
+        if item['attempts'] >= MAX_ATTEMPTS:
+            logging.error(f"[delivery:{self.queue_name}] Menyerah setelah {item['attempts']} percobaan ke chat {item['chat_id']}: {error}")
+            await self._finish(item)
+            return
+        delay = min(2 ** item['attempts'], MAX_BACKOFF) + random.uniform(0, 1)
+        logging.warning(f"[delivery:{self.queue_name}] Gagal kirim ke chat {item['chat_id']} ({error}), coba lagi dalam {delay:.1f} detik.")
+        if item['id'] is not None:
+            await asyncio.to_thread(database.update_pending_delivery_attempts, item['id'], item['attempts'])
+        self._schedule(item, delay)
+
+    async def _finish(self, item):
+        # Tulisan SQLite di thread, seperti _store(), agar worker lain tidak tertahan oleh lock database
+        if item['id'] is not None:
+            await asyncio.to_thread(database.delete_pending_delivery, item['id'])
+        # Jika unggahan ini gagal permanen, penunggu dilepas dan salah satunya mengunggah sendiri
+        self._release_upload(item)
+
+    async def _log_depth(self):
+        while True:
+            await asyncio.sleep(DEPTH_LOG_INTERVAL)
+            depth = self.depth()
+            if depth:
+                logging.info(f"[delivery:{self.queue_name}] Kedalaman antrean: {depth} item.")
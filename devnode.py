@@ -0,0 +1,302 @@
+# devnode.py
+# Node JSON-RPC/WebSocket lokal sebagai pengganti Alchemy untuk pengujian offline.
+#
+# Contoh:
+#   python devnode.py --port 8545 --block-time 1 --watch 0xabc... --every 5
+#   RPC_HTTP_URL_TEMPLATE=http://127.0.0.1:8545/{subdomain} \
+#   RPC_WS_URL_TEMPLATE=ws://127.0.0.1:8545/ws/{subdomain} MONITOR_MODE=ws python monitor.py
+#
+# State pool DEX untuk `eth_call` (termasuk Multicall3 aggregate3) bisa dimuat dari JSON:
+#   python devnode.py --pools devnode_pools.json
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+
+from aiohttp import web, WSMsgType
+
+from multicall import (
+    MULTICALL3_ADDRESS, encode_address, encode_uint, decode_aggregate3_calls, encode_aggregate3_result, decode_address,
+)
+from ws_subscriber import TRANSFER_TOPIC
+
+ZERO_ADDRESS = '0x' + '0' * 40
+DEFAULT_TOKEN = '0x' + 'de' * 20
+PAGE_SIZE = 1000
+
+
+def _topic_matches(expected, actual):
+    if expected is None:
+        return True
+    if isinstance(expected, list):
+        return actual in [e.lower() for e in expected]
+    return actual == expected.lower()
+
+def log_matches_filter(log, log_filter):
+    """Mencocokkan satu log dengan filter `eth_subscribe logs` (address dan topics)."""
+    address = log_filter.get('address')
+    if address:
+        addresses = address if isinstance(address, list) else [address]
+        if log['address'].lower() not in [a.lower() for a in addresses]:
+            return False
+    for i, expected in enumerate(log_filter.get('topics') or []):
+        if expected is None:
+            continue
+        if i >= len(log['topics']) or not _topic_matches(expected, log['topics'][i].lower()):
+            return False
+    return True
+
+
+class DevNode:
+    """
+    Chain tiruan: blok bertambah setiap `block_time` detik. Transfer bisa disuntik lewat
+    `add_transfer()` atau dibuat otomatis untuk alamat `watch` setiap `every` blok.
+    Transfer ERC-20 juga dipancarkan sebagai log Transfer ke pelanggan WebSocket.
+    """
+
+    def __init__(self, start_block=1_000_000, block_time=1.0, watch=None, every=0):
+        self.head = start_block
+        self.block_time = block_time
+        self.watch = [a.lower() for a in (watch or [])]
+        self.every = every
+        self.transfers = []  # list transfer format getAssetTransfers
+        self.logs_by_block = {}
+        self.subscribers = {}  # ws -> {subscription_id: (jenis, filter)}
+        self._next_subscription = 0
+        self.rpc_calls = 0
+        self.erc20 = {}  # token -> {'decimals': int, 'balances': {holder: int}}
+        self.factory_pools = {}  # (factory, token_a, token_b, fee atau None) -> pool, token diurutkan
+        self.pools = {}  # pool -> {'kind': 'v2'/'v3', 'token0', 'token1', 'reserves' atau 'sqrt_price_x96'}
+
+    # --- Data chain ---
+
+    def add_transfer(self, from_addr, to_addr, value=1.0, asset='DEV', category='erc20', block=None, contract=DEFAULT_TOKEN):
+        block = self.head if block is None else block
+        index = len(self.transfers)
+        tx_hash = '0x' + f'{index:064x}'
+        transfer = {
+            'blockNum': hex(block), 'uniqueId': f'{tx_hash}:log:0', 'hash': tx_hash,
+            'from': from_addr.lower(), 'to': to_addr.lower(), 'value': value, 'asset': asset,
+            'category': category, 'rawContract': {'address': contract if category != 'external' else None, 'value': hex(int(value * 10**18)), 'decimal': '0x12'},
+            'metadata': {'blockTimestamp': ''},
+        }
+        if category == 'external':
+            transfer['uniqueId'] = f'{tx_hash}:external'
+            transfer['asset'] = None
+        self.transfers.append(transfer)
+        if category != 'external':
+            log = {
+                'address': contract, 'blockNumber': hex(block), 'transactionHash': tx_hash, 'logIndex': '0x0', 'removed': False,
+                'topics': [TRANSFER_TOPIC, '0x' + from_addr.lower()[2:].rjust(64, '0'), '0x' + to_addr.lower()[2:].rjust(64, '0')],
+                'data': hex(int(value * 10**18)),
+            }
+            self.logs_by_block.setdefault(block, []).append(log)
+        return transfer
+
+    def add_token(self, address, decimals=18):
+        self.erc20.setdefault(address.lower(), {'decimals': decimals, 'balances': {}})['decimals'] = decimals
+
+    def _register_pool(self, factory, pool, token0, token1, fee, state, balance0, balance1):
+        pool, token0, token1 = pool.lower(), token0.lower(), token1.lower()
+        self.factory_pools[(factory.lower(), *sorted((token0, token1)), fee)] = pool
+        self.pools[pool] = {'token0': token0, 'token1': token1, **state}
+        for token, balance in ((token0, balance0), (token1, balance1)):
+            self.erc20.setdefault(token, {'decimals': 18, 'balances': {}})['balances'][pool] = balance
+
+    def add_v2_pool(self, factory, pool, token0, token1, reserve0, reserve1):
+        self._register_pool(factory, pool, token0, token1, None, {'kind': 'v2', 'reserves': (reserve0, reserve1)}, reserve0, reserve1)
+
+    def add_v3_pool(self, factory, pool, token0, token1, fee, sqrt_price_x96, balance0, balance1):
+        self._register_pool(factory, pool, token0, token1, fee, {'kind': 'v3', 'sqrt_price_x96': sqrt_price_x96}, balance0, balance1)
+
+    def load_pools(self, state):
+        """Muat state dari dict berformat devnode_pools.json (tokens, v2_pools, v3_pools)."""
+        for token in state.get('tokens', []):
+            self.add_token(token['address'], token.get('decimals', 18))
+        for pool in state.get('v2_pools', []):
+            self.add_v2_pool(pool['factory'], pool['pool'], pool['token0'], pool['token1'], int(pool['reserve0']), int(pool['reserve1']))
+        for pool in state.get('v3_pools', []):
+            self.add_v3_pool(
+                pool['factory'], pool['pool'], pool['token0'], pool['token1'], pool['fee'],
+                int(pool['sqrt_price_x96']), int(pool['balance0']), int(pool['balance1'])
+            )
+
+    async def produce_blocks(self):
+        while True:
+            await asyncio.sleep(self.block_time)
+            self.head += 1
+            if self.every and self.head % self.every == 0:
+                for address in self.watch:
+                    sender = '0x' + ''.join(random.choice('0123456789abcdef') for _ in range(40))
+                    self.add_transfer(sender, address, value=round(random.uniform(0.01, 5), 4))
+            await self._broadcast_block(self.head)
+
+    async def _broadcast_block(self, number):
+        head = {'number': hex(number), 'hash': '0x' + f'{number:064x}', 'timestamp': hex(number)}
+        for ws, subscriptions in list(self.subscribers.items()):
+            try:
+                for subscription_id, (kind, log_filter) in list(subscriptions.items()):
+                    if kind == 'newHeads':
+                        await self._notify(ws, subscription_id, head)
+                    elif kind == 'logs':
+                        for log in self.logs_by_block.get(number, []):
+                            if log_matches_filter(log, log_filter):
+                                await self._notify(ws, subscription_id, log)
+            except ConnectionError:
+                pass
+
+    async def _notify(self, ws, subscription_id, result):
+        await ws.send_json({'jsonrpc': '2.0', 'method': 'eth_subscription', 'params': {'subscription': subscription_id, 'result': result}})
+
+    # --- JSON-RPC ---
+
+    def handle_call(self, method, params, subscriptions=None):
+        self.rpc_calls += 1
+        if method == 'eth_blockNumber':
+            return hex(self.head)
+        if method == 'alchemy_getAssetTransfers':
+            return self._get_asset_transfers(params[0])
+        if method == 'eth_call':
+            return self._eth_call(params[0]['to'].lower(), params[0].get('data') or params[0].get('input') or '0x')
+        if method == 'eth_subscribe' and subscriptions is not None:
+            self._next_subscription += 1
+            subscription_id = hex(self._next_subscription)
+            subscriptions[subscription_id] = (params[0], params[1] if len(params) > 1 else {})
+            return subscription_id
+        if method == 'eth_unsubscribe' and subscriptions is not None:
+            return subscriptions.pop(params[0], None) is not None
+        raise ValueError(f"method {method} tidak didukung devnode")
+
+    def _get_asset_transfers(self, query):
+        from_block = int(query.get('fromBlock', '0x0'), 16)
+        to_block = self.head if query.get('toBlock', 'latest') == 'latest' else int(query['toBlock'], 16)
+        categories = set(query.get('category') or [])
+        from_address = (query.get('fromAddress') or '').lower()
+        to_address = (query.get('toAddress') or '').lower()
+        page_size = int(query.get('maxCount', hex(PAGE_SIZE)), 16)
+        offset = int(query.get('pageKey') or 0)
+
+        matches = [
+            t for t in self.transfers
+            if from_block <= int(t['blockNum'], 16) <= to_block
+            and (not categories or t['category'] in categories)
+            and (not from_address or t['from'] == from_address)
+            and (not to_address or t['to'] == to_address)
+        ]
+        if query.get('order') == 'desc':
+            matches.reverse()
+        result = {'transfers': matches[offset:offset + page_size]}
+        if offset + page_size < len(matches):
+            result['pageKey'] = str(offset + page_size)
+        return result
+
+    def _eth_call(self, to, data):
+        if to == MULTICALL3_ADDRESS and data[2:10] == '82ad56cb':
+            return encode_aggregate3_result([self._call_contract(target.lower(), calldata) for target, calldata in decode_aggregate3_calls(data)])
+        result = self._call_contract(to, data)
+        if result is None:
+            raise ValueError("execution reverted")
+        return '0x' + result.hex()
+
+    def _call_contract(self, to, data):
+        """Jalankan view function yang dikenal devnode. Mengembalikan bytes, atau None jika revert."""
+        selector = data[2:10]
+        args = [data[10 + 64 * i:10 + 64 * (i + 1)] for i in range((len(data) - 10) // 64)]
+        words = None
+        if selector == 'e6a43905' and len(args) == 2:  # getPair(address,address)
+            tokens = sorted(decode_address(int(arg, 16)) for arg in args)
+            words = [encode_address(self.factory_pools.get((to, *tokens, None), '0x' + '0' * 40))]
+        elif selector == '1698ee82' and len(args) == 3:  # getPool(address,address,uint24)
+            tokens = sorted(decode_address(int(arg, 16)) for arg in args[:2])
+            words = [encode_address(self.factory_pools.get((to, *tokens, int(args[2], 16)), '0x' + '0' * 40))]
+        elif selector == '0dfe1681' and to in self.pools:  # token0()
+            words = [encode_address(self.pools[to]['token0'])]
+        elif selector == '0902f1ac' and self.pools.get(to, {}).get('kind') == 'v2':  # getReserves()
+            reserve0, reserve1 = self.pools[to]['reserves']
+            words = [encode_uint(reserve0), encode_uint(reserve1), encode_uint(self.head)]
+        elif selector == '3850c7bd' and self.pools.get(to, {}).get('kind') == 'v3':  # slot0()
+            words = [encode_uint(self.pools[to]['sqrt_price_x96'])] + [encode_uint(0)] * 5 + [encode_uint(1)]
+        elif selector == '313ce567' and to in self.erc20:  # decimals()
+            words = [encode_uint(self.erc20[to]['decimals'])]
+        elif selector == '70a08231' and to in self.erc20 and args:  # balanceOf(address)
+            words = [encode_uint(self.erc20[to]['balances'].get(decode_address(int(args[0], 16)), 0))]
+        return bytes.fromhex(''.join(words)) if words is not None else None
+
+    def _dispatch(self, request, subscriptions=None):
+        try:
+            result = self.handle_call(request.get('method'), request.get('params') or [], subscriptions)
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': result}
+        except Exception as e:
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'error': {'code': -32601, 'message': str(e)}}
+
+    async def http_handler(self, request):
+        body = await request.json()
+        if isinstance(body, list):
+            return web.json_response([self._dispatch(item) for item in body])
+        return web.json_response(self._dispatch(body))
+
+    async def ws_handler(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        subscriptions = {}
+        self.subscribers[ws] = subscriptions
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.TEXT:
+                    await ws.send_json(self._dispatch(json.loads(msg.data), subscriptions))
+        finally:
+            self.subscribers.pop(ws, None)
+        return ws
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_post('/{subdomain}', self.http_handler)
+        app.router.add_post('/', self.http_handler)
+        app.router.add_get('/ws/{subdomain}', self.ws_handler)
+        app.router.add_get('/ws', self.ws_handler)
+
+        async def start_producer(app):
+            app['producer'] = asyncio.create_task(self.produce_blocks())
+
+        async def stop_producer(app):
+            app['producer'].cancel()
+
+        async def close_websockets(app):
+            for ws in list(self.subscribers):
+                await ws.close()
+
+        app.on_startup.append(start_producer)
+        app.on_shutdown.append(close_websockets)
+        app.on_cleanup.append(stop_producer)
+        return app
+
+    async def start(self, host='127.0.0.1', port=8545):
+        """Jalankan node di event loop yang sedang berjalan. Mengembalikan runner untuk dihentikan."""
+        runner = web.AppRunner(self.make_app())
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Node JSON-RPC/WebSocket lokal untuk pengujian monitor.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8545)
+    parser.add_argument('--block-time', type=float, default=1.0)
+    parser.add_argument('--start-block', type=int, default=1_000_000)
+    parser.add_argument('--watch', action='append', default=[], help="alamat yang otomatis menerima transfer")
+    parser.add_argument('--every', type=int, default=0, help="buat transfer untuk --watch setiap N blok")
+    parser.add_argument('--pools', help="file JSON berisi state pool DEX untuk eth_call")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    node = DevNode(start_block=args.start_block, block_time=args.block_time, watch=args.watch, every=args.every)
+    if args.pools:
+        with open(args.pools) as f:
+            node.load_pools(json.load(f))
+    web.run_app(node.make_app(), host=args.host, port=args.port)
+
+if __name__ == '__main__':
+    main()
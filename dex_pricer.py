@@ -0,0 +1,210 @@
+# dex_pricer.py
+# Harga token on-chain dari pool DEX gaya Uniswap V2/V3, untuk token yang tidak punya harga di CoinGecko.
+#
+# Penemuan pool (getPair/getPool ke setiap factory dan quote, lalu token0, harga dan saldo kedua sisi pool)
+# dilakukan sekali per token lalu di-cache. Setiap putaran cukup membaca getReserves/slot0 semua pool
+# terpilih dalam Multicall3 `aggregate3`, dikirim sebagai satu request JSON-RPC per jaringan.
+
+import logging
+import time
+
+import config
+from bot.utils import make_rpc_batch_request_async
+from constants import CHAIN_CONFIG, DEX_CONFIG
+from multicall import (
+    MULTICALL3_ADDRESS, encode_address, encode_uint, encode_call, encode_aggregate3, decode_aggregate3_result,
+    decode_words, decode_address,
+)
+
+GET_PAIR = 'e6a43905'      # getPair(address,address)
+GET_POOL = '1698ee82'      # getPool(address,address,uint24)
+TOKEN0 = '0dfe1681'        # token0()
+DECIMALS = '313ce567'      # decimals()
+BALANCE_OF = '70a08231'    # balanceOf(address)
+GET_RESERVES = '0902f1ac'  # getReserves()
+SLOT0 = '3850c7bd'         # slot0()
+
+# Pilihan pool dicek ulang setelah POOL_TTL; token tanpa pool layak dicari lagi setelah MISSING_POOL_TTL
+POOL_TTL = 6 * 3600
+MISSING_POOL_TTL = 3600
+# Kedalaman pool = 2 x nilai USD sisi terkecil (token atau quote). Pool di bawah batas ini diabaikan karena
+# harganya mudah dimanipulasi; memakai sisi terkecil mencegah pool yang hanya diisi quote lolos batas
+MIN_LIQUIDITY_USD = 50000
+# Batas panggilan per aggregate3; beberapa aggregate3 tetap dikirim dalam satu batch JSON-RPC
+MAX_CALLS_PER_MULTICALL = 500
+
+
+def get_rpc_url(chain):
+    return config.RPC_HTTP_URL_TEMPLATE.format(subdomain=CHAIN_CONFIG[chain]['rpc_subdomain'], api_key=config.ALCHEMY_API_KEY)
+
+def v2_price(reserves, token_is_token0, token_decimals, quote_decimals):
+    """Harga token dalam satuan quote dari reserve pool V2."""
+    reserve_token, reserve_quote = (reserves[0], reserves[1]) if token_is_token0 else (reserves[1], reserves[0])
+    if not reserve_token or not reserve_quote:
+        return None
+    return (reserve_quote / 10**quote_decimals) / (reserve_token / 10**token_decimals)
+
+def v3_price(sqrt_price_x96, token_is_token0, token_decimals, quote_decimals):
+    """Harga token dalam satuan quote dari sqrtPriceX96 pool V3 (harga token1 per token0 dalam unit mentah)."""
+    if not sqrt_price_x96:
+        return None
+    raw = (sqrt_price_x96 / 2**96) ** 2
+    if not token_is_token0:
+        raw = 1 / raw
+    return raw * 10**(token_decimals - quote_decimals)
+
+def pool_price(kind, words, token_is_token0, token_decimals, quote_decimals):
+    """Harga token dalam satuan quote dari hasil getReserves() (V2) atau slot0() (V3), atau None."""
+    if len(words) < 2:
+        return None
+    if kind == 'v2':
+        return v2_price(words[:2], token_is_token0, token_decimals, quote_decimals)
+    return v3_price(words[0], token_is_token0, token_decimals, quote_decimals)
+
+
+class DexPricer:
+    """
+    `get_prices(session, chain, tokens, native_usd)` mengembalikan dict alamat token -> harga USD untuk
+    token yang punya pool cukup dalam. `native_usd` (harga USD wrapped native) dipakai untuk pool
+    berpasangan dengan WETH/WBNB/dll; tanpa itu hanya pool stablecoin yang bisa dihargai.
+    """
+
+    def __init__(self, pool_ttl=POOL_TTL, missing_ttl=MISSING_POOL_TTL):
+        self.pool_ttl = pool_ttl
+        self.missing_ttl = missing_ttl
+        self.pools = {}  # (chain, token) -> (pool dict atau None, waktu ditemukan)
+
+    def cached_pool(self, chain, token):
+        entry = self.pools.get((chain, token))
+        if entry:
+            ttl = self.pool_ttl if entry[0] is not None else self.missing_ttl
+            if time.monotonic() - entry[1] < ttl:
+                return entry
+        return None
+
+    async def get_prices(self, session, chain, tokens, native_usd=None):
+        dex = DEX_CONFIG.get(chain)
+        if not dex or not tokens:
+            return {}
+        tokens = {token.lower() for token in tokens}
+
+        missing = [token for token in tokens if not self.cached_pool(chain, token)]
+        if missing:
+            await self.discover_pools(session, chain, missing, native_usd)
+
+        pools = {}
+        for token in tokens:
+            entry = self.cached_pool(chain, token)
+            if entry and entry[0]:
+                pools[token] = entry[0]
+        if not pools:
+            return {}
+
+        calls = [(pool['address'], encode_call(GET_RESERVES if pool['kind'] == 'v2' else SLOT0)) for pool in pools.values()]
+        results = await self.multicall(session, chain, calls)
+        if results is None:
+            return {}
+
+        prices = {}
+        for (token, pool), data in zip(pools.items(), results):
+            price = pool_price(pool['kind'], decode_words(data or b''), pool['token_is_token0'], pool['token_decimals'], pool['quote_decimals'])
+            quote_usd = 1.0 if pool['quote_kind'] == 'usd' else native_usd
+            if price is not None and quote_usd is not None:
+                prices[token] = price * quote_usd
+        return prices
+
+    async def discover_pools(self, session, chain, tokens, native_usd=None):
+        """Cari pool terdalam untuk setiap token (dua multicall) dan simpan hasilnya di cache."""
+        dex = DEX_CONFIG[chain]
+        calls, meta = [], []  # meta sejajar dengan calls: (token, None, None) untuk decimals, (token, kind, quote) untuk pool
+        for token in tokens:
+            calls.append((token, encode_call(DECIMALS)))
+            meta.append((token, None, None))
+            for quote in dex['quotes']:
+                if quote[0] == token:
+                    continue
+                for factory in dex['v2_factories']:
+                    calls.append((factory, encode_call(GET_PAIR, encode_address(token), encode_address(quote[0]))))
+                    meta.append((token, 'v2', quote))
+                for factory, fees in dex['v3_factories']:
+                    for fee in fees:
+                        calls.append((factory, encode_call(GET_POOL, encode_address(token), encode_address(quote[0]), encode_uint(fee))))
+                        meta.append((token, 'v3', quote))
+
+        results = await self.multicall(session, chain, calls)
+        if results is None:
+            return
+
+        decimals = {}
+        found = []  # (token, kind, quote, pool)
+        for (token, kind, quote), data in zip(meta, results):
+            if not data or len(data) < 32:
+                continue
+            word = decode_words(data)[0]
+            if kind is None:
+                decimals[token] = word
+            elif word and token in decimals:
+                found.append((token, kind, quote, decode_address(word)))
+
+        # Per pool: token0, harga (getReserves/slot0), saldo quote dan saldo token di pool
+        depth_calls = []
+        for token, kind, quote, pool in found:
+            depth_calls.append((pool, encode_call(TOKEN0)))
+            depth_calls.append((pool, encode_call(GET_RESERVES if kind == 'v2' else SLOT0)))
+            depth_calls.append((quote[0], encode_call(BALANCE_OF, encode_address(pool))))
+            depth_calls.append((token, encode_call(BALANCE_OF, encode_address(pool))))
+        depth_results = await self.multicall(session, chain, depth_calls) if depth_calls else []
+        if depth_results is None:
+            return
+
+        best = {}  # token -> (kedalaman USD, pool dict)
+        for i, (token, kind, quote, pool) in enumerate(found):
+            token0_data, price_data, quote_balance_data, token_balance_data = depth_results[4 * i:4 * i + 4]
+            if any(not data or len(data) < 32 for data in (token0_data, price_data, quote_balance_data, token_balance_data)):
+                continue
+            quote_address, quote_decimals, quote_kind = quote
+            quote_usd = (1.0 if quote_kind == 'usd' else native_usd) or 0
+            token_is_token0 = decode_address(decode_words(token0_data)[0]) == token
+            price = pool_price(kind, decode_words(price_data), token_is_token0, decimals[token], quote_decimals) or 0
+            quote_side = decode_words(quote_balance_data)[0] / 10**quote_decimals * quote_usd
+            token_side = decode_words(token_balance_data)[0] / 10**decimals[token] * price * quote_usd
+            depth = 2 * min(quote_side, token_side)
+            if depth > best.get(token, (0, None))[0]:
+                best[token] = (depth, {
+                    'address': pool, 'kind': kind, 'quote_kind': quote_kind, 'quote_decimals': quote_decimals,
+                    'token_decimals': decimals[token], 'token_is_token0': token_is_token0,
+                })
+
+        now = time.monotonic()
+        has_native_quote = any(quote[2] == 'native' for quote in dex['quotes'])
+        for token in tokens:
+            depth, pool = best.get(token, (0, None))
+            if depth >= MIN_LIQUIDITY_USD:
+                self.pools[(chain, token)] = (pool, now)
+                logging.info(f"[dex:{chain}] Pool {pool['kind']} {pool['address']} dipakai untuk {token} (likuiditas ~${depth:,.0f})")
+            elif token not in decimals or native_usd is not None or not has_native_quote:
+                # Tanpa harga native, kedalaman pool WETH/WBNB belum bisa dinilai; hasil negatif baru disimpan
+                # jika harga native ada (atau token memang bukan ERC-20, karena decimals() gagal)
+                self.pools[(chain, token)] = (None, now)
+                logging.info(f"[dex:{chain}] Tidak ada pool yang cukup dalam untuk {token}")
+
+    async def multicall(self, session, chain, calls):
+        """
+        Jalankan `calls` (target, calldata) lewat aggregate3. Panggilan dipecah per MAX_CALLS_PER_MULTICALL
+        namun semua `eth_call` dikirim dalam satu batch JSON-RPC. Mengembalikan list bytes/None per panggilan,
+        atau None jika request gagal.
+        """
+        chunks = [calls[i:i + MAX_CALLS_PER_MULTICALL] for i in range(0, len(calls), MAX_CALLS_PER_MULTICALL)]
+        requests = [('eth_call', [{'to': MULTICALL3_ADDRESS, 'data': encode_aggregate3(chunk)}, 'latest']) for chunk in chunks]
+        responses = await make_rpc_batch_request_async(session, get_rpc_url(chain), requests)
+        if responses is None:
+            return None
+
+        results = []
+        for chunk, response in zip(chunks, responses):
+            if not response or 'result' not in response:
+                error = response.get('error') if response else 'tidak ada respons'
+                logging.error(f"[dex:{chain}] Multicall gagal: {error}")
+                return None
+            results.extend(decode_aggregate3_result(response['result']))
+        return results
@@ -1,52 +1,68 @@
 from PIL import Image, ImageDraw, ImageFont
 import qrcode
 import io
+import os
 import logging
 
 # Konfigurasi gambar
 IMG_WIDTH = 800
 IMG_HEIGHT = 450
-FONT_FILE = "PermanentMarker-Regular.ttf"
+FONT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "PermanentMarker-Regular.ttf")
+# Jumlah warna untuk mode palet; kuitansi hanya berisi beberapa warna solid + anti-aliasing teks
+PALETTE_COLORS = 64
 
-def create_transaction_image(tx_data):
-    """
-    Membuat gambar kuitansi transaksi dari data yang diberikan.
-    """
-    try:
-        logging.info("Mencoba membuat gambar kuitansi...")
-        # Siapkan font
-        font_title = ImageFont.truetype(FONT_FILE, size=32)
-        font_main = ImageFont.truetype(FONT_FILE, size=24)
-        font_small = ImageFont.truetype(FONT_FILE, size=18)
+# Font dan kanvas dasar disimpan di memori setelah pertama kali dibuat
+_fonts = None
+_base_canvas = None
+
+
+def _get_fonts():
+    global _fonts
+    if _fonts is None:
+        _fonts = {
+            'title': ImageFont.truetype(FONT_FILE, size=32),
+            'main': ImageFont.truetype(FONT_FILE, size=24),
+            'small': ImageFont.truetype(FONT_FILE, size=18),
+        }
         logging.info(f"Font '{FONT_FILE}' berhasil dimuat.")
+    return _fonts
 
-        # Buat kanvas gambar
+def _get_base_canvas():
+    """Kanvas berisi elemen statis: latar, judul, garis pemisah, dan label."""
+    global _base_canvas
+    if _base_canvas is None:
+        fonts = _get_fonts()
         image = Image.new('RGB', (IMG_WIDTH, IMG_HEIGHT), color='#1E1E2E')
         draw = ImageDraw.Draw(image)
 
-        # --- Gambar Konten ---
-        draw.text((40, 30), "Transaction Receipt", fill='#F5C2E7', font=font_title)
+        draw.text((40, 30), "Transaction Receipt", fill='#F5C2E7', font=fonts['title'])
         draw.line([(40, 75), (IMG_WIDTH - 40, 75)], fill='#45475A', width=2)
 
-        y_pos = 100
-        draw.text((40, y_pos), "Chain:", fill='#A6ADC8', font=font_main)
-        draw.text((180, y_pos), tx_data['chain'].title(), fill='#F9E2AF', font=font_main)
+        for label, y_pos in (("Chain:", 100), ("Status:", 140), ("Amount:", 180), ("From:", 220), ("To:", 250)):
+            draw.text((40, y_pos), label, fill='#A6ADC8', font=fonts['main'])
+        _base_canvas = image
+    return _base_canvas
 
-        y_pos += 40
-        draw.text((40, y_pos), "Status:", fill='#A6ADC8', font=font_main)
-        draw.text((180, y_pos), tx_data['direction'], fill=tx_data['color'], font=font_main)
-        
-        y_pos += 40
-        draw.text((40, y_pos), "Amount:", fill='#A6ADC8', font=font_main)
-        draw.text((180, y_pos), tx_data['amount_text'], fill='#FFFFFF', font=font_main)
+def warm_up():
+    """Muat font dan kanvas dasar lebih awal (misalnya saat worker mulai)."""
+    _get_base_canvas()
 
-        y_pos += 40
-        draw.text((40, y_pos), "From:", fill='#A6ADC8', font=font_main)
-        draw.text((180, y_pos), tx_data['from_addr'], fill='#89B4FA', font=font_small)
-        
-        y_pos += 30
-        draw.text((40, y_pos), "To:", fill='#A6ADC8', font=font_main)
-        draw.text((180, y_pos), tx_data['to_addr'], fill='#89B4FA', font=font_small)
+def create_transaction_image(tx_data, palette=False):
+    """
+    Membuat gambar kuitansi transaksi dari data yang diberikan.
+    Hanya bagian dinamis dan QR yang digambar di atas salinan kanvas dasar.
+    Dengan `palette=True` gambar dikuantisasi ke palet kecil sehingga PNG jauh lebih ringan.
+    """
+    try:
+        fonts = _get_fonts()
+        image = _get_base_canvas().copy()
+        draw = ImageDraw.Draw(image)
+
+        draw.text((180, 100), tx_data['chain'].title(), fill='#F9E2AF', font=fonts['main'])
+        draw.text((180, 140), tx_data['direction'], fill=tx_data['color'], font=fonts['main'])
+        draw.text((180, 180), tx_data['amount_text'], fill='#FFFFFF', font=fonts['main'])
+        draw.text((180, 220), tx_data['from_addr'], fill='#89B4FA', font=fonts['small'])
+        draw.text((180, 250), tx_data['to_addr'], fill='#89B4FA', font=fonts['small'])
 
         # QR Code
         tx_url = f"{tx_data['explorer_url']}/tx/{tx_data['tx_hash']}"
@@ -54,16 +70,19 @@ def create_transaction_image(tx_data):
         qr.add_data(tx_url)
         qr.make(fit=True)
         qr_img = qr.make_image(fill_color="black", back_color="white").convert('RGB')
-        
+
         image.paste(qr_img, (IMG_WIDTH - 190, 100))
-        draw.text((IMG_WIDTH - 188, 255), "Scan for Details", fill='#A6ADC8', font=font_small)
+        # Ditulis setelah QR karena QR yang besar bisa menutupi posisinya
+        draw.text((IMG_WIDTH - 188, 255), "Scan for Details", fill='#A6ADC8', font=fonts['small'])
 
         # --- Simpan ke Memori ---
+        if palette:
+            image = image.quantize(colors=PALETTE_COLORS, method=Image.Quantize.FASTOCTREE)
         image_buffer = io.BytesIO()
         image.save(image_buffer, format='PNG')
         image_buffer.seek(0)
-        
-        logging.info("Gambar kuitansi berhasil dibuat dan disimpan ke buffer.")
+
+        logging.debug("Gambar kuitansi berhasil dibuat dan disimpan ke buffer.")
         return image_buffer
 
     except FileNotFoundError:
@@ -71,4 +90,4 @@ def create_transaction_image(tx_data):
         return None
     except Exception as e:
         logging.error(f"Gagal membuat gambar: {e}")
-        return None
\ No newline at end of file
+        return None
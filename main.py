@@ -16,7 +16,7 @@ from bot.handlers.start import start
 from bot.handlers.help import help_command
 from bot.handlers.wallet_management import (
     add_wallet_start, get_address, select_chain, get_alias, skip_alias,
-    my_wallets, remove_wallet_menu, remove_wallet_confirm,
+    my_wallets, remove_wallet_menu, remove_wallet_confirm, backfill_history,
     GET_ADDRESS, SELECT_CHAIN, GET_ALIAS
 )
 from bot.handlers.portfolio import (
@@ -25,16 +25,16 @@ from bot.handlers.portfolio import (
 )
 from bot.handlers.settings import (
     settings_menu, set_min_value_start, set_min_value_received,
-    toggle_airdrop, SET_MIN_VALUE
+    toggle_airdrop, toggle_grouping, cycle_digest_threshold, SET_MIN_VALUE
 )
 from bot.handlers.gas_tracker import gas_start, get_gas_price
 
 # Indonesia: Import handler baru untuk price alerts
 from bot.handlers.price_alerts import (
     alert_menu, create_alert_start, select_alert_chain, select_alert_token,
-    select_alert_type, set_target_price, confirm_create_alert, view_active_alerts,
+    select_alert_type, select_alert_window, set_target_price, confirm_create_alert, view_active_alerts,
     popular_alerts,
-    PILIH_CHAIN_ALERT, PILIH_TOKEN_ALERT, SET_HARGA_TARGET, PILIH_JENIS_ALERT
+    PILIH_CHAIN_ALERT, PILIH_TOKEN_ALERT, SET_HARGA_TARGET, PILIH_JENIS_ALERT, PILIH_JENDELA_ALERT
 )
 
 def main():
@@ -78,6 +78,7 @@ def main():
                 MessageHandler(filters.TEXT & ~filters.COMMAND, select_alert_token)
             ],
             PILIH_JENIS_ALERT: [CallbackQueryHandler(select_alert_type, pattern='^alert_type_')],
+            PILIH_JENDELA_ALERT: [CallbackQueryHandler(select_alert_window, pattern='^alert_window_')],
             SET_HARGA_TARGET: [MessageHandler(filters.TEXT & ~filters.COMMAND, set_target_price)],
         },
         fallbacks=[
@@ -105,6 +106,7 @@ def main():
     application.add_handler(CallbackQueryHandler(my_wallets, pattern='^my_wallets$'))
     application.add_handler(CallbackQueryHandler(remove_wallet_menu, pattern='^remove_wallet_menu$'))
     application.add_handler(CallbackQueryHandler(remove_wallet_confirm, pattern='^delete_'))
+    application.add_handler(CallbackQueryHandler(backfill_history, pattern='^backfill_'))
     
     # Indonesia: Handler untuk portfolio
     application.add_handler(CallbackQueryHandler(portfolio_start, pattern='^portfolio_start$'))
@@ -115,6 +117,8 @@ def main():
     # Indonesia: Handler untuk settings
     application.add_handler(CallbackQueryHandler(settings_menu, pattern='^settings_menu$'))
     application.add_handler(CallbackQueryHandler(toggle_airdrop, pattern='^toggle_airdrop$'))
+    application.add_handler(CallbackQueryHandler(toggle_grouping, pattern='^toggle_grouping$'))
+    application.add_handler(CallbackQueryHandler(cycle_digest_threshold, pattern='^cycle_digest_threshold$'))
     
     # Indonesia: Handler untuk gas tracker
     application.add_handler(CallbackQueryHandler(gas_start, pattern='^gas_start$'))
@@ -1,35 +1,82 @@
-# monitor.py (Versi Final dengan Perbaikan Impor Melingkar)
+# monitor.py (Versi Async: satu event loop untuk semua jaringan)
 
-import time
-import logging
-import requests
-import threading
 import asyncio
+import hashlib
+import html
+import logging
+import aiohttp
 from telegram import Bot
+from telegram.request import HTTPXRequest
 
 import config
 import database
-from image_generator import create_transaction_image
-from bot.utils import get_price, make_rpc_request
-from constants import CHAIN_CONFIG
+from bot.utils import make_rpc_request_async
+from transfers import fetch_transfers, transfer_calls
+from watch_index import WatchIndex
+from chain_scheduler import ChainScheduler
+from chain_supervisor import ChainSupervisor
+from delivery import DeliveryQueue
+from notification_coalescer import NotificationCoalescer
+from render_service import RenderService
+from price_cache import get_shared_cache
+from pricing import PriceBook, native_key, token_key
+from ws_subscriber import ChainSubscriber
+from constants import CHAIN_CONFIG, COINGECKO_ASSET_PLATFORMS
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-bot = Bot(token=config.TELEGRAM_TOKEN)
 
-async def send_photo_async(user_id, image_buffer, caption):
-    try:
-        await bot.send_photo(chat_id=user_id, photo=image_buffer, caption=caption, parse_mode='HTML')
-        logging.info(f"Kuitansi gambar BERHASIL dikirim ke user {user_id}")
-        image_buffer.seek(0)
-    except Exception as e:
-        logging.error(f"Gagal mengirim foto ke user {user_id}: {e}")
+# Satu Bot untuk seluruh proses; pool koneksi dibuat cukup besar agar pengiriman paralel tidak antre.
+bot = Bot(token=config.TELEGRAM_TOKEN, request=HTTPXRequest(connection_pool_size=32))
+watch_index = WatchIndex()
+delivery_queue = DeliveryQueue(bot, 'monitor')
+coalescer = NotificationCoalescer(delivery_queue)
+render_service = RenderService(workers=config.RENDER_WORKERS)
+price_book = PriceBook(shared=get_shared_cache())
 
-def process_and_send(tx, chain_name, chain_data, triggered_address):
+RETRY_INTERVAL = 15
+ERROR_INTERVAL = 30
+HTTP_POOL_LIMIT = 64
+HTTP_POOL_LIMIT_PER_HOST = 8
+HTTP_TIMEOUT = 30
+WATCH_REFRESH_INTERVAL = 5
+# Nama pembaca log perubahan wallet; pembaca yang diam lebih lama dari ini tidak menahan pembersihan log
+WATCH_CONSUMER = 'monitor'
+WATCH_CONSUMER_STALE_AFTER = 24 * 3600
+# Catch-up setelah restart: rentang besar dipecah menjadi jendela (ukurannya dari ChainScheduler) yang diambil paralel
+CATCHUP_CONCURRENCY = 4
+FETCH_CONCURRENCY = 4
+MAX_CATCHUP_BLOCKS = 200_000
+# Dipakai jika jaringan tidak punya 'confirmations' di CHAIN_CONFIG
+DEFAULT_CONFIRMATIONS = 2
+# Kunci dedup notifikasi disimpan cukup lama untuk menutup catch-up setelah downtime panjang
+DEDUP_RETENTION = 30 * 24 * 3600
+DEDUP_PRUNE_INTERVAL = 3600
+
+def notification_key(chain_name, tx, user_id):
+    """
+    Kunci dedup 64-bit untuk (chain, tx hash, log index, user). uniqueId Alchemy sudah berisi
+    tx hash dan posisi log/trace, sehingga transfer yang sama selalu menghasilkan kunci yang sama.
+    """
+    raw = f"{chain_name}:{tx.get('uniqueId') or tx['hash']}:{user_id}".lower()
+    return int.from_bytes(hashlib.blake2b(raw.encode(), digest_size=8).digest(), 'big', signed=True)
+
+def get_price_key(tx, chain_name, chain_data):
+    """Kunci PriceBook untuk aset yang dipindahkan transfer ini, atau None jika tidak bisa dihargai (NFT)."""
+    contract = (tx.get('rawContract') or {}).get('address')
+    if tx.get('category') in ('external', 'internal') or tx.get('asset') is None:
+        coingecko_id = chain_data.get('coingecko_id')
+        return native_key(coingecko_id) if coingecko_id else None
+    if tx.get('category') == 'erc20' and contract and chain_name in COINGECKO_ASSET_PLATFORMS:
+        return token_key(COINGECKO_ASSET_PLATFORMS[chain_name], contract)
+    return None
+
+async def process_and_send(tx, chain_name, chain_data, triggered_address, prices):
+    """`prices` adalah hasil PriceBook.get_prices() untuk semua aset di jendela yang sedang diproses."""
     is_outgoing = triggered_address.lower() == tx['from'].lower()
     symbol = tx.get('asset')
     value = tx.get('value')
     is_airdrop = False
-    
+
     if symbol is None:
         symbol = chain_data.get('symbol', 'Token')
         value = int(tx.get('rawContract', {}).get('value', '0x0'), 16) / 1e18
@@ -38,11 +85,8 @@ def process_and_send(tx, chain_name, chain_data, triggered_address):
     elif value is None:
         is_airdrop = True
 
-    coingecko_id = None
-    if symbol == chain_data.get('symbol'):
-        coingecko_id = chain_data.get('coingecko_id')
-
-    price_usd = get_price(coingecko_id) if coingecko_id and value is not None else None
+    price_key = get_price_key(tx, chain_name, chain_data)
+    price_usd = prices.get(price_key) if price_key and value is not None else None
     value_usd = (value * price_usd) if price_usd and value is not None else 0
     value_usd_text = f" (~${value_usd:,.2f} USD)" if value_usd > 0 else ""
     amount_text = f"{value:.6f} {symbol}{value_usd_text}" if value is not None else "NFT Transfer"
@@ -56,98 +100,278 @@ def process_and_send(tx, chain_name, chain_data, triggered_address):
         'amount_text': amount_text
     }
 
-    image_buffer = create_transaction_image(tx_data)
-    if image_buffer:
-        caption = f"Transaksi terdeteksi untuk wallet <code>{triggered_address}</code>"
-        users_to_notify = database.get_users_for_wallet(triggered_address, chain_name)
-        
-        for user_id in users_to_notify:
-            settings = database.get_user_settings(user_id)
-            if value_usd < settings['min_value_usd']:
-                logging.info(f"Notifikasi untuk user {user_id} dilewati (di bawah nilai minimum).")
-                continue
-            if is_airdrop and not settings['notify_on_airdrop']:
-                logging.info(f"Notifikasi untuk user {user_id} dilewati (airdrop dinonaktifkan).")
-                continue
-            
-            asyncio.run(send_photo_async(user_id, image_buffer, caption))
+    users_to_notify = []
+    for user_id in watch_index.users_for(chain_name, triggered_address):
+        settings = watch_index.settings_for(user_id)
+        if value_usd < settings['min_value_usd']:
+            logging.info(f"Notifikasi untuk user {user_id} dilewati (di bawah nilai minimum).")
+            continue
+        if is_airdrop and not settings['notify_on_airdrop']:
+            logging.info(f"Notifikasi untuk user {user_id} dilewati (airdrop dinonaktifkan).")
+            continue
+        users_to_notify.append(user_id)
+
+    # Transfer yang sudah pernah masuk antrean (jendela tumpang tindih, restart, reorg) dilewati tanpa render.
+    # Kunci baru dicatat bersama item antreannya, jadi crash sebelum itu membuat transfer dikirim ulang.
+    keys = {user_id: notification_key(chain_name, tx, user_id) for user_id in users_to_notify}
+    sent_keys = await asyncio.to_thread(database.get_sent_notification_keys, keys.values())
+    users_to_notify = [user_id for user_id, key in keys.items() if key not in sent_keys]
+    if not users_to_notify:
+        return
+
+    # Render di process pool; jika pool penuh atau lambat, kirim versi teks agar notifikasi tidak tertahan
+    image_bytes = await render_service.render(tx_data)
+    # Kuitansi sama untuk semua pemantau wallet ini: cukup diunggah sekali, sisanya memakai file_id.
+    # uniqueId membedakan beberapa transfer dalam satu tx hash.
+    receipt_key = f"{chain_name}:{tx.get('uniqueId') or tx['hash']}:{'out' if is_outgoing else 'in'}"
+    notification = {
+        'photo': image_bytes, 'cache_key': receipt_key,
+        'caption': f"Transaksi terdeteksi untuk wallet <code>{triggered_address}</code>",
+        'text': None if image_bytes else format_text_receipt(tx_data, triggered_address),
+        'summary': format_receipt_summary(tx_data),
+    }
+    for user_id in users_to_notify:
+        # Dikelompokkan per pengguna (album/ringkasan) lalu masuk antrean DeliveryQueue
+        await coalescer.add(user_id, watch_index.settings_for(user_id), {**notification, 'dedup_key': keys[user_id]})
+
+def format_text_receipt(tx_data, triggered_address):
+    """Versi teks kuitansi, dipakai saat render gambar gagal atau tertinggal."""
+    tx_url = f"{tx_data['explorer_url']}/tx/{tx_data['tx_hash']}"
+    return (
+        f"<b>Transaksi terdeteksi</b> untuk wallet <code>{triggered_address}</code>\n\n"
+        f"<b>Chain:</b> {tx_data['chain'].title()}\n"
+        f"<b>Status:</b> {tx_data['direction']}\n"
+        f"<b>Amount:</b> {html.escape(tx_data['amount_text'])}\n"
+        f"<b>From:</b> <code>{tx_data['from_addr']}</code>\n"
+        f"<b>To:</b> <code>{tx_data['to_addr']}</code>\n\n"
+        f'<a href="{tx_url}">Lihat di explorer</a>'
+    )
+
+def format_receipt_summary(tx_data):
+    """Satu baris kuitansi untuk ringkasan (digest) banyak transaksi."""
+    tx_url = f"{tx_data['explorer_url']}/tx/{tx_data['tx_hash']}"
+    return (
+        f"{tx_data['direction']} {html.escape(tx_data['amount_text'])} "
+        f'({tx_data["chain"].title()}, <a href="{tx_url}">{tx_data["tx_hash"][:10]}...</a>)'
+    )
 
-def monitor_chain(chain_name, chain_data):
-    rpc_url = f"https://{chain_data['rpc_subdomain']}.g.alchemy.com/v2/{config.ALCHEMY_API_KEY}"
+def split_block_range(from_block, to_block, window_size):
+    """Memecah rentang blok [from_block, to_block] menjadi jendela berukuran tetap."""
+    windows = []
+    start = from_block
+    while start <= to_block:
+        end = min(start + window_size - 1, to_block)
+        windows.append((start, end))
+        start = end + 1
+    return windows
+
+def get_rpc_urls(chain_data):
+    """URL HTTP dan WebSocket untuk satu jaringan berdasarkan template di config."""
+    url_params = {'subdomain': chain_data['rpc_subdomain'], 'api_key': config.ALCHEMY_API_KEY}
+    return config.RPC_HTTP_URL_TEMPLATE.format(**url_params), config.RPC_WS_URL_TEMPLATE.format(**url_params)
+
+async def wait_for_next_cycle(subscriber, timeout):
+    """Tidur sampai interval berikutnya; dalam mode push bisa dibangunkan lebih awal oleh langganan."""
+    if subscriber is None:
+        await asyncio.sleep(timeout)
+        return
+    try:
+        await asyncio.wait_for(subscriber.wake.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        pass
+
+async def monitor_chain(session, chain_name, chain_data, subscriber=None):
+    rpc_url, _ = get_rpc_urls(chain_data)
     logging.info(f"[{chain_name}] Memulai pemantauan dengan metode `getAssetTransfers` ke {rpc_url}")
     last_processed_block = -1
+    last_sweep = 0
+    # Batas request RPC paralel untuk jaringan ini, dipakai bersama oleh semua jendela dan potongan alamat
+    fetch_semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+    scheduler = ChainScheduler(chain_data.get('block_time'), config.TRANSFER_CALLS_PER_SECOND)
+    confirmations = chain_data.get('confirmations', DEFAULT_CONFIRMATIONS)
 
     while True:
         try:
-            wallets_to_monitor = database.get_all_wallets_by_chain(chain_name)
+            if subscriber:
+                subscriber.wake.clear()
+            push_active = subscriber is not None and subscriber.connected and subscriber.head is not None
+
+            wallets_to_monitor = watch_index.addresses(chain_name)
             if not wallets_to_monitor:
-                time.sleep(60)
+                scheduler.mark_idle()
+                await asyncio.sleep(scheduler.next_interval())
                 continue
 
-            latest_block_hex = make_rpc_request(rpc_url, "eth_blockNumber", []).get('result')
-            if not latest_block_hex:
-                time.sleep(15)
-                continue
-            
-            latest_block = int(latest_block_hex, 16)
+            if push_active:
+                # Head dari langganan newHeads, tanpa polling eth_blockNumber
+                latest_block = subscriber.head
+            else:
+                response = await make_rpc_request_async(session, rpc_url, "eth_blockNumber", [])
+                latest_block_hex = response.get('result') if response else None
+                if not latest_block_hex:
+                    await wait_for_next_cycle(subscriber, RETRY_INTERVAL)
+                    continue
+                latest_block = int(latest_block_hex, 16)
+            scheduler.observe_head(latest_block)
+            # Hanya blok yang sudah cukup dalam (aman dari reorg) yang diproses
+            to_block_to_check = latest_block - confirmations
 
             if last_processed_block == -1:
-                last_processed_block = latest_block
+                # Lanjutkan dari cursor tersimpan agar transfer selama downtime tidak hilang
+                stored_block = await asyncio.to_thread(database.get_chain_cursor, chain_name)
+                if stored_block is None:
+                    last_processed_block = to_block_to_check
+                    await asyncio.to_thread(database.set_chain_cursor, chain_name, last_processed_block)
+                else:
+                    last_processed_block = stored_block
+                    logging.info(f"[{chain_name}] Melanjutkan dari cursor tersimpan di blok {hex(stored_block)}")
+
+            if to_block_to_check - last_processed_block > MAX_CATCHUP_BLOCKS:
+                skipped_to = to_block_to_check - MAX_CATCHUP_BLOCKS
+                logging.warning(f"[{chain_name}] Ketertinggalan melebihi {MAX_CATCHUP_BLOCKS} blok, melompat dari {hex(last_processed_block)} ke {hex(skipped_to)}")
+                last_processed_block = skipped_to
+
+            # Dalam mode push, getAssetTransfers dipanggil segera jika ada log Transfer yang cocok di blok
+            # yang belum diproses. Transfer native tidak menghasilkan log, jadi blok tetap disapu setiap
+            # interval ChainScheduler (sama seperti mode polling), bukan menunggu log berikutnya.
+            fetch_calls = transfer_calls(len(wallets_to_monitor))
+            fetch_due = True
+            if push_active:
+                has_hit = subscriber.hit_block is not None and subscriber.hit_block > last_processed_block
+                fetch_due = has_hit or asyncio.get_running_loop().time() - last_sweep >= scheduler.next_interval(fetch_calls)
 
-            to_block_to_check = latest_block - 2
-            
-            if to_block_to_check > last_processed_block:
+            if fetch_due and to_block_to_check > last_processed_block:
+                sweep_started = asyncio.get_running_loop().time()
                 from_block_to_check = last_processed_block + 1
                 logging.info(f"[{chain_name}] Memeriksa blok dari {hex(from_block_to_check)} hingga {hex(to_block_to_check)}")
-                
-                params = [{
-                    "fromBlock": hex(from_block_to_check),
-                    "toBlock": hex(to_block_to_check),
-                    "address": wallets_to_monitor,
-                    "category": ["external", "erc20", "erc721", "erc1155"],
-                    "withMetadata": True,
-                    "excludeZeroValue": False,
-                }]
-                
-                response = make_rpc_request(rpc_url, "alchemy_getAssetTransfers", params)
-                
-                if response and 'result' in response and response['result'].get('transfers'):
-                    for tx in response['result']['transfers']:
-                        triggered_address = ""
-                        if tx['from'].lower() in wallets_to_monitor:
-                            triggered_address = tx['from']
-                        elif tx['to'].lower() in wallets_to_monitor:
-                            triggered_address = tx['to']
-                        
-                        if triggered_address:
-                            process_and_send(tx, chain_name, chain_data, triggered_address)
-
-                last_processed_block = to_block_to_check
-
-            time.sleep(20)
 
+                windows = split_block_range(from_block_to_check, to_block_to_check, scheduler.window_blocks())
+                # Jendela diambil paralel per kelompok, tetapi diproses berurutan agar cursor selalu maju rapat
+                for i in range(0, len(windows), CATCHUP_CONCURRENCY):
+                    group = windows[i:i + CATCHUP_CONCURRENCY]
+                    results = await asyncio.gather(*(
+                        fetch_transfers(session, rpc_url, wallets_to_monitor, start, end, fetch_semaphore)
+                        for start, end in group
+                    ))
+
+                    failed = False
+                    for (_, window_end), transfers in zip(group, results):
+                        if transfers is None:
+                            logging.warning(f"[{chain_name}] Gagal mengambil transfer hingga blok {hex(window_end)}, akan dicoba lagi")
+                            failed = True
+                            break
+
+                        matched = []
+                        for tx in transfers:
+                            # Transfer antar dua wallet yang dipantau dinotifikasi ke kedua sisi
+                            if tx['from'] and tx['from'].lower() in wallets_to_monitor:
+                                matched.append((tx, tx['from']))
+                            if tx['to'] and tx['to'].lower() in wallets_to_monitor:
+                                matched.append((tx, tx['to']))
+
+                        # Semua aset di jendela ini dihargai sekaligus (native dan ERC-20, lewat cache bersama)
+                        price_keys = {get_price_key(tx, chain_name, chain_data) for tx, _ in matched} - {None}
+                        prices = await price_book.get_prices(session, price_keys) if price_keys else {}
+                        # Semua transfer satu jendela dirender paralel (dibatasi RenderService) dan tersimpan di
+                        # antrean pengiriman (termasuk yang masih ditahan coalescer) sebelum cursor maju
+                        await asyncio.gather(*(
+                            process_and_send(tx, chain_name, chain_data, address, prices) for tx, address in matched
+                        ))
+
+                        last_processed_block = window_end
+                        await asyncio.to_thread(database.set_chain_cursor, chain_name, last_processed_block)
+
+                    if failed:
+                        break
+                else:
+                    last_sweep = sweep_started
+                    if subscriber:
+                        subscriber.clear_hit(last_processed_block)
+
+            await wait_for_next_cycle(subscriber, scheduler.next_interval(fetch_calls))
+
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logging.error(f"[{chain_name}] Error pada loop monitor: {e}")
-            time.sleep(30)
+            await asyncio.sleep(ERROR_INTERVAL)
+
+def start_chain_worker(session, chain):
+    """Membuat task monitor (dan langganan WebSocket pada mode 'ws') untuk satu jaringan."""
+    chain_data = CHAIN_CONFIG[chain]
+    tasks = []
+    subscriber = None
+    if config.MONITOR_MODE == 'ws':
+        _, ws_url = get_rpc_urls(chain_data)
+        subscriber = ChainSubscriber(session, ws_url, chain, lambda: watch_index.addresses(chain).keys())
+        tasks.append(asyncio.create_task(subscriber.run(), name=f"ws-{chain}"))
+    tasks.append(asyncio.create_task(monitor_chain(session, chain, chain_data, subscriber), name=f"monitor-{chain}"))
+    return tasks
+
+def on_chain_worker_stopped(chain):
+    # Cursor lama dibuang: jika nanti ada wallet baru di jaringan ini, pemantauan mulai dari head
+    # dan tidak mengirim ulang riwayat selama jaringan tidak dipantau.
+    database.delete_chain_cursor(chain)
+
+async def supervise_chains(supervisor):
+    """Menerapkan perubahan wallet/pengaturan ke indeks di memori, lalu menyelaraskan worker per jaringan."""
+    unknown_chains = set()
+    while True:
+        try:
+            # Baca SQLite di thread, lalu terapkan ke indeks di event loop (tanpa I/O)
+            changes = await asyncio.to_thread(watch_index.read_changes, watch_index.last_change_id)
+            applied = watch_index.apply(changes)
+            if applied:
+                logging.info(f"Indeks wallet diperbarui ({applied} perubahan).")
+            # Perubahan yang sudah diterapkan semua pembaca tidak diperlukan lagi
+            await asyncio.to_thread(database.ack_watch_changes, WATCH_CONSUMER, watch_index.last_change_id, WATCH_CONSUMER_STALE_AFTER)
+
+            watched = watch_index.chains()
+            for chain in watched - set(CHAIN_CONFIG) - unknown_chains:
+                logging.warning(f"Jaringan '{chain}' punya wallet dipantau tetapi tidak ada di CHAIN_CONFIG.")
+            unknown_chains |= watched - set(CHAIN_CONFIG)
+            await supervisor.reconcile(watched & set(CHAIN_CONFIG))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Gagal memperbarui indeks wallet atau worker jaringan: {e}")
+        await asyncio.sleep(WATCH_REFRESH_INTERVAL)
+
+async def prune_sent_notifications():
+    """Membuang kunci dedup yang sudah melewati masa retensi."""
+    while True:
+        removed = await asyncio.to_thread(database.prune_notification_keys, DEDUP_RETENTION)
+        if removed:
+            logging.info(f"{removed} kunci dedup notifikasi lama dihapus.")
+        await asyncio.sleep(DEDUP_PRUNE_INTERVAL)
+
+async def run_monitor():
+    """Menjalankan worker jaringan yang punya wallet dipantau sebagai task kooperatif di satu event loop."""
+    connector = aiohttp.TCPConnector(limit=HTTP_POOL_LIMIT, limit_per_host=HTTP_POOL_LIMIT_PER_HOST)
+    timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session, bot:
+        watch_index.load()
+        render_service.start()
+        await delivery_queue.start()
+        # Worker hanya berjalan untuk jaringan yang punya wallet dipantau; jaringan kosong tidak memakai RPC
+        supervisor = ChainSupervisor(lambda chain: start_chain_worker(session, chain), on_chain_worker_stopped)
+        logging.info(f"Mode monitor: {config.MONITOR_MODE}.")
+        tasks = [
+            asyncio.create_task(supervise_chains(supervisor), name="chain-supervisor"),
+            asyncio.create_task(prune_sent_notifications(), name="dedup-prune"),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            await supervisor.stop_all()
+            await coalescer.flush_all()
+            render_service.stop()
 
 def start_monitoring():
-    """Fungsi utama yang menjalankan semua monitor dalam thread terpisah."""
-    logging.info("Memulai Mesin Pemantau (Versi Final)...")
+    """Fungsi utama yang menjalankan mesin pemantau async."""
+    logging.info("Memulai Mesin Pemantau (Versi Async)...")
     database.setup_database()
-    
-    threads = []
-    active_chains = database.get_active_chains()
-    for chain in active_chains:
-        if chain in CHAIN_CONFIG:
-            thread = threading.Thread(target=monitor_chain, args=(chain, CHAIN_CONFIG[chain]))
-            threads.append(thread)
-            thread.start()
-            logging.info(f"Thread pemantauan untuk jaringan '{chain}' telah dimulai.")
-        else:
-            logging.warning(f"Konfigurasi untuk jaringan '{chain}' tidak ditemukan. Melewati.")
-            
-    for thread in threads:
-        thread.join()
+    asyncio.run(run_monitor())
 
 if __name__ == "__main__":
-    start_monitoring()
\ No newline at end of file
+    start_monitoring()
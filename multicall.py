@@ -0,0 +1,87 @@
+# multicall.py
+# Encode/decode ABI minimal untuk Multicall3 `aggregate3` dan pemanggilan view sederhana (tanpa web3).
+# Multicall3 ter-deploy di alamat yang sama di hampir semua jaringan EVM.
+
+MULTICALL3_ADDRESS = '0xca11bde05977b3631167028862be2a173976ca11'
+
+AGGREGATE3_SELECTOR = '82ad56cb'  # aggregate3((address,bool,bytes)[])
+
+
+def encode_address(address):
+    return address.lower()[2:].rjust(64, '0')
+
+def encode_uint(value):
+    return f'{value:064x}'
+
+def encode_call(selector, *words):
+    """Calldata hex ('0x...') untuk fungsi dengan argumen statis yang sudah di-encode per word."""
+    return '0x' + selector + ''.join(words)
+
+def decode_words(data):
+    """Pecah return data (bytes) menjadi list integer per word 32-byte."""
+    return [int.from_bytes(data[i:i + 32], 'big') for i in range(0, len(data) - len(data) % 32, 32)]
+
+def decode_address(word):
+    return '0x' + f'{word:064x}'[-40:]
+
+def _encode_bytes(data):
+    padded = data + b'\0' * (-len(data) % 32)
+    return encode_uint(len(data)) + padded.hex()
+
+def _encode_dynamic_array(items):
+    """Array dari elemen dinamis: panjang, offset tiap elemen, lalu isi elemen (semua dalam hex)."""
+    head = encode_uint(len(items))
+    offset = 32 * len(items)
+    offsets, bodies = [], []
+    for item in items:
+        offsets.append(encode_uint(offset))
+        bodies.append(item)
+        offset += len(item) // 2
+    return head + ''.join(offsets) + ''.join(bodies)
+
+def _decode_dynamic_array(data, start):
+    """Kebalikan _encode_dynamic_array: mengembalikan posisi awal (byte) setiap elemen."""
+    length = int.from_bytes(data[start:start + 32], 'big')
+    base = start + 32
+    return [base + int.from_bytes(data[base + 32 * i:base + 32 * i + 32], 'big') for i in range(length)]
+
+def _decode_bytes(data, start):
+    length = int.from_bytes(data[start:start + 32], 'big')
+    return data[start + 32:start + 32 + length]
+
+
+def encode_aggregate3(calls):
+    """`calls` berisi tuple (target, calldata hex); setiap panggilan boleh gagal (allowFailure = true)."""
+    items = [
+        encode_address(target) + encode_uint(1) + encode_uint(0x60) + _encode_bytes(bytes.fromhex(calldata[2:]))
+        for target, calldata in calls
+    ]
+    return '0x' + AGGREGATE3_SELECTOR + encode_uint(0x20) + _encode_dynamic_array(items)
+
+def decode_aggregate3_result(result_hex):
+    """Return data aggregate3 -> list bytes per panggilan (None jika panggilan itu gagal)."""
+    data = bytes.fromhex(result_hex[2:])
+    results = []
+    for start in _decode_dynamic_array(data, int.from_bytes(data[:32], 'big')):
+        success = int.from_bytes(data[start:start + 32], 'big')
+        offset = int.from_bytes(data[start + 32:start + 64], 'big')
+        results.append(_decode_bytes(data, start + offset) if success else None)
+    return results
+
+def decode_aggregate3_calls(calldata_hex):
+    """Kebalikan encode_aggregate3 (dipakai devnode): calldata -> list (target, calldata hex)."""
+    data = bytes.fromhex(calldata_hex[2 + 8:])
+    calls = []
+    for start in _decode_dynamic_array(data, int.from_bytes(data[:32], 'big')):
+        target = decode_address(int.from_bytes(data[start:start + 32], 'big'))
+        offset = int.from_bytes(data[start + 64:start + 96], 'big')
+        calls.append((target, '0x' + _decode_bytes(data, start + offset).hex()))
+    return calls
+
+def encode_aggregate3_result(results):
+    """Kebalikan decode_aggregate3_result (dipakai devnode): list bytes/None -> return data hex."""
+    items = [
+        encode_uint(1 if data is not None else 0) + encode_uint(0x40) + _encode_bytes(data or b'')
+        for data in results
+    ]
+    return '0x' + encode_uint(0x20) + _encode_dynamic_array(items)
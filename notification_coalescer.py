@@ -0,0 +1,132 @@
+# notification_coalescer.py
+# Mengelompokkan notifikasi transfer per pengguna dalam jendela singkat: satu foto dikirim biasa,
+# beberapa foto menjadi album (maks. 10 per album), dan jumlah besar menjadi satu ringkasan teks.
+# Setiap notifikasi langsung disimpan di antrean DeliveryQueue (tertahan) saat diterima; pengelompokan
+# hanya mengganti item-item tertahan itu, jadi crash selama jendela tidak menghilangkan notifikasi.
+
+import asyncio
+import logging
+
+from delivery import MAX_MEDIA_GROUP_SIZE
+
+# Lama (detik) notifikasi seorang pengguna ditahan untuk dikelompokkan
+COALESCE_WINDOW = 3
+# Batas panjang pesan Telegram
+MAX_MESSAGE_LENGTH = 4096
+
+
+class NotificationCoalescer:
+    """
+    `add()` menerima notifikasi berupa dict:
+      photo      bytes PNG kuitansi, atau None jika hanya ada versi teks
+      cache_key  kunci file_id untuk foto (lihat DeliveryQueue.enqueue_photo)
+      caption    caption foto
+      text       kuitansi versi teks (HTML), dipakai jika photo None
+      summary    satu baris ringkasan (HTML) untuk digest
+      dedup_key  kunci dedup notifikasi, dicatat bersama item antrean pertamanya
+    Pengaturan pengguna `group_notifications` dan `digest_threshold` menentukan cara pengiriman.
+    `add()` selesai setelah notifikasi tersimpan, sehingga pemanggil aman memajukan cursor bloknya.
+    """
+
+    def __init__(self, delivery_queue, window=COALESCE_WINDOW):
+        self.delivery_queue = delivery_queue
+        self.window = window
+        self.pending = {}  # user_id -> (settings, list (notifikasi, item tertahan))
+        self._flushes = set()  # task flush yang sedang berjalan (referensi agar tidak dibuang GC)
+
+    async def add(self, user_id, settings, notification):
+        if not settings.get('group_notifications'):
+            await self._send_single(user_id, notification)
+            return
+        item = await self._hold(user_id, notification)
+        if item is None:
+            # Kunci dedup sudah tercatat (misalnya transfer antar dua wallet milik pengguna yang sama)
+            return
+        if user_id not in self.pending:
+            self.pending[user_id] = (settings, [])
+            asyncio.get_running_loop().call_later(self.window, self._start_flush, user_id)
+        self.pending[user_id][1].append((notification, item))
+
+    def _start_flush(self, user_id):
+        task = asyncio.create_task(self.flush(user_id))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def flush(self, user_id):
+        entry = self.pending.pop(user_id, None)
+        if entry is None:
+            return
+        settings, held = entry
+        handed_off = set()  # id() item tertahan yang sudah dilepas atau digantikan album/digest
+        try:
+            threshold = settings.get('digest_threshold') or 0
+            if threshold and len(held) > threshold:
+                await self._send_digest(user_id, held, handed_off)
+            else:
+                await self._send_grouped(user_id, held, handed_off)
+        except Exception as e:
+            # Item tertahan yang belum terkirim dilepas apa adanya (satu per satu) agar tidak menunggu restart
+            remaining = [item for _, item in held if id(item) not in handed_off]
+            logging.error(f"Gagal mengirim notifikasi gabungan ke user {user_id}: {e}; {len(remaining)} notifikasi dikirim satu per satu")
+            for item in remaining:
+                self.delivery_queue.release(item)
+
+    async def flush_all(self):
+        for user_id in list(self.pending):
+            await self.flush(user_id)
+        await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    async def _hold(self, user_id, notification):
+        if notification['photo']:
+            return await self.delivery_queue.hold_photo(
+                user_id, notification['photo'], notification['caption'], cache_key=notification['cache_key'],
+                dedup_keys=[notification['dedup_key']]
+            )
+        return await self.delivery_queue.hold_message(user_id, notification['text'], parse_mode='HTML', dedup_keys=[notification['dedup_key']])
+
+    async def _send_single(self, user_id, notification):
+        if notification['photo']:
+            await self.delivery_queue.enqueue_photo(
+                user_id, notification['photo'], notification['caption'], cache_key=notification['cache_key'],
+                dedup_keys=[notification['dedup_key']]
+            )
+        else:
+            await self.delivery_queue.enqueue_message(user_id, notification['text'], parse_mode='HTML', dedup_keys=[notification['dedup_key']])
+
+    async def _send_grouped(self, user_id, held, handed_off):
+        with_photo = [(n, item) for n, item in held if n['photo']]
+        for notification, item in held:
+            if not notification['photo']:
+                self.delivery_queue.release(item)
+                handed_off.add(id(item))
+
+        for i in range(0, len(with_photo), MAX_MEDIA_GROUP_SIZE):
+            album = with_photo[i:i + MAX_MEDIA_GROUP_SIZE]
+            if len(album) == 1:
+                self.delivery_queue.release(album[0][1])
+                handed_off.add(id(album[0][1]))
+                continue
+            # Caption di foto pertama tampil sebagai caption album
+            captions = [f"{len(album)} transaksi terdeteksi"] + [n['caption'] for n, _ in album[1:]]
+            await self.delivery_queue.enqueue_media_group(
+                user_id, [n['photo'] for n, _ in album], captions, [n['cache_key'] for n, _ in album],
+                replaces=[item for _, item in album]
+            )
+            handed_off.update(id(item) for _, item in album)
+
+    async def _send_digest(self, user_id, held, handed_off):
+        header = f"<b>Ringkasan {len(held)} transaksi terdeteksi</b>\n\n"
+        lines = []
+        length = len(header)
+        for i, (notification, _) in enumerate(held):
+            line = f"• {notification['summary']}\n"
+            rest = f"\n...dan {len(held) - i} transaksi lainnya."
+            if length + len(line) + len(rest) > MAX_MESSAGE_LENGTH:
+                lines.append(rest)
+                break
+            lines.append(line)
+            length += len(line)
+        await self.delivery_queue.enqueue_message(
+            user_id, header + ''.join(lines), parse_mode='HTML', replaces=[item for _, item in held]
+        )
+        handed_off.update(id(item) for _, item in held)
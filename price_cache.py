@@ -0,0 +1,203 @@
+# price_cache.py
+# Cache harga bersama antar proses (main.py, monitor.py, price_monitor.py) di atas SQLite mode WAL.
+# Satu fetch CoinGecko dari proses mana pun langsung terlihat oleh proses lain.
+#
+# Kunci berupa (source, asset), misalnya ('coingecko', 'native:ethereum'). Entri yang jarang dibaca
+# dibuang (LRU) saat jumlahnya melewati batas, dan lease per kunci mencegah beberapa proses
+# mengambil harga yang sama bersamaan (single-flight).
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = os.path.join(BASE_DIR, 'price_cache.db')
+
+MAX_ENTRIES = 20000
+# Pembaruan accessed_at (untuk LRU) paling sering sekali per interval ini per entri, agar baca tidak selalu menulis
+ACCESS_RESOLUTION = 60
+# Eviction dicek setiap sekian kali put()
+EVICT_EVERY = 50
+# Lama lease refresh; proses lain menunggu hasilnya paling lama LEASE_WAIT sebelum mengambil sendiri
+LEASE_SECONDS = 15
+LEASE_WAIT = 5
+LEASE_POLL = 0.25
+
+
+class SharedPriceCache:
+    """
+    `get(keys, ttl, negative_ttl)` mengembalikan kunci -> (harga atau None, umur detik) untuk entri yang
+    masih segar; harga None adalah cache negatif (aset tanpa harga) dan memakai `negative_ttl`.
+    `acquire(keys)` mengambil lease refresh dan mengembalikan kunci yang berhasil di-lease; setelah
+    harga disimpan dengan `put()`, lease dilepas dengan `release()`.
+    Semua error SQLite dicatat dan diperlakukan sebagai cache miss.
+    Setiap thread memakai koneksinya sendiri (handler bot memanggil lewat asyncio.to_thread), sehingga
+    transaksi acquire() dari dua thread tidak pernah bercampur di satu koneksi.
+    """
+
+    def __init__(self, path=None, max_entries=MAX_ENTRIES):
+        self.path = path or CACHE_PATH
+        self.max_entries = max_entries
+        self.owner = uuid.uuid4().hex
+        self._local = threading.local()
+        self._puts = 0
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS prices (
+                    source TEXT NOT NULL,
+                    asset TEXT NOT NULL,
+                    price REAL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (source, asset)
+                ) WITHOUT ROWID
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_prices_accessed ON prices (accessed_at)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS refresh_leases (
+                    source TEXT NOT NULL,
+                    asset TEXT NOT NULL,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (source, asset)
+                ) WITHOUT ROWID
+            ''')
+            self._local.conn = conn
+        return conn
+
+    def get(self, keys, ttl, negative_ttl):
+        keys = list(keys)
+        if not keys:
+            return {}
+        now = time.time()
+        found = {}
+        try:
+            conn = self._connect()
+            stale_access = []
+            for source, asset in keys:
+                row = conn.execute(
+                    'SELECT price, fetched_at, accessed_at FROM prices WHERE source = ? AND asset = ?', (source, asset)
+                ).fetchone()
+                if row is None:
+                    continue
+                price, fetched_at, accessed_at = row
+                age = now - fetched_at
+                if age < (ttl if price is not None else negative_ttl):
+                    found[(source, asset)] = (price, age)
+                    if now - accessed_at > ACCESS_RESOLUTION:
+                        stale_access.append((now, source, asset))
+            if stale_access:
+                conn.executemany('UPDATE prices SET accessed_at = ? WHERE source = ? AND asset = ?', stale_access)
+        except sqlite3.Error as e:
+            logging.error(f"Gagal membaca cache harga bersama: {e}")
+        return found
+
+    def put(self, prices):
+        """Simpan harga (None = tidak ada harga) untuk kunci-kunci di dict `prices`."""
+        if not prices:
+            return
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.executemany(
+                'INSERT OR REPLACE INTO prices (source, asset, price, fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                [(source, asset, price, now, now) for (source, asset), price in prices.items()]
+            )
+            self._puts += 1
+            if self._puts % EVICT_EVERY == 0:
+                self.evict()
+        except sqlite3.Error as e:
+            logging.error(f"Gagal menyimpan cache harga bersama: {e}")
+
+    def evict(self):
+        """Buang entri yang paling lama tidak dibaca jika jumlah entri melewati batas."""
+        conn = self._connect()
+        count = conn.execute('SELECT COUNT(*) FROM prices').fetchone()[0]
+        if count > self.max_entries:
+            conn.execute(
+                'DELETE FROM prices WHERE (source, asset) IN (SELECT source, asset FROM prices ORDER BY accessed_at LIMIT ?)',
+                (count - self.max_entries,)
+            )
+        conn.execute('DELETE FROM refresh_leases WHERE expires_at < ?', (time.time(),))
+
+    def acquire(self, keys, lease_seconds=LEASE_SECONDS):
+        keys = list(keys)
+        if not keys:
+            return set()
+        now = time.time()
+        acquired = set()
+        try:
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for source, asset in keys:
+                    cursor = conn.execute('''
+                        INSERT INTO refresh_leases (source, asset, owner, expires_at) VALUES (?, ?, ?, ?)
+                        ON CONFLICT (source, asset) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                        WHERE refresh_leases.expires_at < ? OR refresh_leases.owner = excluded.owner
+                    ''', (source, asset, self.owner, now + lease_seconds, now))
+                    if cursor.rowcount > 0:
+                        acquired.add((source, asset))
+                conn.execute('COMMIT')
+            except sqlite3.Error:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            logging.error(f"Gagal mengambil lease cache harga: {e}")
+            # Cache tidak bisa dipakai untuk koordinasi; ambil sendiri semuanya
+            return set(keys)
+        return acquired
+
+    def release(self, keys):
+        keys = list(keys)
+        if not keys:
+            return
+        try:
+            self._connect().executemany(
+                'DELETE FROM refresh_leases WHERE source = ? AND asset = ? AND owner = ?',
+                [(source, asset, self.owner) for source, asset in keys]
+            )
+        except sqlite3.Error as e:
+            logging.error(f"Gagal melepas lease cache harga: {e}")
+
+    def get_or_fetch(self, key, fetch, ttl, negative_ttl):
+        """
+        Versi sinkron untuk satu kunci (dipakai handler bot): baca cache, atau ambil lease lalu panggil
+        `fetch()`. `fetch()` mengembalikan (berhasil, harga); hasil gagal tidak disimpan.
+        """
+        cached = self.get([key], ttl, negative_ttl)
+        if key in cached:
+            return cached[key][0]
+        if key not in self.acquire([key]):
+            deadline = time.monotonic() + LEASE_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(LEASE_POLL)
+                cached = self.get([key], ttl, negative_ttl)
+                if key in cached:
+                    return cached[key][0]
+        try:
+            ok, price = fetch()
+            if ok:
+                self.put({key: price})
+            return price
+        finally:
+            self.release([key])
+
+
+_shared = None
+
+def get_shared_cache():
+    """Instance cache bersama untuk proses ini."""
+    global _shared
+    if _shared is None:
+        _shared = SharedPriceCache()
+    return _shared
@@ -0,0 +1,152 @@
+# price_history.py
+# Riwayat harga per token di memori: ring buffer array NumPy berukuran tetap untuk sampel mentah,
+# bucket 1 menit dan bucket 1 jam (harga penutupan bucket). Memori per token konstan berapa pun
+# lamanya monitor berjalan, dan isi riwayat disimpan ke disk agar tetap ada setelah restart.
+
+import logging
+import os
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORY_PATH = os.path.join(BASE_DIR, 'price_history.npz')
+
+# (nama, lebar bucket detik, kapasitas): 0 = sampel mentah. Total sekitar 2 jam mentah, 1 hari 1m, 30 hari 1h.
+RESOLUTIONS = (('raw', 0, 256), ('1m', 60, 1440), ('1h', 3600, 720))
+
+
+class RingSeries:
+    """Deret waktu (timestamp, harga) dalam ring buffer; sampel di bucket yang sama menimpa sampel terakhir."""
+
+    def __init__(self, bucket, capacity):
+        self.bucket = bucket
+        self.ts = np.full(capacity, np.nan)
+        self.price = np.full(capacity, np.nan)
+        self.head = 0  # posisi tulis berikutnya
+        self.count = 0
+
+    def add(self, ts, price):
+        capacity = len(self.ts)
+        last = (self.head - 1) % capacity
+        if self.bucket and self.count and ts // self.bucket == self.ts[last] // self.bucket:
+            self.ts[last], self.price[last] = ts, price
+            return
+        self.ts[self.head], self.price[self.head] = ts, price
+        self.head = (self.head + 1) % capacity
+        self.count = min(self.count + 1, capacity)
+
+    def values(self):
+        """(timestamps, harga) berurutan dari yang terlama."""
+        order = (self.head - self.count + np.arange(self.count)) % len(self.ts)
+        return self.ts[order], self.price[order]
+
+    def oldest(self):
+        return self.ts[(self.head - self.count) % len(self.ts)] if self.count else None
+
+    def price_at(self, ts):
+        """Harga terakhir yang tercatat pada atau sebelum `ts` (None jika `ts` lebih tua dari deret ini)."""
+        times, prices = self.values()
+        i = np.searchsorted(times, ts, side='right')
+        return float(prices[i - 1]) if i else None
+
+
+class PriceHistory:
+    def __init__(self, resolutions=RESOLUTIONS):
+        self.resolutions = resolutions
+        self.series = {}  # token_key -> list RingSeries sesuai urutan resolutions
+
+    def _token(self, token_key):
+        series = self.series.get(token_key)
+        if series is None:
+            series = [RingSeries(bucket, capacity) for _, bucket, capacity in self.resolutions]
+            self.series[token_key] = series
+        return series
+
+    def record(self, token_key, price, ts=None):
+        ts = time.time() if ts is None else ts
+        for series in self._token(token_key):
+            series.add(ts, price)
+
+    def price_at(self, token_key, ts):
+        """Harga token pada waktu `ts` dari resolusi paling halus yang masih mencakup waktu tersebut."""
+        for series in self.series.get(token_key, ()):
+            if series.count and series.oldest() <= ts:
+                return series.price_at(ts)
+        return None
+
+    def oldest_price(self, token_key):
+        """Sampel tertua yang masih tersimpan (dari resolusi paling kasar)."""
+        series = self.series.get(token_key)
+        if not series or not series[-1].count:
+            return None
+        return float(series[-1].values()[1][0])
+
+    def history(self, token_key, resolution='1m'):
+        """(timestamps, harga) untuk satu resolusi, misalnya untuk grafik atau perubahan historis."""
+        names = [name for name, _, _ in self.resolutions]
+        series = self.series.get(token_key)
+        if not series:
+            return np.array([]), np.array([])
+        return series[names.index(resolution)].values()
+
+    def samples_since(self, token_key, since):
+        """
+        (timestamps, harga) sejak `since`, dari yang terlama. Setiap bagian waktu diambil dari resolusi paling
+        halus yang masih mencakupnya: resolusi kasar hanya mengisi bagian yang lebih tua dari resolusi halus.
+        """
+        parts = []
+        cutoff = np.inf
+        for series in self.series.get(token_key, ()):
+            if not series.count:
+                continue
+            times, prices = series.values()
+            keep = (times >= since) & (times < cutoff)
+            parts.append((times[keep], prices[keep]))
+            cutoff = min(cutoff, series.oldest())
+        if not parts:
+            return np.array([]), np.array([])
+        parts.reverse()
+        return np.concatenate([times for times, _ in parts]), np.concatenate([prices for _, prices in parts])
+
+    def retain(self, token_keys):
+        """Buang riwayat token yang tidak lagi dipantau."""
+        for token_key in set(self.series) - set(token_keys):
+            del self.series[token_key]
+
+    def save(self, path=None):
+        """Snapshot ke file .npz (ditulis ke file sementara lalu di-rename agar tidak pernah setengah jadi)."""
+        path = path or HISTORY_PATH
+        token_keys = sorted(self.series)
+        arrays = {'token_keys': np.array(token_keys, dtype=str)}
+        for i, (name, _, capacity) in enumerate(self.resolutions):
+            ts = np.full((len(token_keys), capacity), np.nan)
+            price = np.full((len(token_keys), capacity), np.nan)
+            for row, token_key in enumerate(token_keys):
+                times, prices = self.series[token_key][i].values()
+                ts[row, :len(times)], price[row, :len(prices)] = times, prices
+            arrays[f'{name}_ts'], arrays[f'{name}_price'] = ts, price
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    def load(self, path=None):
+        path = path or HISTORY_PATH
+        if not os.path.exists(path):
+            return False
+        try:
+            with np.load(path) as data:
+                token_keys = list(data['token_keys'])
+                for i, (name, _, _) in enumerate(self.resolutions):
+                    ts_rows, price_rows = data[f'{name}_ts'], data[f'{name}_price']
+                    for row, token_key in enumerate(token_keys):
+                        series = self._token(str(token_key))[i]
+                        for ts, price in zip(ts_rows[row], price_rows[row]):
+                            if not np.isnan(ts):
+                                series.add(ts, price)
+        except Exception as e:
+            logging.error(f"Gagal memuat riwayat harga dari {path}: {e}")
+            self.series = {}
+            return False
+        logging.info(f"Riwayat harga {len(self.series)} token dimuat dari {path}")
+        return True
@@ -2,16 +2,25 @@
 # Indonesia: Worker untuk monitor harga dan trigger alert
 
 import asyncio
+import math
 import time
 import logging
+import zlib
 from datetime import datetime
+import aiohttp
 from telegram import Bot
-import requests
+from telegram.request import HTTPXRequest
 
 import config
 import database
-from constants import CHAIN_CONFIG
-from bot.utils import get_price
+from constants import CHAIN_CONFIG, COINGECKO_ASSET_PLATFORMS, DEX_CONFIG
+from delivery import DeliveryQueue
+from dex_pricer import DexPricer
+from price_cache import get_shared_cache
+from pricing import PriceBook, is_native_token, native_key, token_key as contract_price_key
+from alert_book import AlertBook
+from price_history import PriceHistory
+from rolling_window import WindowTracker
 
 # Indonesia: Setup logging untuk monitor harga
 logging.basicConfig(
@@ -19,217 +28,304 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
-bot = Bot(token=config.TELEGRAM_TOKEN)
+bot = Bot(token=config.TELEGRAM_TOKEN, request=HTTPXRequest(connection_pool_size=16))
+
+def log_sent_alert(item, message):
+    """Indonesia: Catat notifikasi alert ke database setelah benar-benar terkirim"""
+    context = item['payload'].get('context') or {}
+    if context.get('alert_id'):
+        database.log_alert_notification(context['alert_id'], item['chat_id'], 'price_reached', item['payload']['text'])
+
+# Indonesia: Setiap replika punya antrean sendiri; start() memulihkan semua baris pending dengan nama antrean ini,
+# jadi nama bersama akan membuat replika yang restart mengirim ulang alert yang sedang dikirim replika lain
+DELIVERY_QUEUE_NAME = 'price_monitor' if config.PRICE_MONITOR_REPLICAS == 1 else f'price_monitor-{config.PRICE_MONITOR_REPLICA_INDEX}'
+delivery_queue = DeliveryQueue(bot, DELIVERY_QUEUE_NAME, on_sent=log_sent_alert)
+
+# Indonesia: Jeda antar putaran; harga di-cache sedikit lebih singkat agar setiap putaran memakai harga baru
+ROUND_INTERVAL = 30
+PRICE_TTL = 25
+# Indonesia: Jika perubahan alert sejak sinkronisasi terakhir lebih dari ini, muat ulang penuh lebih murah
+MAX_ALERT_CHANGES = 10000
+# Indonesia: Interval (detik) snapshot riwayat harga ke disk
+HISTORY_SNAPSHOT_INTERVAL = 300
 
 class PriceMonitor:
     def __init__(self):
-        self.price_cache = {}  # Indonesia: Cache harga untuk menghindari spam API
-        self.last_check_time = {}
-        self.coingecko_rate_limit = 0
+        # Indonesia: Cache harga bersama (TTL) untuk menghindari spam API
+        self.price_book = PriceBook(ttl=PRICE_TTL, shared=get_shared_cache())
+        # Indonesia: Harga on-chain dari pool DEX (pool terpilih di-cache), satu multicall per jaringan per putaran
+        self.dex_pricer = DexPricer()
+        self.session = None
+        # Indonesia: Alert aktif yang sedang dipantau, disimpan sebagai kolom array NumPy
+        self.alert_book = AlertBook()
+        self.alert_version = None  # Indonesia: Versi perubahan alert terakhir yang sudah diterapkan
+        # Indonesia: Shard token replika ini (lihat owns_token)
+        self.replicas = config.PRICE_MONITOR_REPLICAS
+        self.replica_index = config.PRICE_MONITOR_REPLICA_INDEX
+        # Indonesia: Riwayat harga per token (ring buffer mentah/1m/1h) untuk baseline dan logika historis
+        self.price_history = PriceHistory()
+        self.last_history_save = time.monotonic()
+        # Indonesia: Min/max bergulir per (token, panjang jendela) untuk alert 'window'
+        self.window_tracker = WindowTracker()
         
     async def start_monitoring(self):
         """Indonesia: Mulai monitoring harga untuk semua alert aktif"""
-        logging.info("🚀 Indonesia: Memulai Price Monitor untuk alert sistem...")
+        logging.info(f"🚀 Indonesia: Memulai Price Monitor untuk alert sistem (replika {self.replica_index + 1}/{self.replicas})...")
         
-        while True:
-            try:
-                # Indonesia: Ambil semua alert aktif
-                active_alerts = database.get_all_active_alerts()
-                logging.info(f"📊 Indonesia: Monitoring {len(active_alerts)} alert aktif")
-                
-                if not active_alerts:
-                    logging.info("😴 Indonesia: Tidak ada alert aktif, tidur 60 detik...")
-                    await asyncio.sleep(60)
-                    continue
-                
-                # Indonesia: Group alerts by token untuk efisiensi API calls
-                alerts_by_token = self.group_alerts_by_token(active_alerts)
-                
-                # Indonesia: Check harga untuk setiap token
-                for token_key, alerts in alerts_by_token.items():
-                    await self.check_token_alerts(token_key, alerts)
-                    
-                    # Indonesia: Rate limiting untuk API calls
-                    await asyncio.sleep(2)
-                
-                # Indonesia: Tunggu 30 detik sebelum check lagi
-                logging.info("⏳ Indonesia: Menunggu 30 detik untuk check berikutnya...")
-                await asyncio.sleep(30)
-                
-            except Exception as e:
-                logging.error(f"❌ Indonesia: Error dalam price monitoring: {e}")
-                await asyncio.sleep(60)
-    
-    def group_alerts_by_token(self, alerts):
-        """Indonesia: Group alerts berdasarkan token untuk efisiensi"""
-        grouped = {}
-        for alert in alerts:
-            token_key = f"{alert['chain']}_{alert['token_address']}"
-            if token_key not in grouped:
-                grouped[token_key] = []
-            grouped[token_key].append(alert)
-        return grouped
-    
-    async def check_token_alerts(self, token_key, alerts):
-        """Indonesia: Check harga token dan trigger alert jika kondisi terpenuhi"""
+        self.price_history.load()
         try:
-            chain, token_address = token_key.split('_', 1)
-            
-            # Indonesia: Ambil harga saat ini
-            current_price = await self.get_current_price(chain, token_address)
-            
-            if current_price is None:
-                logging.warning(f"⚠️ Indonesia: Gagal mendapat harga untuk {token_key}")
-                return
-            
-            # Indonesia: Check setiap alert untuk token ini
-            for alert in alerts:
-                if self.should_trigger_alert(alert, current_price):
-                    await self.trigger_alert(alert, current_price)
+            await self.monitor_loop()
+        finally:
+            self.save_price_history()
+    
+    async def monitor_loop(self):
+        async with aiohttp.ClientSession() as session:
+            self.session = session
+            while True:
+                try:
+                    # Indonesia: Terapkan perubahan alert sejak putaran sebelumnya (muat penuh hanya saat start/gap)
+                    self.refresh_alerts()
+                    logging.info(f"📊 Indonesia: Monitoring {len(self.alert_book)} alert aktif")
                     
-        except Exception as e:
-            logging.error(f"❌ Indonesia: Error checking {token_key}: {e}")
+                    if not len(self.alert_book):
+                        logging.info("😴 Indonesia: Tidak ada alert aktif, tidur 60 detik...")
+                        await asyncio.sleep(60)
+                        continue
+                    
+                    # Indonesia: Ambil harga semua token sekaligus (satu snapshot)
+                    started = time.monotonic()
+                    snapshot = await self.get_price_snapshot(self.alert_book.active_tokens())
+                    
+                    # Indonesia: Catat ke riwayat harga, lalu lengkapi baseline alert persen yang belum punya
+                    self.record_prices(snapshot)
+                    self.fill_missing_baselines(snapshot)
+                    
+                    # Indonesia: Semua alert dievaluasi dari snapshot yang sama, tanpa request tambahan
+                    await self.check_alerts(snapshot)
+                    
+                    if time.monotonic() - self.last_history_save >= HISTORY_SNAPSHOT_INTERVAL:
+                        self.price_history.retain(self.alert_book.active_tokens())
+                        self.save_price_history()
+                    
+                    logging.info(f"⏳ Indonesia: {len(snapshot)} token dicek dalam {time.monotonic() - started:.1f} detik, menunggu {ROUND_INTERVAL} detik...")
+                    await asyncio.sleep(ROUND_INTERVAL)
+                    
+                except Exception as e:
+                    logging.error(f"❌ Indonesia: Error dalam price monitoring: {e}")
+                    await asyncio.sleep(60)
     
-    async def get_current_price(self, chain, token_address):
-        """Indonesia: Ambil harga token saat ini dari berbagai sumber"""
-        try:
-            # Indonesia: Cek cache dulu (untuk menghindari rate limit)
-            cache_key = f"{chain}_{token_address}"
-            now = time.time()
-            
-            if cache_key in self.price_cache:
-                cached_price, cached_time = self.price_cache[cache_key]
-                if now - cached_time < 60:  # Indonesia: Cache 1 menit
-                    return cached_price
-            
-            # Indonesia: Prioritas: Native token dulu (ETH, MATIC, dll)
-            if self.is_native_token(chain, token_address):
-                price = await self.get_native_token_price(chain)
+    def load_alerts(self):
+        """Indonesia: Muat ulang seluruh alert aktif ke buku alert (saat start atau saat terdeteksi gap)"""
+        # Indonesia: Ambil versi dulu agar perubahan yang terjadi selama load tetap diterapkan ulang nanti
+        version = database.get_latest_alert_version()
+        if version is None:
+            return False
+        self.alert_book.sync([alert for alert in database.get_all_active_alerts() if self.owns_alert(alert)])
+        self.alert_version = version
+        logging.info(f"📥 Indonesia: {len(self.alert_book)} alert aktif dimuat (versi {version})")
+        return True
+    
+    def refresh_alerts(self):
+        """
+        Indonesia: Terapkan alert yang berubah sejak versi terakhir. Muat ulang penuh jika belum pernah dimuat,
+        jika versi database mundur (database diganti/dipulihkan), atau jika perubahannya terlalu banyak.
+        """
+        if self.alert_version is None:
+            return self.load_alerts()
+        
+        latest = database.get_latest_alert_version()
+        if latest is None:
+            return False
+        if latest < self.alert_version:
+            logging.warning(f"⚠️ Indonesia: Versi alert mundur ({self.alert_version} -> {latest}), muat ulang penuh")
+            return self.load_alerts()
+        if latest == self.alert_version:
+            return True
+        
+        changes = database.get_alert_changes_since(self.alert_version, MAX_ALERT_CHANGES + 1)
+        if changes is None:
+            return False
+        if len(changes) > MAX_ALERT_CHANGES:
+            logging.info(f"📥 Indonesia: Lebih dari {MAX_ALERT_CHANGES} perubahan alert, muat ulang penuh")
+            return self.load_alerts()
+        
+        for alert in changes:
+            if alert['is_active'] and not alert['is_triggered'] and self.owns_alert(alert):
+                self.alert_book.add(alert)
             else:
-                # Indonesia: Token custom, coba dari DEX atau CoinGecko
-                price = await self.get_token_price_from_dex(chain, token_address)
-                if price is None:
-                    price = await self.get_token_price_from_coingecko(token_address)
-            
-            # Indonesia: Simpan ke cache
+                self.alert_book.remove(alert['id'])
+            self.alert_version = alert['version']
+        logging.info(f"🔄 Indonesia: {len(changes)} perubahan alert diterapkan (versi {self.alert_version})")
+        return True
+    
+    def owns_token(self, token_key):
+        """
+        Indonesia: Token dibagi antar replika dengan crc32(token_key) % jumlah replika, jadi setiap token
+        (beserta semua alert-nya) dipantau tepat satu replika tanpa koordinasi.
+        """
+        return zlib.crc32(token_key.lower().encode()) % self.replicas == self.replica_index
+    
+    def owns_alert(self, alert):
+        return self.owns_token(f"{alert['chain']}_{alert['token_address']}")
+    
+    def record_prices(self, snapshot):
+        now = time.time()
+        self.sync_windows(now)
+        for token_key, price in snapshot.items():
             if price is not None:
-                self.price_cache[cache_key] = (price, now)
-                
-            return price
-            
-        except Exception as e:
-            logging.error(f"❌ Indonesia: Error mendapat harga {chain}_{token_address}: {e}")
-            return None
+                self.price_history.record(token_key, price, now)
+                self.window_tracker.record(token_key, now, price)
     
-    def is_native_token(self, chain, token_address):
-        """Indonesia: Check apakah ini native token (ETH, MATIC, dll)"""
-        native_addresses = {
-            'ethereum': ['0x0000000000000000000000000000000000000000', 
-                        '0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2'],  # ETH & WETH
-            'polygon': ['0x0000000000000000000000000000000000001010'],  # MATIC
-            'arbitrum': ['0x0000000000000000000000000000000000000000'],  # ETH
-            'optimism': ['0x0000000000000000000000000000000000000000'],  # ETH
-        }
-        
-        return token_address.lower() in [addr.lower() for addr in native_addresses.get(chain, [])]
+    def sync_windows(self, now):
+        """
+        Indonesia: Siapkan jendela bergulir untuk alert 'window' baru (diisi awal dari riwayat harga agar tidak
+        perlu menunggu satu jendela penuh) dan buang jendela yang tidak dipakai lagi. Sampel mentah hanya
+        mencakup ~2 jam, jadi bagian jendela yang lebih tua diisi dari resolusi 1m/1h.
+        """
+        wanted = self.alert_book.active_windows()
+        for token_key, seconds in wanted:
+            if (token_key, seconds) not in self.window_tracker.windows:
+                times, prices = self.price_history.samples_since(token_key, now - seconds)
+                self.window_tracker.ensure(token_key, seconds, seed=list(zip(times.tolist(), prices.tolist())))
+        self.window_tracker.retain(wanted)
     
-    async def get_native_token_price(self, chain):
-        """Indonesia: Ambil harga native token dari CoinGecko"""
-        chain_data = CHAIN_CONFIG.get(chain, {})
-        coingecko_id = chain_data.get('coingecko_id')
-        
-        if coingecko_id:
-            return get_price(coingecko_id)
-        return None
+    def fill_missing_baselines(self, snapshot):
+        """
+        Indonesia: Alert persen tanpa harga awal (misalnya token yang hanya punya harga DEX, sehingga bot
+        membuatnya dengan created_price NULL) mendapat baseline dari feed harga monitor sendiri: riwayat harga
+        pada waktu pembuatannya, sampel tertua jika alert lebih tua dari riwayat, atau harga snapshot ini.
+        """
+        for alert_id, token_key, created_ts in self.alert_book.missing_baselines():
+            price = self.price_history.price_at(token_key, created_ts) if not math.isnan(created_ts) else None
+            if price is None:
+                price = self.price_history.oldest_price(token_key)
+            if price is None:
+                price = snapshot.get(token_key)
+            if price is None:
+                continue
+            self.alert_book.set_baseline(alert_id, price)
+            database.set_alert_created_price(alert_id, price)
+            logging.info(f"📌 Indonesia: Baseline alert #{alert_id} diisi dari feed harga monitor: ${price:,.6f}")
     
-    async def get_token_price_from_dex(self, chain, token_address):
-        """Indonesia: Ambil harga token dari DEX (Uniswap, dll) via Alchemy"""
+    def save_price_history(self):
         try:
-            # Indonesia: Untuk implementasi lengkap, bisa pakai Alchemy DEX APIs
-            # Sementara return None, nanti implement sesuai kebutuhan
-            return None
-            
+            self.price_history.save()
         except Exception as e:
-            logging.error(f"❌ Indonesia: Error DEX price {token_address}: {e}")
-            return None
+            logging.error(f"❌ Indonesia: Gagal menyimpan riwayat harga: {e}")
+        self.last_history_save = time.monotonic()
     
-    async def get_token_price_from_coingecko(self, token_address):
-        """Indonesia: Coba ambil harga dari CoinGecko by contract address"""
-        try:
-            # Indonesia: Rate limiting untuk CoinGecko (max 10-50 calls per minute)
-            now = time.time()
-            if now - self.coingecko_rate_limit < 6:  # Indonesia: 6 detik antar call
-                await asyncio.sleep(6)
-            
-            url = f"https://api.coingecko.com/api/v3/simple/token_price/ethereum"
-            params = {
-                'contract_addresses': token_address,
-                'vs_currencies': 'usd'
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            self.coingecko_rate_limit = time.time()
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data.get(token_address.lower(), {}).get('usd')
-            
-            return None
-            
-        except Exception as e:
-            logging.error(f"❌ Indonesia: Error CoinGecko price {token_address}: {e}")
-            return None
+    async def check_alerts(self, snapshot):
+        """
+        Indonesia: Evaluasi semua alert sekaligus terhadap snapshot harga (perbandingan tervektorisasi),
+        klaim semua alert yang terpenuhi dalam satu transaksi, lalu kirim notifikasi untuk yang berhasil diklaim.
+        """
+        for token_key, price in snapshot.items():
+            if price is None:
+                logging.warning(f"⚠️ Indonesia: Gagal mendapat harga untuk {token_key}")
+        
+        hits = []
+        for alert_id in self.alert_book.evaluate(snapshot, self.window_tracker.extremes()).tolist():
+            alert = self.alert_book.get(alert_id)
+            hits.append((alert, snapshot[f"{alert['chain']}_{alert['token_address']}"]))
+        if not hits:
+            return
+        
+        # Indonesia: Klaim atomik; alert yang sudah di-trigger/dihapus di tempat lain tidak ikut diklaim
+        claimed = database.claim_price_alerts([(alert['id'], price) for alert, price in hits])
+        if claimed is None:
+            # Indonesia: Database gagal, alert tetap di buku dan dicoba lagi putaran berikutnya
+            logging.error(f"❌ Indonesia: Gagal klaim {len(hits)} alert di database")
+            return
+        
+        # Indonesia: Keluarkan dari buku sekaligus, baik diklaim replika ini maupun sudah tidak aktif
+        self.alert_book.remove_fired(snapshot, [alert['id'] for alert, _ in hits])
+        for alert, price in hits:
+            if alert['id'] in claimed:
+                await self.trigger_alert(alert, price)
+            else:
+                logging.info(f"ℹ️ Indonesia: Alert #{alert['id']} sudah di-trigger atau dihapus sebelumnya, dilewati")
     
-    def should_trigger_alert(self, alert, current_price):
-        """Indonesia: Cek apakah alert harus di-trigger"""
-        alert_type = alert['alert_type']
+    async def get_price_snapshot(self, token_keys):
+        """
+        Indonesia: Harga semua token dalam satu putaran. Token native digabung dalam satu request
+        `/simple/price` dan token custom per platform dalam `/simple/token_price/{platform}`. Hanya token
+        yang tidak punya harga di CoinGecko yang dihargai dari pool DEX (satu multicall per jaringan).
+        Mengembalikan dict token_key -> harga (None jika tidak diketahui).
+        """
+        snapshot = {}
+        native_keys = {}
+        custom_by_chain = {}
+        for token_key in token_keys:
+            chain, token_address = token_key.split('_', 1)
+            # Indonesia: Aturan native yang sama dengan bot (alamat nol di semua jaringan, lihat pricing.is_native_token)
+            if is_native_token(chain, token_address):
+                coingecko_id = CHAIN_CONFIG.get(chain, {}).get('coingecko_id')
+                if coingecko_id:
+                    native_keys[token_key] = native_key(coingecko_id)
+                continue
+            custom_by_chain.setdefault(chain, {})[token_address.lower()] = token_key
         
-        if alert_type == 'above':
-            return current_price >= alert['target_price']
-        elif alert_type == 'below':
-            return current_price <= alert['target_price']
-        elif alert_type == 'percent':
-            created_price = alert.get('created_price', 0)
-            if created_price <= 0:
-                return False
-            
-            price_change_percent = ((current_price - created_price) / created_price) * 100
-            target_percent = alert['target_percentage']
-            
-            # Indonesia: Check apakah perubahan sudah mencapai target
-            if target_percent > 0:  # Indonesia: Alert untuk kenaikan
-                return price_change_percent >= target_percent
-            else:  # Indonesia: Alert untuk penurunan
-                return price_change_percent <= target_percent
+        # Indonesia: Token custom dari CoinGecko dulu, di platform jaringan token tersebut
+        price_keys = {}
+        for chain, tokens in custom_by_chain.items():
+            platform = self.get_token_platform(chain)
+            if platform:
+                for token_address, token_key in tokens.items():
+                    price_keys[token_key] = contract_price_key(platform, token_address)
+        if price_keys:
+            prices = await self.price_book.get_prices(self.session, price_keys.values())
+            for token_key, price_key in price_keys.items():
+                snapshot[token_key] = prices.get(price_key)
+        
+        # Indonesia: Sisanya (tidak dikenal CoinGecko) dicoba dari pool DEX
+        missing_by_chain = {}
+        for chain, tokens in custom_by_chain.items():
+            for token_address, token_key in tokens.items():
+                if snapshot.get(token_key) is None:
+                    snapshot[token_key] = None
+                    if chain in DEX_CONFIG:
+                        missing_by_chain.setdefault(chain, {})[token_address] = token_key
+        
+        # Indonesia: Harga native juga dibutuhkan untuk mengubah harga pool berpasangan WETH/WBNB/dll ke USD
+        chain_native_keys = {chain: native_key(CHAIN_CONFIG[chain]['coingecko_id']) for chain in missing_by_chain}
+        natives = await self.price_book.get_prices(self.session, [*native_keys.values(), *chain_native_keys.values()])
+        for token_key, price_key in native_keys.items():
+            snapshot[token_key] = natives.get(price_key)
         
-        return False
+        dex_chains = list(missing_by_chain)
+        dex_results = await asyncio.gather(*[
+            self.get_token_prices_from_dex(chain, list(missing_by_chain[chain]), natives.get(chain_native_keys[chain]))
+            for chain in dex_chains
+        ])
+        for chain, dex_prices in zip(dex_chains, dex_results):
+            for token_address, token_key in missing_by_chain[chain].items():
+                snapshot[token_key] = dex_prices.get(token_address)
+        return snapshot
+    
+    async def get_token_prices_from_dex(self, chain, token_addresses, native_usd):
+        """Indonesia: Harga USD token dari pool DEX on-chain (Uniswap V2/V3 dan sejenisnya) untuk satu jaringan"""
+        try:
+            return await self.dex_pricer.get_prices(self.session, chain, token_addresses, native_usd)
+        except Exception as e:
+            logging.error(f"❌ Indonesia: Error DEX price {chain}: {e}")
+            return {}
+    
+    def get_token_platform(self, chain):
+        """Indonesia: Platform CoinGecko untuk harga token kontrak (None jika jaringan tidak didukung)"""
+        return COINGECKO_ASSET_PLATFORMS.get(chain)
     
     async def trigger_alert(self, alert, current_price):
-        """Indonesia: Trigger alert dan kirim notifikasi ke user"""
+        """Indonesia: Kirim notifikasi untuk alert yang sudah diklaim (lihat check_alerts)"""
         try:
-            # Indonesia: Mark alert sebagai triggered di database
-            success = database.trigger_price_alert(alert['id'], current_price)
-            
-            if not success:
-                logging.error(f"❌ Indonesia: Gagal update alert {alert['id']} di database")
-                return
-            
             # Indonesia: Buat pesan notifikasi
             message = self.create_alert_message(alert, current_price)
             
-            # Indonesia: Kirim notifikasi ke user
-            await bot.send_message(
-                chat_id=alert['user_id'],
-                text=message,
-                parse_mode='Markdown'
-            )
-            
-            # Indonesia: Log notifikasi ke database
-            database.log_alert_notification(
-                alert['id'], 
-                alert['user_id'], 
-                'price_reached', 
-                message
+            # Indonesia: Masukkan ke antrean pengiriman (log notifikasi dicatat setelah terkirim)
+            await delivery_queue.enqueue_message(
+                alert['user_id'],
+                message,
+                parse_mode='Markdown',
+                context={'alert_id': alert['id']}
             )
             
             logging.info(f"✅ Indonesia: Alert #{alert['id']} berhasil di-trigger untuk user {alert['user_id']}")
@@ -250,6 +346,10 @@ class PriceMonitor:
         elif alert_type == 'below':
             emoji = "📉⚠️"
             condition_text = f"turun di bawah ${alert['target_price']:,.6f}"
+        elif alert_type == 'window':
+            emoji = "⚡📈" if alert['target_percentage'] > 0 else "⚡📉"
+            direction = "naik" if alert['target_percentage'] > 0 else "turun"
+            condition_text = f"{direction} {abs(alert['target_percentage']):.1f}% dalam {alert['window_minutes']} menit"
         else:  # percent
             if alert['target_percentage'] > 0:
                 emoji = "📈🎉"
@@ -279,7 +379,9 @@ async def main():
     
     # Indonesia: Buat instance monitor dan mulai
     monitor = PriceMonitor()
-    await monitor.start_monitoring()
+    async with bot:
+        await delivery_queue.start()
+        await monitor.start_monitoring()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,199 @@
+# pricing.py
+# Harga USD dari CoinGecko secara batch: banyak id native dalam satu `/simple/price` dan banyak
+# kontrak per platform dalam satu `/simple/token_price/{platform}`, dengan cache TTL di memori dan
+# (opsional) cache bersama antar proses dari price_cache.py.
+
+import asyncio
+import logging
+import time
+
+from constants import NATIVE_TOKEN_ALIASES
+from price_cache import LEASE_WAIT, LEASE_POLL
+
+COINGECKO_API_URL = "https://api.coingecko.com/api/v3"
+PRICE_TTL = 60
+# Aset tanpa harga di CoinGecko (misalnya kontrak yang tidak terdaftar) tidak ditanyakan ulang selama ini
+NEGATIVE_TTL = 6 * 3600
+# Batas jumlah id/kontrak per request agar URL tidak terlalu panjang
+MAX_IDS_PER_REQUEST = 100
+MAX_CONTRACTS_PER_REQUEST = 30
+REQUEST_TIMEOUT = 10
+ZERO_ADDRESS = '0x' + '0' * 40
+
+
+def is_native_token(chain, token_address):
+    """Alamat ini dihargai sebagai koin native jaringan (alamat nol di semua jaringan, plus NATIVE_TOKEN_ALIASES)."""
+    token_address = token_address.lower()
+    return token_address == ZERO_ADDRESS or token_address in NATIVE_TOKEN_ALIASES.get(chain, ())
+
+def native_key(coingecko_id):
+    return ('native', coingecko_id)
+
+def token_key(platform, contract_address):
+    return ('token', platform, contract_address.lower())
+
+def shared_key(key):
+    """Kunci PriceBook -> kunci (source, asset) di cache bersama."""
+    return ('coingecko', ':'.join(key))
+
+def _chunks(items, size):
+    items = sorted(items)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class PriceBook:
+    """
+    Cache harga dengan kunci `native_key()` / `token_key()`. `get_prices()` hanya mengambil kunci yang
+    belum ada atau sudah kedaluwarsa, digabung menjadi sesedikit mungkin request. Aset yang dijawab
+    CoinGecko tanpa harga disimpan sebagai None selama `negative_ttl` (cache negatif), sehingga
+    token yang tidak bisa dihargai tidak menghabiskan kuota request setiap siklus.
+    Dengan `shared` (SharedPriceCache), cache miss dicari dulu di cache bersama, dan kunci yang sedang
+    diambil proses lain ditunggu hasilnya, sehingga satu fetch melayani semua proses.
+    """
+
+    def __init__(self, ttl=PRICE_TTL, negative_ttl=NEGATIVE_TTL, shared=None):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.shared = shared
+        self.cache = {}  # kunci -> (harga atau None, waktu diambil)
+        self._inflight = {}  # kunci -> Future, agar kunci yang sama tidak diambil dua kali bersamaan
+
+    def cached(self, key):
+        entry = self.cache.get(key)
+        if entry:
+            ttl = self.ttl if entry[0] is not None else self.negative_ttl
+            if time.monotonic() - entry[1] < ttl:
+                return entry
+        return None
+
+    async def get_prices(self, session, keys):
+        """Mengembalikan dict kunci -> harga USD (None jika tidak diketahui)."""
+        result = {}
+        missing = []
+        waiting = {}
+        for key in set(keys):
+            entry = self.cached(key)
+            if entry:
+                result[key] = entry[0]
+            elif key in self._inflight:
+                waiting[key] = self._inflight[key]
+            else:
+                missing.append(key)
+
+        if missing:
+            # Future didaftarkan sebelum await pertama, agar pemanggil lain menunggu alih-alih mengambil ulang
+            loop = asyncio.get_running_loop()
+            for key in missing:
+                self._inflight[key] = loop.create_future()
+            fetched = {}
+            try:
+                fetched = await (self._fetch_shared(session, missing) if self.shared else self._fetch(session, missing))
+            finally:
+                now = time.monotonic()
+                for key in missing:
+                    # Entri dari cache bersama sudah disimpan _fetch_shared dengan umur aslinya
+                    if key in fetched and not self.cached(key):
+                        self.cache[key] = (fetched[key], now)
+                        if fetched[key] is None:
+                            logging.info(f"Tidak ada harga untuk {key}, tidak dicek ulang selama {self.negative_ttl // 60} menit.")
+                    future = self._inflight.pop(key)
+                    if not future.done():
+                        future.set_result(fetched.get(key))
+            for key in missing:
+                result[key] = fetched.get(key)
+
+        for key, future in waiting.items():
+            result[key] = await future
+        return result
+
+    async def _fetch_shared(self, session, keys):
+        """
+        Ambil `keys` dengan koordinasi antar proses: kunci yang sudah ada di cache bersama dipakai langsung,
+        kunci yang lease-nya didapat diambil sendiri lalu
+        disimpan ke cache bersama; kunci yang sedang diambil proses lain ditunggu sampai LEASE_WAIT,
+        setelah itu diambil sendiri.
+        """
+        # Semua akses SQLite (termasuk BEGIN IMMEDIATE di acquire) dijalankan di thread agar event loop
+        # tidak ikut tertahan saat proses lain memegang lock database
+        prices = {}
+        now = time.monotonic()
+        hits = await asyncio.to_thread(self.shared.get, [shared_key(key) for key in keys], self.ttl, self.negative_ttl)
+        for key in keys:
+            if shared_key(key) in hits:
+                # Entri dari cache bersama disimpan dengan umur aslinya, agar TTL tidak bertambah panjang
+                price, age = hits[shared_key(key)]
+                self.cache[key] = (price, now - age)
+                prices[key] = price
+        keys = [key for key in keys if key not in prices]
+        if not keys:
+            return prices
+
+        by_shared = {shared_key(key): key for key in keys}
+        owned = {by_shared[k] for k in await asyncio.to_thread(self.shared.acquire, list(by_shared))}
+        waiting = [key for key in keys if key not in owned]
+
+        deadline = time.monotonic() + LEASE_WAIT
+        while waiting and time.monotonic() < deadline:
+            await asyncio.sleep(LEASE_POLL)
+            hits = await asyncio.to_thread(self.shared.get, [shared_key(key) for key in waiting], self.ttl, self.negative_ttl)
+            for key in waiting:
+                if shared_key(key) in hits:
+                    prices[key] = hits[shared_key(key)][0]
+            waiting = [key for key in waiting if key not in prices]
+
+        to_fetch = [key for key in keys if key not in prices]
+        try:
+            fetched = await self._fetch(session, to_fetch) if to_fetch else {}
+            await asyncio.to_thread(self.shared.put, {shared_key(key): price for key, price in fetched.items()})
+        finally:
+            await asyncio.to_thread(self.shared.release, [shared_key(key) for key in owned])
+        prices.update(fetched)
+        return prices
+
+    async def _fetch(self, session, keys):
+        """
+        Mengambil harga untuk `keys`. Kunci yang request-nya gagal tidak ikut dikembalikan,
+        sehingga tidak disimpan di cache dan dicoba lagi pada siklus berikutnya.
+        """
+        native_ids = {key[1] for key in keys if key[0] == 'native'}
+        contracts_by_platform = {}
+        for key in keys:
+            if key[0] == 'token':
+                contracts_by_platform.setdefault(key[1], set()).add(key[2])
+
+        calls = []
+        for ids in _chunks(native_ids, MAX_IDS_PER_REQUEST):
+            calls.append(self._fetch_native(session, ids))
+        for platform, contracts in contracts_by_platform.items():
+            for chunk in _chunks(contracts, MAX_CONTRACTS_PER_REQUEST):
+                calls.append(self._fetch_tokens(session, platform, chunk))
+
+        prices = {}
+        for partial in await asyncio.gather(*calls):
+            prices.update(partial)
+        return prices
+
+    async def _get_json(self, session, url, params):
+        async with session.get(url, params=params, timeout=REQUEST_TIMEOUT) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def _fetch_native(self, session, ids):
+        try:
+            data = await self._get_json(session, f"{COINGECKO_API_URL}/simple/price", {'ids': ','.join(ids), 'vs_currencies': 'usd'})
+        except Exception as e:
+            logging.error(f"Gagal mengambil harga untuk {len(ids)} aset native: {e}")
+            return {}
+        return {native_key(coingecko_id): (data.get(coingecko_id) or {}).get('usd') for coingecko_id in ids}
+
+    async def _fetch_tokens(self, session, platform, contracts):
+        try:
+            data = await self._get_json(
+                session, f"{COINGECKO_API_URL}/simple/token_price/{platform}",
+                {'contract_addresses': ','.join(contracts), 'vs_currencies': 'usd'}
+            )
+        except Exception as e:
+            logging.error(f"Gagal mengambil harga {len(contracts)} token di platform {platform}: {e}")
+            return {}
+        data = {address.lower(): value for address, value in data.items()}
+        return {token_key(platform, address): (data.get(address) or {}).get('usd') for address in contracts}
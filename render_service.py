@@ -0,0 +1,91 @@
+# render_service.py
+# Render kuitansi di process pool terbatas agar Pillow/qrcode tidak memblokir event loop monitor
+# dan semua core bisa dipakai saat lonjakan transfer.
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import image_generator
+
+# Maksimal render yang boleh menunggu per worker sebelum pemanggil ikut menunggu (back-pressure)
+QUEUE_PER_WORKER = 4
+# Batas waktu menunggu slot antrean dan hasil render; lewat dari ini pemanggil memakai fallback teks
+QUEUE_TIMEOUT = 5
+RENDER_TIMEOUT = 10
+
+
+def _render_png(tx_data, palette):
+    """Dijalankan di proses worker. Mengembalikan bytes PNG atau None."""
+    image_buffer = image_generator.create_transaction_image(tx_data, palette=palette)
+    return image_buffer.getvalue() if image_buffer else None
+
+
+class RenderService:
+    """
+    Antrean render berbatas di atas ProcessPoolExecutor.
+
+    `render()` menunggu slot jika antrean penuh (back-pressure ke loop deteksi), tetapi paling lama
+    QUEUE_TIMEOUT detik; jika antrean tetap penuh atau render melewati RENDER_TIMEOUT, hasilnya None
+    dan pemanggil mengirim notifikasi teks saja.
+    """
+
+    def __init__(self, workers=None, palette=False):
+        self.workers = workers or os.cpu_count() or 1
+        self.palette = palette
+        self.slots = asyncio.Semaphore(self.workers * QUEUE_PER_WORKER)
+        self.executor = None
+        self.fallbacks = 0
+
+    def start(self):
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=image_generator.warm_up)
+        logging.info(f"Render service aktif dengan {self.workers} proses.")
+
+    def stop(self):
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def _restart(self, broken_executor):
+        # Beberapa render bisa gagal bersamaan; pool cukup dibuat ulang sekali
+        if self.executor is not broken_executor:
+            return
+        logging.warning("Process pool render rusak, membuat ulang pool.")
+        self.stop()
+        self.start()
+
+    async def render(self, tx_data):
+        """Render kuitansi menjadi bytes PNG, atau None jika render gagal atau tertinggal."""
+        try:
+            await asyncio.wait_for(self.slots.acquire(), timeout=QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.fallbacks += 1
+            logging.warning(f"Antrean render penuh, memakai notifikasi teks (total fallback: {self.fallbacks}).")
+            return None
+
+        executor = self.executor
+        try:
+            future = executor.submit(_render_png, tx_data, self.palette)
+        except BrokenProcessPool:
+            self.slots.release()
+            self._restart(executor)
+            return None
+        # Slot baru dilepas saat render benar-benar selesai, meskipun pemanggil sudah berhenti menunggu,
+        # agar jumlah pekerjaan di pool tetap terbatas. Callback ini berjalan di thread pool.
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self.slots.release))
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout=RENDER_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.fallbacks += 1
+            logging.warning(f"Render melewati {RENDER_TIMEOUT} detik, memakai notifikasi teks (total fallback: {self.fallbacks}).")
+            return None
+        except BrokenProcessPool:
+            self._restart(executor)
+            return None
+        except Exception as e:
+            logging.error(f"Gagal render kuitansi: {e}")
+            return None
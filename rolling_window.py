@@ -0,0 +1,78 @@
+# rolling_window.py
+# Harga minimum/maksimum dalam jendela waktu bergulir per token, untuk alert "bergerak X% dalam T menit".
+# Deque monoton membuat setiap sampel harga O(1) amortised per jendela: sampel yang tidak mungkin lagi
+# menjadi min/max langsung dibuang, dan sampel yang keluar dari jendela dibuang dari depan.
+
+from collections import deque
+
+
+class MonotonicWindow:
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.mins = deque()  # (ts, harga), harga naik dari depan ke belakang
+        self.maxs = deque()  # (ts, harga), harga turun dari depan ke belakang
+
+    def push(self, ts, price):
+        while self.mins and self.mins[-1][1] >= price:
+            self.mins.pop()
+        self.mins.append((ts, price))
+        while self.maxs and self.maxs[-1][1] <= price:
+            self.maxs.pop()
+        self.maxs.append((ts, price))
+
+        cutoff = ts - self.seconds
+        while self.mins[0][0] < cutoff:
+            self.mins.popleft()
+        while self.maxs[0][0] < cutoff:
+            self.maxs.popleft()
+
+    def extremes(self):
+        """(min, max) harga dalam jendela, atau None jika belum ada sampel."""
+        if not self.mins:
+            return None
+        return self.mins[0][1], self.maxs[0][1]
+
+
+class WindowTracker:
+    """
+    Satu MonotonicWindow per (token_key, panjang jendela detik). Alert dengan token dan panjang jendela
+    yang sama memakai jendela yang sama, sehingga biaya per sampel tergantung jumlah panjang jendela
+    yang berbeda, bukan jumlah alert.
+    """
+
+    def __init__(self):
+        self.windows = {}  # (token_key, seconds) -> MonotonicWindow
+        self.by_token = {}  # token_key -> list MonotonicWindow
+
+    def ensure(self, token_key, seconds, seed=()):
+        """Buat jendela jika belum ada; `seed` berisi (ts, harga) berurutan, misalnya dari riwayat harga."""
+        key = (token_key, seconds)
+        if key not in self.windows:
+            window = MonotonicWindow(seconds)
+            for ts, price in seed:
+                window.push(ts, price)
+            self.windows[key] = window
+            self.by_token.setdefault(token_key, []).append(window)
+        return self.windows[key]
+
+    def record(self, token_key, ts, price):
+        for window in self.by_token.get(token_key, ()):
+            window.push(ts, price)
+
+    def extremes(self):
+        """(token_key, seconds) -> (min, max) untuk semua jendela yang punya sampel."""
+        result = {}
+        for key, window in self.windows.items():
+            extremes = window.extremes()
+            if extremes:
+                result[key] = extremes
+        return result
+
+    def retain(self, keys):
+        """Hapus jendela yang tidak lagi dipakai alert mana pun."""
+        keys = set(keys)
+        for key in [key for key in self.windows if key not in keys]:
+            window = self.windows.pop(key)
+            self.by_token[key[0]].remove(window)
+            if not self.by_token[key[0]]:
+                del self.by_token[key[0]]
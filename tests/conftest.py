@@ -0,0 +1,9 @@
+# conftest.py
+# Modul bot dibaca dari root repo; config.py menolak start tanpa token, jadi isi nilai dummy untuk pengujian.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('TELEGRAM_TOKEN', 'test')
+os.environ.setdefault('ALCHEMY_API_KEY', 'test')
@@ -0,0 +1,87 @@
+# test_dex_pricer.py
+# Round-trip encode/decode Multicall3 dan DexPricer terhadap devnode.py (pool dari devnode_pools.json).
+
+import asyncio
+import json
+import os
+import socket
+
+import aiohttp
+
+import config
+from devnode import DevNode
+from dex_pricer import DexPricer
+from multicall import (
+    encode_address, encode_call, encode_aggregate3, decode_aggregate3_calls, encode_aggregate3_result,
+    decode_aggregate3_result,
+)
+
+POOLS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'devnode_pools.json')
+WETH = '0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2'
+USDC = '0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48'
+TOKEN_A = '0x' + 'aa' * 20  # pool V2 dalam dengan WETH dan pool V3 tipis dengan USDC
+TOKEN_B = '0x' + 'bb' * 20  # pool V3 dengan USDC, harga 2 USDC
+TOKEN_C = '0x' + 'cc' * 20  # pool V3 yang hanya berisi USDC (sisi token hampir kosong)
+NATIVE_USD = 2000.0
+
+
+def test_aggregate3_calls_round_trip():
+    calls = [
+        (WETH, encode_call('70a08231', encode_address(TOKEN_A))),
+        (USDC, encode_call('313ce567')),
+        (TOKEN_B, '0x'),
+    ]
+    assert decode_aggregate3_calls(encode_aggregate3(calls)) == calls
+
+
+def test_aggregate3_result_round_trip():
+    results = [b'\x01' * 32, None, b'', b'\xab' * 45]
+    assert decode_aggregate3_result(encode_aggregate3_result(results)) == results
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def price_tokens(tokens, native_usd=NATIVE_USD):
+    node = DevNode(block_time=60)
+    with open(POOLS_PATH) as f:
+        node.load_pools(json.load(f))
+    node.add_token(TOKEN_C, 18)
+    node.add_v3_pool(
+        '0x1f98431c8ad98523631ae4a59f267346ea31f984', '0x' + 'c3' * 20, USDC, TOKEN_C, 3000,
+        # harga 1 USDC per token, tetapi pool hanya memegang 1 token di samping 1 juta USDC
+        2**96 * 10**6, 10**12, 10**18,
+    )
+    port = free_port()
+    runner = await node.start(port=port)
+    template = config.RPC_HTTP_URL_TEMPLATE
+    config.RPC_HTTP_URL_TEMPLATE = f'http://127.0.0.1:{port}/{{subdomain}}'
+    try:
+        pricer = DexPricer()
+        async with aiohttp.ClientSession() as session:
+            prices = await pricer.get_prices(session, 'ethereum', tokens, native_usd)
+        return prices, pricer, node
+    finally:
+        config.RPC_HTTP_URL_TEMPLATE = template
+        await runner.cleanup()
+
+
+def test_dex_pricer_prices_deep_pools():
+    prices, pricer, node = asyncio.run(price_tokens([TOKEN_A, TOKEN_B]))
+    assert abs(prices[TOKEN_A] - 1.0) < 1e-9
+    assert abs(prices[TOKEN_B] - 2.0) < 1e-9
+    # Pool terdalam yang dipilih, bukan pool V3 USDC yang tipis
+    assert pricer.pools[('ethereum', TOKEN_A)][0]['address'] == '0x' + 'a1' * 20
+    # Penemuan pool (2 multicall) dan pembacaan harga (1 multicall), masing-masing satu eth_call
+    assert node.rpc_calls == 3
+
+
+def test_dex_pricer_skips_one_sided_and_unknown_pools():
+    unknown = '0x' + 'dd' * 20
+    prices, pricer, _ = asyncio.run(price_tokens([TOKEN_C, unknown]))
+    assert prices == {}
+    assert pricer.pools[('ethereum', TOKEN_C)][0] is None
+    assert pricer.pools[('ethereum', unknown)][0] is None
@@ -0,0 +1,81 @@
+# threshold_index.py
+# Indeks target harga per token untuk alert 'above'/'below': array NumPy terurut (target, alert_id),
+# sehingga harga baru langsung menemukan alert yang terlewati lewat np.searchsorted dalam O(log n + k).
+# Indeks diperbarui per perubahan alert (buat, hapus, trigger), tidak dibangun ulang setiap putaran.
+
+import numpy as np
+
+ABOVE, BELOW = 'above', 'below'
+_EMPTY = (np.empty(0), np.empty(0, dtype=np.int64))
+
+
+class ThresholdIndex:
+    """
+    `above` terurut naik: alert terpicu jika harga >= target, yaitu prefiks sampai searchsorted(harga, 'right').
+    `below` terurut naik: alert terpicu jika harga <= target, yaitu sufiks mulai searchsorted(harga, 'left').
+    `add()` dan `remove()` menerima banyak alert sekaligus agar muat ulang penuh cukup satu penggabungan
+    per token, sedangkan perubahan tunggal dari feed versi hanya menggeser satu array. Alert yang terpicu
+    dibuang dengan `discard_crossed()`, sekali per token.
+    """
+
+    def __init__(self):
+        self.books = {}  # token_key -> {ABOVE: (targets, ids), BELOW: (targets, ids)}
+
+    def add(self, token_key, side, alert_ids, targets):
+        targets = np.asarray(targets, dtype=np.float64)
+        alert_ids = np.asarray(alert_ids, dtype=np.int64)
+        # Target NaN tidak pernah terpicu; di array terurut NaN ada di ujung dan akan ikut sufiks 'below'
+        valid = ~np.isnan(targets)
+        targets, alert_ids = targets[valid], alert_ids[valid]
+        if not len(targets):
+            return
+        order = np.argsort(targets, kind='stable')
+        targets, alert_ids = targets[order], alert_ids[order]
+
+        book = self.books.setdefault(token_key, {ABOVE: _EMPTY, BELOW: _EMPTY})
+        current_targets, current_ids = book[side]
+        positions = np.searchsorted(current_targets, targets, side='right')
+        book[side] = (np.insert(current_targets, positions, targets), np.insert(current_ids, positions, alert_ids))
+
+    def remove(self, token_key, side, alert_ids):
+        book = self.books.get(token_key)
+        if not book:
+            return
+        targets, ids = book[side]
+        keep = ~np.isin(ids, np.asarray(alert_ids, dtype=np.int64))
+        book[side] = (targets[keep], ids[keep])
+        if not len(book[ABOVE][0]) and not len(book[BELOW][0]):
+            del self.books[token_key]
+
+    def crossed(self, token_key, price):
+        """Array alert id yang kondisinya terpenuhi pada `price` (tanpa menghapusnya dari indeks)."""
+        book = self.books.get(token_key)
+        if not book or price is None:
+            return _EMPTY[1]
+        above_targets, above_ids = book[ABOVE]
+        below_targets, below_ids = book[BELOW]
+        return np.concatenate((
+            above_ids[:np.searchsorted(above_targets, price, side='right')],
+            below_ids[np.searchsorted(below_targets, price, side='left'):],
+        ))
+
+    def discard_crossed(self, token_key, price):
+        """
+        Buang alert yang terpenuhi pada `price` dan kembalikan id-nya. Alert itu selalu berupa prefiks 'above'
+        dan sufiks 'below', jadi cukup dipotong (O(log n + k)), tanpa mencari per alert seperti remove().
+        """
+        book = self.books.get(token_key)
+        if not book or price is None:
+            return _EMPTY[1]
+        above_targets, above_ids = book[ABOVE]
+        below_targets, below_ids = book[BELOW]
+        above_end = np.searchsorted(above_targets, price, side='right')
+        below_start = np.searchsorted(below_targets, price, side='left')
+        book[ABOVE] = (above_targets[above_end:], above_ids[above_end:])
+        book[BELOW] = (below_targets[:below_start], below_ids[:below_start])
+        if not len(book[ABOVE][0]) and not len(book[BELOW][0]):
+            del self.books[token_key]
+        return np.concatenate((above_ids[:above_end], below_ids[below_start:]))
+
+    def size(self):
+        return sum(len(book[ABOVE][0]) + len(book[BELOW][0]) for book in self.books.values())
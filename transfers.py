@@ -0,0 +1,90 @@
+# transfers.py
+# Pengambil data `alchemy_getAssetTransfers` yang memecah daftar alamat dan mengikuti pageKey
+
+import asyncio
+import logging
+
+from bot.utils import make_rpc_batch_request_async
+
+TRANSFER_CATEGORIES = ["external", "erc20", "erc721", "erc1155"]
+# Jumlah alamat per batch HTTP; setiap alamat menjadi dua panggilan (fromAddress dan toAddress)
+ADDRESS_CHUNK_SIZE = 50
+# Batas hasil per halaman dari Alchemy (maksimum 1000)
+PAGE_SIZE = 1000
+
+
+def transfer_calls(address_count):
+    """Jumlah panggilan getAssetTransfers minimal untuk satu jendela (dua per alamat, tanpa halaman lanjutan)."""
+    return 2 * address_count
+
+def _transfer_params(query, from_block, to_block):
+    params = {
+        "fromBlock": hex(from_block),
+        "toBlock": hex(to_block),
+        "category": TRANSFER_CATEGORIES,
+        "withMetadata": True,
+        "excludeZeroValue": False,
+        "maxCount": hex(PAGE_SIZE),
+    }
+    params.update(query)
+    return [params]
+
+def _transfer_sort_key(tx):
+    return (int(tx.get('blockNum', '0x0'), 16), tx.get('uniqueId') or tx.get('hash', ''))
+
+async def _fetch_chunk(session, rpc_url, addresses, from_block, to_block, semaphore):
+    """Ambil semua halaman transfer untuk satu potongan alamat. None jika ada request yang gagal."""
+    # Alchemy hanya menerima satu fromAddress/toAddress per panggilan, jadi setiap alamat
+    # ditanyakan dua kali dan semua panggilan satu potongan dikirim sebagai satu batch.
+    pending = [{"fromAddress": address} for address in addresses]
+    pending += [{"toAddress": address} for address in addresses]
+    transfers = []
+
+    while pending:
+        calls = [("alchemy_getAssetTransfers", _transfer_params(query, from_block, to_block)) for query in pending]
+        async with semaphore:
+            responses = await make_rpc_batch_request_async(session, rpc_url, calls)
+        if responses is None:
+            return None
+
+        next_pending = []
+        for query, response in zip(pending, responses):
+            if not response or 'result' not in response:
+                error = response.get('error') if response else 'tidak ada respons'
+                logging.error(f"getAssetTransfers gagal untuk {query}: {error}")
+                return None
+            result = response['result']
+            transfers.extend(result.get('transfers') or [])
+            page_key = result.get('pageKey')
+            if page_key:
+                next_pending.append({**query, "pageKey": page_key})
+        pending = next_pending
+
+    return transfers
+
+async def fetch_transfers(session, rpc_url, addresses, from_block, to_block, semaphore, chunk_size=ADDRESS_CHUNK_SIZE):
+    """
+    Mengambil semua transfer untuk daftar alamat pada rentang blok [from_block, to_block].
+
+    Daftar alamat dipecah per `chunk_size`, setiap potongan mengikuti pageKey sampai habis,
+    dan semua potongan berjalan paralel di bawah `semaphore` milik jaringan tersebut.
+    Hasil digabung tanpa duplikat dan diurutkan berdasarkan nomor blok.
+    Mengembalikan None jika salah satu request gagal, agar pemanggil tidak memajukan cursor.
+    """
+    addresses = list(addresses)
+    if not addresses:
+        return []
+
+    chunks = [addresses[i:i + chunk_size] for i in range(0, len(addresses), chunk_size)]
+    results = await asyncio.gather(*(
+        _fetch_chunk(session, rpc_url, chunk, from_block, to_block, semaphore) for chunk in chunks
+    ))
+    if any(result is None for result in results):
+        return None
+
+    # Transfer antar dua alamat yang dipantau muncul dua kali (dari sisi from dan to)
+    merged = {}
+    for chunk_transfers in results:
+        for tx in chunk_transfers:
+            merged[tx.get('uniqueId') or (tx.get('hash'), tx.get('from'), tx.get('to'), tx.get('category'))] = tx
+    return sorted(merged.values(), key=_transfer_sort_key)
@@ -0,0 +1,108 @@
+# watch_index.py
+# Indeks di memori: chain -> alamat -> pengguna yang memantau, beserta pengaturan notifikasi mereka.
+# Jalur panas monitor (per transfer) hanya membaca indeks ini, tanpa I/O ke SQLite.
+
+import logging
+
+import database
+
+# Nilai default sama dengan DEFAULT kolom di tabel user_settings
+DEFAULT_USER_SETTINGS = {'min_value_usd': 0, 'notify_on_airdrop': 1, 'group_notifications': 1, 'digest_threshold': 10}
+
+
+class WatchIndex:
+    def __init__(self):
+        self.wallets = {}  # chain -> {address: set(user_id)}
+        self.settings = {}  # user_id -> dict pengaturan
+        self.last_change_id = 0
+
+    def load(self):
+        """Bangun ulang seluruh indeks dari database (dipanggil saat start)."""
+        self._apply_snapshot(self.read_snapshot())
+
+    def read_snapshot(self):
+        """Baca seluruh isi indeks dari database tanpa mengubah indeks: (id perubahan terakhir, wallets, settings)."""
+        # Ambil id perubahan dulu agar perubahan yang terjadi selama load tetap diterapkan ulang nanti
+        last_change_id = database.get_latest_watch_change_id()
+
+        wallets = {}
+        for row in database.get_all_wallet_subscriptions():
+            wallets.setdefault(row['chain'], {}).setdefault(row['address'].lower(), set()).add(row['user_id'])
+
+        user_ids = {user_id for addresses in wallets.values() for users in addresses.values() for user_id in users}
+        return last_change_id, wallets, database.get_settings_for_users(user_ids)
+
+    def _apply_snapshot(self, snapshot):
+        last_change_id, wallets, settings = snapshot
+        self.wallets = wallets
+        self.settings = settings
+        self.last_change_id = last_change_id
+        logging.info(f"Indeks wallet dimuat: {sum(len(a) for a in wallets.values())} alamat di {len(wallets)} jaringan.")
+
+    def refresh(self):
+        """Terapkan perubahan sejak sinkronisasi terakhir. Mengembalikan jumlah perubahan yang diterapkan."""
+        return self.apply(self.read_changes(self.last_change_id))
+
+    def read_changes(self, since):
+        """
+        Baca perubahan setelah id `since` beserta pengaturan pengguna yang terdampak, tanpa mengubah indeks,
+        sehingga aman dijalankan di thread (asyncio.to_thread); hasilnya diterapkan dengan apply().
+        Mengembalikan (changes, settings, snapshot); snapshot berisi muat ulang penuh jika log perubahan terputus.
+        """
+        oldest = database.get_oldest_watch_change_id()
+        if oldest is not None and oldest > since + 1:
+            # Perubahan yang belum diterapkan sudah dibersihkan (indeks ini terlalu lama tidak melapor)
+            logging.warning(f"Log perubahan wallet terputus (id {since} < {oldest}), memuat ulang indeks.")
+            return [], {}, self.read_snapshot()
+
+        changes = database.get_watch_changes_since(since) or []
+        user_ids = {change['user_id'] for change in changes if change['kind'] in ('wallet_added', 'settings_updated')}
+        settings = database.get_settings_for_users(user_ids) if user_ids else {}
+        return changes, settings, None
+
+    def apply(self, result):
+        """Terapkan hasil read_changes(). Mengembalikan jumlah perubahan yang diterapkan."""
+        changes, settings, snapshot = result
+        if snapshot is not None:
+            self._apply_snapshot(snapshot)
+            return 0
+
+        for change in changes:
+            kind = change['kind']
+            if kind == 'wallet_added':
+                self._add(change['chain'], change['address'], change['user_id'])
+            elif kind == 'wallet_removed':
+                self._remove(change['chain'], change['address'], change['user_id'])
+            self.last_change_id = change['id']
+        self.settings.update(settings)
+        return len(changes)
+
+    def _add(self, chain, address, user_id):
+        self.wallets.setdefault(chain, {}).setdefault(address.lower(), set()).add(user_id)
+
+    def _remove(self, chain, address, user_id):
+        addresses = self.wallets.get(chain)
+        if not addresses:
+            return
+        users = addresses.get(address.lower())
+        if users is None:
+            return
+        users.discard(user_id)
+        if not users:
+            del addresses[address.lower()]
+        if not addresses:
+            del self.wallets[chain]
+
+    def chains(self):
+        """Jaringan yang saat ini punya setidaknya satu wallet dipantau."""
+        return set(self.wallets)
+
+    def addresses(self, chain):
+        """Alamat yang dipantau di satu jaringan (dict, sehingga cek `in` bernilai O(1))."""
+        return self.wallets.get(chain, {})
+
+    def users_for(self, chain, address):
+        return self.wallets.get(chain, {}).get(address.lower(), set())
+
+    def settings_for(self, user_id):
+        return self.settings.get(user_id, DEFAULT_USER_SETTINGS)
@@ -0,0 +1,175 @@
+# ws_subscriber.py
+# Langganan WebSocket `newHeads` dan `logs` (Transfer ERC-20/721/1155) untuk mode push monitor.
+# Data transfer tetap diambil lewat getAssetTransfers; langganan ini hanya memberi tahu kapan perlu mengambil.
+
+import asyncio
+import json
+import logging
+
+import aiohttp
+
+# topic0 event Transfer(address,address,uint256) — sama untuk ERC-20 dan ERC-721
+TRANSFER_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+# TransferSingle dan TransferBatch ERC-1155
+TRANSFER_SINGLE_TOPIC = '0xc3d58168c5ae7397731d063d5bbf3d657854427343f4c083240f7aacaa2d0f62'
+TRANSFER_BATCH_TOPIC = '0x4a39dc06d4c0dbc64b70af90fd698a233a518aa5d07e595d983b8c0526c8f7fb'
+ALL_TRANSFER_TOPICS = [TRANSFER_TOPIC, TRANSFER_SINGLE_TOPIC, TRANSFER_BATCH_TOPIC]
+ERC1155_TOPICS = [TRANSFER_SINGLE_TOPIC, TRANSFER_BATCH_TOPIC]
+
+# Jumlah alamat per langganan logs, agar filter tidak melebihi batas provider
+ADDRESSES_PER_SUBSCRIPTION = 1000
+# Seberapa sering daftar alamat dicek untuk langganan ulang (detik)
+ADDRESS_CHECK_INTERVAL = 5
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 60
+
+
+def _address_topic(address):
+    """Alamat 20 byte di-pad menjadi topic 32 byte."""
+    return '0x' + address.lower().replace('0x', '').rjust(64, '0')
+
+def build_log_filters(addresses):
+    """
+    Filter `logs` yang menangkap transfer dari atau ke alamat yang dipantau.
+
+    ERC-20/721 menaruh from/to di topic1/topic2, sedangkan ERC-1155 di topic2/topic3
+    (topic1 adalah operator), jadi dibutuhkan tiga posisi filter. Kelebihan cocok
+    (misalnya operator ERC-1155) tidak masalah karena hanya dipakai sebagai pemicu.
+    """
+    address_list = sorted(addresses)
+    filters = []
+    for i in range(0, len(address_list), ADDRESSES_PER_SUBSCRIPTION):
+        topics = [_address_topic(a) for a in address_list[i:i + ADDRESSES_PER_SUBSCRIPTION]]
+        filters.append({"topics": [ALL_TRANSFER_TOPICS, topics]})
+        filters.append({"topics": [ALL_TRANSFER_TOPICS, None, topics]})
+        filters.append({"topics": [ERC1155_TOPICS, None, None, topics]})
+    return filters
+
+
+class ChainSubscriber:
+    """
+    Menjaga koneksi WebSocket satu jaringan: menyimpan head terbaru dari `newHeads`, mencatat
+    blok tertinggi yang berisi log Transfer untuk alamat yang dipantau, dan membangunkan worker
+    (juga saat tersambung atau terputus, agar worker langsung berganti jalur).
+    Koneksi yang putus disambung ulang dengan backoff dan semua langganan dibuat ulang.
+    """
+
+    def __init__(self, session, ws_url, chain_name, get_addresses):
+        self.session = session
+        self.ws_url = ws_url
+        self.chain_name = chain_name
+        self.get_addresses = get_addresses
+        self.connected = False
+        self.head = None
+        self.hit_block = None
+        self.wake = asyncio.Event()
+        self._next_id = 0
+        self._pending = {}
+        self._log_subscriptions = set()
+
+    async def run(self):
+        delay = RECONNECT_MIN_DELAY
+        while True:
+            try:
+                async with self.session.ws_connect(self.ws_url, heartbeat=30) as ws:
+                    logging.info(f"[{self.chain_name}] WebSocket tersambung, membuat langganan...")
+                    await self._session_loop(ws)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"[{self.chain_name}] WebSocket terputus: {e}")
+            finally:
+                if self.connected:
+                    logging.warning(f"[{self.chain_name}] Kembali ke mode polling sampai WebSocket tersambung lagi.")
+                    delay = RECONNECT_MIN_DELAY
+                self.connected = False
+                self.head = None
+                self._log_subscriptions.clear()
+                # Bangunkan worker agar langsung beralih ke jalur polling
+                self.wake.set()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    async def _session_loop(self, ws):
+        reader = asyncio.create_task(self._read_loop(ws))
+        try:
+            await self._request(ws, "eth_subscribe", ["newHeads"])
+            subscribed_addresses = frozenset(self.get_addresses())
+            await self._subscribe_logs(ws, subscribed_addresses)
+            self.connected = True
+            self.wake.set()
+            logging.info(f"[{self.chain_name}] Langganan newHeads dan logs aktif ({len(subscribed_addresses)} alamat).")
+
+            while not reader.done():
+                await asyncio.wait({reader}, timeout=ADDRESS_CHECK_INTERVAL)
+                current = frozenset(self.get_addresses())
+                if current != subscribed_addresses and not reader.done():
+                    await self._unsubscribe_logs(ws)
+                    await self._subscribe_logs(ws, current)
+                    subscribed_addresses = current
+                    logging.info(f"[{self.chain_name}] Langganan logs diperbarui ({len(current)} alamat).")
+            # Naikkan exception dari reader (jika ada) agar run() menyambung ulang
+            reader.result()
+        finally:
+            reader.cancel()
+
+    async def _read_loop(self, ws):
+        try:
+            async for msg in ws:
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    if msg.type in (aiohttp.WSMsgType.ERROR, aiohttp.WSMsgType.CLOSE):
+                        break
+                    continue
+                data = json.loads(msg.data)
+                if 'id' in data and data['id'] in self._pending:
+                    future = self._pending.pop(data['id'])
+                    if not future.done():
+                        future.set_result(data)
+                elif data.get('method') == 'eth_subscription':
+                    self._handle_notification(data['params'])
+        finally:
+            # Request yang masih menunggu jawaban tidak akan pernah dijawab di koneksi ini
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("koneksi WebSocket terputus"))
+            self._pending.clear()
+        raise ConnectionError("koneksi WebSocket ditutup oleh server")
+
+    def _handle_notification(self, params):
+        result = params.get('result') or {}
+        if params.get('subscription') in self._log_subscriptions:
+            if result.get('removed'):
+                return
+            block = int(result.get('blockNumber', '0x0'), 16)
+            self.hit_block = block if self.hit_block is None else max(self.hit_block, block)
+            self.wake.set()
+        elif 'number' in result:
+            self.head = int(result['number'], 16)
+
+    async def _request(self, ws, method, params):
+        self._next_id += 1
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        await ws.send_json({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+        response = await asyncio.wait_for(future, timeout=30)
+        if 'error' in response:
+            raise RuntimeError(f"{method} gagal: {response['error']}")
+        return response['result']
+
+    async def _subscribe_logs(self, ws, addresses):
+        if not addresses:
+            return
+        for log_filter in build_log_filters(addresses):
+            subscription_id = await self._request(ws, "eth_subscribe", ["logs", log_filter])
+            self._log_subscriptions.add(subscription_id)
+
+    async def _unsubscribe_logs(self, ws):
+        for subscription_id in list(self._log_subscriptions):
+            await self._request(ws, "eth_unsubscribe", [subscription_id])
+            self._log_subscriptions.discard(subscription_id)
+
+    def clear_hit(self, processed_block):
+        """Hapus tanda aktivitas yang sudah tercakup oleh blok yang diproses."""
+        if self.hit_block is not None and self.hit_block <= processed_block:
+            self.hit_block = None